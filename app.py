@@ -1,49 +1,58 @@
 import streamlit as st
-import subprocess
-import glob
 import json
-from pathlib import Path
+from datetime import datetime
+
+from browser_pool import PoolNavegadores
+from main import analisar_url, criar_cliente_openai, salvar_resultado
+from result_store import obter_armazem
 
 st.set_page_config(page_title="🔍 Analisador de Blog", layout="centered")
 st.title("🔍 Analisador de Artigos de Blog")
 st.write("Insira a URL e aguarde a análise completa (conteúdo + SEO).")
 
+
+# Recursos compartilhados entre cliques e sessões: criados uma única vez por processo
+@st.cache_resource
+def cliente_openai():
+    return criar_cliente_openai()
+
+
+@st.cache_resource
+def pool_navegadores():
+    return PoolNavegadores()
+
+
 url = st.text_input("URL do artigo")
 
 if st.button("Analisar artigo"):
     if not url.startswith("http"):
         st.warning("Insira uma URL válida começando com http ou https.")
     else:
-        # 1. Salva a URL
-        with open("input_url.txt", "w") as f:
-            f.write(url)
-        st.info("📡 Iniciando análise com navegador visível...")
-
-        # 2. Executa o main.py automaticamente
-        result = subprocess.run(["python", "main.py"], capture_output=True, text=True)
-
-        if result.returncode == 0:
+        try:
+            with st.spinner("📡 Analisando o artigo..."):
+                resultado = analisar_url(url, cliente=cliente_openai(), pool=pool_navegadores())
+                output_path = salvar_resultado(resultado)
+        except Exception as e:
+            st.error("❌ Ocorreu um erro durante a análise:")
+            st.code(str(e))
+        else:
             st.success("✅ Análise concluída com sucesso!")
 
-            # 3. Pega o resultado mais recente
-            arquivos = sorted(glob.glob("output_files/resultado_*.json"), reverse=True)
-            if arquivos:
-                with open(arquivos[0], "r", encoding="utf-8") as f:
-                    resultado = json.load(f)
-
-                st.subheader("📄 Resultado da Análise")
-                st.markdown(f"**Título:** {resultado['titulo']}")
-                st.markdown("**Subtítulos:**")
-                for subtitulo in resultado["subtitulos"]:
-                    st.markdown(f"- {subtitulo}")
-                st.markdown("**Trecho:**")
-                st.text(resultado["texto"][:1000] + "..." if len(resultado["texto"]) > 1000 else resultado["texto"])
-
-                # 4. Botão para baixar o JSON
-                with open(arquivos[0], "rb") as f:
-                    st.download_button("📥 Baixar resultado JSON", f, file_name=Path(arquivos[0]).name)
-            else:
-                st.warning("Não foi possível encontrar o resultado.")
-        else:
-            st.error("❌ Ocorreu um erro ao executar o main.py:")
-            st.code(result.stderr)
+            st.subheader("📄 Resultado da Análise")
+            st.markdown(f"**Título:** {resultado['titulo']}")
+            st.markdown("**Subtítulos:**")
+            for subtitulo in resultado["subtitulos"]:
+                st.markdown(f"- {subtitulo}")
+            st.markdown("**Trecho:**")
+            st.text(resultado["texto"][:1000] + "..." if len(resultado["texto"]) > 1000 else resultado["texto"])
+
+            # Botão para baixar o JSON
+            conteudo_json = json.dumps(resultado, ensure_ascii=False, indent=2).encode("utf-8")
+            st.download_button("📥 Baixar resultado JSON", conteudo_json, file_name=output_path.name)
+
+            historico = obter_armazem().historico(url, limite=20)
+            if len(historico) > 1:
+                with st.expander("📈 Histórico desta URL"):
+                    for registro in historico:
+                        quando = datetime.fromtimestamp(registro["_executado_em"]).strftime("%d/%m/%Y %H:%M")
+                        st.markdown(f"- {quando}: nota **{registro.get('nota_seo')}**")
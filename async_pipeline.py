@@ -0,0 +1,404 @@
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from browser_pool import OPCOES_CONTEXTO_PADRAO
+from cache import obter_cache_seo
+from dom_extraction import SCRIPT_EXTRACAO, dominio_da_url, montar_resultado
+from incremental import (
+    ResumoIncremental,
+    cabecalhos_condicionais,
+    obter_estado_incremental,
+    pagespeed_vencido,
+    reaproveitar_conteudo,
+)
+from jsonl_output import EscritorJSONL, exportar_lista_json, urls_concluidas
+from lab_vitals import coletar_async, ler_perfil, na_amostra_pagespeed, preparar_async
+from pagespeed import obter_cliente_pagespeed
+from rate_limit import obter_limitador
+from resource_policy import politica_do_ambiente
+from result_store import obter_armazem
+from seo import (
+    MODELO_SEO,
+    TEMPERATURA_SEO,
+    avaliacao_com_erro,
+    chave_cache_seo,
+    estimar_tokens,
+    finalizar_avaliacao,
+    interpretar_resposta_seo,
+    preparar_avaliacao,
+    tokens_usados,
+)
+from snapshot_archive import arquivamento_ativo, arquivar
+from static_extractor import (
+    HEADERS_PADRAO,
+    NAO_MODIFICADO,
+    ExtracaoEstatica,
+    motivo_resposta_invalida,
+    validadores_http,
+)
+from telemetry import etapa, obter_logger, obter_metricas, rastrear_url, registrar_tokens
+
+load_dotenv()
+
+# Limites de concorrência por etapa (podem ser sobrescritos na chamada)
+LIMITE_EXTRACAO = int(os.getenv("BATCH_EXTRACT_CONCURRENCY", "4"))
+LIMITE_LLM = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+LIMITE_PAGESPEED = int(os.getenv("BATCH_PAGESPEED_CONCURRENCY", "4"))
+# Com LAB_VITALS_PROFILE, o PageSpeed vem de uma navegação própria no navegador local
+PERFIL_VITAIS = ler_perfil()
+
+log = obter_logger("async_pipeline")
+
+
+async def _extrair_pagina(contexto, url, politica=None):
+    page = await contexto.new_page()
+    estatisticas = await politica.aplicar_async(page, url) if politica else None
+    try:
+        with etapa("navegador.goto"):
+            resposta = await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+        with etapa("navegador.wait_for_selector"):
+            await page.wait_for_selector('article, h1, p', timeout=15000)
+        if arquivamento_ativo():
+            with etapa("navegador.arquivar"):
+                arquivar(url, await page.content(), "playwright",
+                         resposta.status if resposta else None, resposta.headers if resposta else None)
+
+        with etapa("navegador.extracao"):
+            dados = await page.evaluate(SCRIPT_EXTRACAO, dominio_da_url(page.url))
+            resultado = montar_resultado(url, dados)
+        if estatisticas:
+            resultado['recursos'] = estatisticas.resumo()
+        return resultado
+    finally:
+        await page.close()
+
+
+async def _medir_vitais(contexto, url, perfil):
+    page = await contexto.new_page()
+    try:
+        rede = await preparar_async(page, perfil)
+        with etapa("navegador.goto"):
+            await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+        with etapa("navegador.vitais"):
+            return await coletar_async(page, rede, perfil)
+    finally:
+        await page.close()
+
+
+async def _extrair_estatico(cliente_http, url, cabecalhos=None):
+    extracao = ExtracaoEstatica(url, guardar_html=arquivamento_ativo())
+    headers = {**HEADERS_PADRAO, **(cabecalhos or {})}
+    async with cliente_http.stream("GET", url, headers=headers, timeout=20) as response:
+        validadores = validadores_http(response.headers)
+        if response.status_code == 304:
+            return None, NAO_MODIFICADO, validadores
+        motivo = motivo_resposta_invalida(response.status_code, response.headers.get("Content-Type"))
+        if motivo:
+            return None, motivo, validadores
+        async for pedaco in response.aiter_text():
+            if not extracao.alimentar(pedaco):
+                break
+        arquivar(url, extracao.html(), "estatico", response.status_code, response.headers)
+
+    resultado = extracao.resultado()
+    return resultado, extracao.motivo_fallback(resultado), validadores
+
+
+async def _avaliar_seo(cliente_openai, resultado, cache, sem_llm, modo_llm=None):
+    pontuacao, tipo, prompt = preparar_avaliacao(resultado, modo_llm)
+    if tipo is None:
+        return finalizar_avaliacao(pontuacao, None)
+
+    chave = chave_cache_seo(resultado, tipo)
+    avaliacao = cache.obter(chave)
+    obter_metricas().incrementar("seo_cache_total", cache="seo", resultado="hit" if avaliacao is not None else "miss")
+    if avaliacao is not None:
+        return finalizar_avaliacao(pontuacao, tipo, avaliacao)
+
+    try:
+        async with sem_llm:
+            with etapa("llm", modelo=MODELO_SEO, tipo=tipo) as span:
+                response = await obter_limitador("openai").executar_async(
+                    lambda: cliente_openai.chat.completions.create(
+                        model=MODELO_SEO,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=TEMPERATURA_SEO
+                    ),
+                    tokens=estimar_tokens(prompt),
+                    medir_tokens=tokens_usados,
+                )
+                registrar_tokens(span, response.usage)
+        avaliacao = interpretar_resposta_seo(response.choices[0].message.content)
+        cache.salvar(chave, avaliacao)
+        return finalizar_avaliacao(pontuacao, tipo, avaliacao)
+    except Exception as e:
+        log.error(f"Falha ao analisar SEO de {resultado['link']}: {e}")
+        return finalizar_avaliacao(pontuacao, tipo, avaliacao_com_erro())
+
+
+async def analisar_lote(urls, limite_extracao=None, limite_llm=None,
+                        limite_pagespeed=None, headless=True,
+                        cliente_openai=None, cliente_http=None, cache=None,
+                        modo_extracao="auto", politica=None, modo_llm=None,
+                        incremental=False, estado=None, armazem=None, resumo=None):
+    """Analisa várias URLs em paralelo e devolve cada resultado assim que fica pronto.
+
+    Só uma janela de URLs fica em andamento por vez, então lotes grandes (ou um
+    gerador de URLs) não acumulam resultados em memória.
+
+    Extração, avaliação pelo LLM e PageSpeed têm semáforos independentes; o
+    PageSpeed de uma URL roda em paralelo com a extração e a avaliação dela.
+    Com `modo_extracao="auto"` cada página é baixada primeiro por HTTP e só vai
+    para o navegador quando o HTML estático não basta.
+
+    Com `incremental=True` cada URL é comparada com a última análise salva:
+    requisição condicional, avaliação reaproveitada quando o conteúdo não muda
+    e PageSpeed só quando vence o intervalo. `resumo` (ResumoIncremental)
+    acumula quantas URLs pularam cada etapa.
+    """
+    import httpx
+    from openai import AsyncOpenAI
+    from playwright.async_api import async_playwright
+
+    sem_extracao = asyncio.Semaphore(limite_extracao or LIMITE_EXTRACAO)
+    sem_llm = asyncio.Semaphore(limite_llm or LIMITE_LLM)
+    sem_pagespeed = asyncio.Semaphore(limite_pagespeed or LIMITE_PAGESPEED)
+
+    cliente_pagespeed = obter_cliente_pagespeed()
+    cache = cache or obter_cache_seo()
+    politica = politica or politica_do_ambiente()
+    fechar_openai = cliente_openai is None
+    fechar_http = cliente_http is None
+    cliente_openai = cliente_openai or AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    cliente_http = cliente_http or httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=limite_pagespeed or LIMITE_PAGESPEED)
+    )
+    cliente_html = httpx.AsyncClient(
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=4 * (limite_extracao or LIMITE_EXTRACAO)),
+    )
+
+    async with async_playwright() as p:
+        # O navegador só é aberto quando alguma página precisa dele: lotes em que
+        # o HTML estático basta não pagam a inicialização do Chromium
+        navegador = {}
+        trava_navegador = asyncio.Lock()
+
+        async def obter_contexto():
+            async with trava_navegador:
+                if "contexto" not in navegador:
+                    with etapa("navegador.abrir"):
+                        navegador["browser"] = await p.chromium.launch(headless=headless)
+                        navegador["contexto"] = await navegador["browser"].new_context(**OPCOES_CONTEXTO_PADRAO)
+                return navegador["contexto"]
+
+        async def extrair(url, cabecalhos=None):
+            # Retorna (resultado, validadores); resultado None quando a página não mudou
+            motivo = None
+            validadores = {}
+            if modo_extracao != "playwright":
+                with etapa("extracao.estatica") as span:
+                    try:
+                        resultado, motivo, validadores = await _extrair_estatico(cliente_html, url, cabecalhos)
+                    except Exception as e:
+                        resultado, motivo = None, f"erro HTTP: {e}"
+                    span.definir(motivo_fallback=motivo)
+                if motivo == NAO_MODIFICADO:
+                    return None, validadores
+                if motivo is None:
+                    resultado["metodo_extracao"] = "estatico"
+                    return resultado, validadores
+                if modo_extracao == "estatico":
+                    raise Exception(f"Extração estática insuficiente: {motivo}")
+
+            async with sem_extracao:
+                with etapa("extracao.playwright"):
+                    resultado = await _extrair_pagina(await obter_contexto(), url, politica)
+            resultado["metodo_extracao"] = "playwright"
+            if motivo:
+                resultado["motivo_fallback"] = motivo
+            return resultado, validadores
+
+        async def conteudo_e_seo(url):
+            resultado, _ = await extrair(url)
+            resultado.update(await _avaliar_seo(cliente_openai, resultado, cache, sem_llm, modo_llm))
+            return resultado
+
+        async def pagespeed(url):
+            if PERFIL_VITAIS is None:
+                async with sem_pagespeed:
+                    return await cliente_pagespeed.consultar_estrategias_async(cliente_http, url)
+            # A medição local disputa o navegador com a extração, então usa o limite dela
+            async with sem_extracao:
+                with etapa("pagespeed.laboratorio"):
+                    medicao = await _medir_vitais(await obter_contexto(), url, PERFIL_VITAIS)
+            if na_amostra_pagespeed(url):
+                async with sem_pagespeed:
+                    medicao["pagespeed_api"] = await cliente_pagespeed.consultar_estrategias_async(cliente_http, url)
+            return medicao
+
+        async def processar(url):
+            conteudo, metricas = await asyncio.gather(
+                conteudo_e_seo(url), pagespeed(url), return_exceptions=True
+            )
+            if isinstance(conteudo, BaseException):
+                log.error(f"Erro ao processar {url}: {conteudo}")
+                conteudo = {"link": url, "erro": str(conteudo)}
+            conteudo["page_speed"] = metricas if isinstance(metricas, dict) else {}
+            return conteudo
+
+        async def processar_incremental(url):
+            agora = time.time()
+            anterior = armazem.ultimo_por_url(url)
+            pagina = estado.obter(url) if anterior else {}
+            etapas = {"extracao": False, "avaliacao": False, "pagespeed": pagespeed_vencido(pagina, anterior, agora)}
+
+            async def conteudo():
+                resultado, validadores = await extrair(url, cabecalhos_condicionais(pagina))
+                etapas["extracao"] = resultado is not None
+                resultado, hash_atual, avaliacao = reaproveitar_conteudo(resultado, anterior, pagina)
+                etapas["avaliacao"] = avaliacao is None
+                if avaliacao is None:
+                    avaliacao = await _avaliar_seo(cliente_openai, resultado, cache, sem_llm, modo_llm)
+                resultado.update(avaliacao)
+                return resultado, validadores, hash_atual
+
+            async def metricas():
+                if etapas["pagespeed"]:
+                    return await pagespeed(url)
+                return anterior["page_speed"]
+
+            saida, page_speed = await asyncio.gather(conteudo(), metricas(), return_exceptions=True)
+            if isinstance(saida, BaseException):
+                log.error(f"Erro ao processar {url}: {saida}")
+                return {"link": url, "erro": str(saida), "page_speed": {}}
+
+            resultado, validadores, hash_atual = saida
+            pagespeed_ok = etapas["pagespeed"] and isinstance(page_speed, dict)
+            if not isinstance(page_speed, dict):
+                page_speed = (anterior or {}).get("page_speed", {})
+            resultado["page_speed"] = page_speed
+            estado.registrar(url, pagina, validadores, hash_atual, pagespeed_ok, agora)
+            resumo.registrar(etapas)
+            resultado["incremental"] = etapas
+            return resultado
+
+        async def rastreado(url):
+            # `tempos` traz o tempo total da URL e a soma de cada etapa
+            with rastrear_url(url) as rastreio:
+                resultado = await processar(url)
+                if "erro" in resultado:
+                    rastreio.status = "erro"
+                resultado["tempos"] = rastreio.resumo()
+            return resultado
+
+        if incremental:
+            estado = estado or obter_estado_incremental()
+            armazem = armazem or obter_armazem()
+            resumo = resumo if resumo is not None else ResumoIncremental()
+            processar = processar_incremental
+
+        # Janela de URLs em andamento: a memória não cresce com o tamanho do lote,
+        # e `urls` pode ser um gerador
+        janela = 2 * (
+            (limite_extracao or LIMITE_EXTRACAO) + (limite_llm or LIMITE_LLM) + (limite_pagespeed or LIMITE_PAGESPEED)
+        )
+        tarefas = set()
+        vistas = set()
+        try:
+            for url in urls:
+                if url in vistas:
+                    continue
+                vistas.add(url)
+                tarefas.add(asyncio.create_task(rastreado(url)))
+                if len(tarefas) >= janela:
+                    prontas, tarefas = await asyncio.wait(tarefas, return_when=asyncio.FIRST_COMPLETED)
+                    for tarefa in prontas:
+                        yield tarefa.result()
+            while tarefas:
+                prontas, tarefas = await asyncio.wait(tarefas, return_when=asyncio.FIRST_COMPLETED)
+                for tarefa in prontas:
+                    yield tarefa.result()
+        finally:
+            for tarefa in tarefas:
+                tarefa.cancel()
+            await asyncio.gather(*tarefas, return_exceptions=True)
+            if "browser" in navegador:
+                await navegador["browser"].close()
+            await cliente_html.aclose()
+            if fechar_http:
+                await cliente_http.aclose()
+            if fechar_openai:
+                await cliente_openai.close()
+
+
+def _ler_urls(caminho, concluidas):
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            url = linha.strip()
+            if url.startswith("http") and url not in concluidas:
+                yield url
+
+
+async def _executar(args):
+    saida = Path(args.saida or Path("output_files") / f"avaliacoes_seo_{datetime.now():%Y%m%d_%H%M%S}.jsonl")
+    # Retomada: URLs que já têm resultado válido no arquivo de saída são puladas
+    concluidas = urls_concluidas(saida)
+    if concluidas:
+        print(f"Retomando {saida}: {len(concluidas)} URLs já concluídas serão puladas")
+
+    print("Analisando URLs em lote...")
+    armazem = obter_armazem()
+    resumo = ResumoIncremental() if args.incremental else None
+    with EscritorJSONL(saida) as escritor:
+        async for resultado in analisar_lote(
+            _ler_urls(args.arquivo, concluidas),
+            limite_extracao=args.extracao,
+            limite_llm=args.llm,
+            limite_pagespeed=args.pagespeed,
+            headless=not args.visivel,
+            modo_extracao=args.modo_extracao,
+            modo_llm=args.modo_llm,
+            incremental=args.incremental,
+            armazem=armazem,
+            resumo=resumo,
+        ):
+            with etapa("gravacao"):
+                escritor.escrever(resultado)
+                etapas = resultado.get("incremental")
+                # No modo incremental, URLs sem nenhuma etapa refeita não geram registro novo
+                if "erro" not in resultado and (etapas is None or etapas["avaliacao"] or etapas["pagespeed"]):
+                    armazem.salvar(resultado)
+            print(
+                f"[{escritor.escritos}] {resultado['link']} -> nota {resultado.get('nota_seo')} "
+                f"({resultado.get('metodo_extracao', 'erro')})"
+            )
+
+    if args.json:
+        print(f"Lista JSON exportada em {exportar_lista_json(saida, saida.with_suffix('.json'))}")
+    print(f"Processo finalizado. Resultados salvos em {saida}")
+    print(f"Cache de avaliações SEO: {obter_cache_seo().estatisticas()}")
+    if resumo is not None:
+        print(f"Resumo incremental: {resumo}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Análise SEO em lote, com etapas concorrentes.")
+    parser.add_argument("arquivo", help="arquivo texto com uma URL por linha")
+    parser.add_argument("--extracao", type=int, help="páginas abertas ao mesmo tempo")
+    parser.add_argument("--llm", type=int, help="chamadas simultâneas ao GPT")
+    parser.add_argument("--pagespeed", type=int, help="consultas simultâneas ao PageSpeed")
+    parser.add_argument("--modo-extracao", choices=["auto", "estatico", "playwright"], default="auto")
+    parser.add_argument("--modo-llm", choices=["sempre", "sugestoes", "limiar", "nunca"])
+    parser.add_argument("--visivel", action="store_true", help="mostra o navegador")
+    parser.add_argument("--saida", help="arquivo JSONL de resultados; se já existir, a execução é retomada")
+    parser.add_argument("--json", action="store_true", help="exporta também a lista JSON no formato antigo")
+    parser.add_argument("--incremental", action="store_true",
+                        help="refaz só as etapas necessárias desde a última análise de cada URL")
+    asyncio.run(_executar(parser.parse_args()))
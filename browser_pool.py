@@ -0,0 +1,210 @@
+import atexit
+import contextvars
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from telemetry import etapa, obter_logger
+
+log = obter_logger("browser_pool")
+
+USER_AGENT_PADRAO = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+)
+
+OPCOES_CONTEXTO_PADRAO = {
+    "user_agent": USER_AGENT_PADRAO,
+    "viewport": {"width": 1280, "height": 800},
+    "timezone_id": "America/Sao_Paulo",
+    "locale": "pt-BR",
+}
+
+
+def _env_bool(nome, padrao):
+    valor = os.getenv(nome)
+    if valor is None:
+        return padrao
+    return valor.strip().lower() not in ("0", "false", "no", "nao", "não", "")
+
+
+class PoolNavegadores:
+    """Pool de navegadores Chromium mantidos abertos entre extrações.
+
+    Cada navegador vive em uma thread própria (a API síncrona do Playwright
+    só pode ser usada na thread que a criou). As extrações são enviadas como
+    funções que recebem uma `page` nova, aberta em um contexto já aquecido.
+    O navegador é reciclado após `paginas_por_navegador` páginas ou quando cai.
+    """
+
+    def __init__(self, tamanho=None, headless=None, paginas_por_navegador=None,
+                 args_navegador=None, opcoes_contexto=None):
+        self.tamanho = tamanho or int(os.getenv("BROWSER_POOL_SIZE", "2"))
+        self.headless = _env_bool("BROWSER_HEADLESS", True) if headless is None else headless
+        self.paginas_por_navegador = paginas_por_navegador or int(
+            os.getenv("BROWSER_PAGES_PER_BROWSER", "50")
+        )
+        if args_navegador is None:
+            args_navegador = [] if self.headless else ["--start-maximized"]
+        self.args_navegador = args_navegador
+        self.opcoes_contexto = dict(OPCOES_CONTEXTO_PADRAO, **(opcoes_contexto or {}))
+
+        self._fila = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._fechado = False
+
+    def executar(self, funcao, timeout=None):
+        """Executa `funcao(page)` em um navegador do pool e devolve o resultado."""
+        future = Future()
+        with self._lock:
+            if self._fechado:
+                raise RuntimeError("Pool de navegadores já foi encerrado.")
+            self._iniciar_workers()
+            # A função roda na thread do navegador com o contexto de quem chamou,
+            # para que as etapas medidas entrem no rastreio da URL
+            self._fila.put((funcao, future, contextvars.copy_context()))
+        return future.result(timeout)
+
+    def fechar(self):
+        with self._lock:
+            if self._fechado:
+                return
+            self._fechado = True
+            for _ in self._threads:
+                self._fila.put(None)
+        for thread in self._threads:
+            thread.join(timeout=30)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def _iniciar_workers(self):
+        while len(self._threads) < self.tamanho:
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"navegador-{len(self._threads)}",
+                daemon=True,
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _abrir_navegador(self, playwright):
+        with etapa("navegador.abrir"):
+            navegador = playwright.chromium.launch(
+                headless=self.headless, args=self.args_navegador
+            )
+            contexto = navegador.new_context(**self.opcoes_contexto)
+        return navegador, contexto
+
+    @staticmethod
+    def _fechar_navegador(navegador):
+        if navegador is None:
+            return
+        try:
+            navegador.close()
+        except Exception:
+            pass
+
+    def _worker(self):
+        try:
+            from playwright.sync_api import sync_playwright
+
+            p = sync_playwright().start()
+        except Exception as e:
+            self._descartar_worker(e)
+            return
+        try:
+            self._atender(p)
+        finally:
+            p.stop()
+
+    def _descartar_worker(self, erro):
+        # Sem o driver do Playwright a thread não serve ninguém: sai do pool (a
+        # próxima chamada tenta de novo) e as tarefas na fila falham na hora
+        log.error(f"Playwright não iniciou: {erro}")
+        with self._lock:
+            self._threads.remove(threading.current_thread())
+            sinais = 0
+            while True:
+                try:
+                    tarefa = self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if tarefa is None:
+                    sinais += 1
+                elif tarefa[1].set_running_or_notify_cancel():
+                    tarefa[1].set_exception(erro)
+            # Os sinais de encerramento são das outras threads
+            for _ in range(sinais):
+                self._fila.put(None)
+
+    def _atender(self, p):
+        navegador = contexto = None
+        paginas_abertas = 0
+
+        while True:
+            tarefa = self._fila.get()
+            if tarefa is None:
+                break
+
+            funcao, future, contexto_chamada = tarefa
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            caiu = False
+            try:
+                if (
+                    navegador is None
+                    or not navegador.is_connected()
+                    or paginas_abertas >= self.paginas_por_navegador
+                ):
+                    self._fechar_navegador(navegador)
+                    navegador, contexto = contexto_chamada.run(self._abrir_navegador, p)
+                    paginas_abertas = 0
+
+                page = contexto.new_page()
+                paginas_abertas += 1
+
+                def marcar_queda(_):
+                    nonlocal caiu
+                    caiu = True
+
+                page.on("crash", marcar_queda)
+                try:
+                    resultado = contexto_chamada.run(funcao, page)
+                finally:
+                    try:
+                        page.close()
+                    except Exception:
+                        caiu = True
+
+                future.set_result(resultado)
+
+            except Exception as e:
+                future.set_exception(e)
+
+            if caiu or (navegador is not None and not navegador.is_connected()):
+                log.warning("Navegador do pool caiu, será reiniciado")
+                self._fechar_navegador(navegador)
+                navegador = contexto = None
+
+        self._fechar_navegador(navegador)
+
+
+_pool_global = None
+_pool_global_lock = threading.Lock()
+
+
+def obter_pool(**kwargs):
+    """Devolve o pool compartilhado do processo, criando-o na primeira chamada."""
+    global _pool_global
+    with _pool_global_lock:
+        if _pool_global is None:
+            _pool_global = PoolNavegadores(**kwargs)
+            atexit.register(_pool_global.fechar)
+        return _pool_global
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+def chave_hash(*partes):
+    # Serializa as partes de forma estável antes do hash, para que a mesma
+    # entrada gere sempre a mesma chave
+    bruto = json.dumps(partes, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+class CacheSQLite:
+    """Cache chave -> JSON em SQLite, com expiração (TTL) e descarte LRU por tamanho."""
+
+    def __init__(self, caminho, tabela="cache", ttl=None, max_itens=None):
+        self.caminho = str(caminho)
+        self.tabela = tabela
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self.hits = 0
+        self.misses = 0
+
+        if self.caminho != ":memory:":
+            Path(self.caminho).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.caminho, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS {tabela} (
+                chave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                ultimo_acesso REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{tabela}_acesso ON {tabela} (ultimo_acesso)"
+        )
+        self._conn.commit()
+
+    def obter(self, chave):
+        agora = time.time()
+        with self._lock:
+            linha = self._conn.execute(
+                f"SELECT valor, criado_em FROM {self.tabela} WHERE chave = ?", (chave,)
+            ).fetchone()
+
+            if linha is None:
+                self.misses += 1
+                return None
+
+            valor, criado_em = linha
+            if self.ttl is not None and agora - criado_em > self.ttl:
+                self._conn.execute(f"DELETE FROM {self.tabela} WHERE chave = ?", (chave,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                f"UPDATE {self.tabela} SET ultimo_acesso = ? WHERE chave = ?", (agora, chave)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(valor)
+
+    def salvar(self, chave, valor):
+        agora = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.tabela} (chave, valor, criado_em, ultimo_acesso) "
+                "VALUES (?, ?, ?, ?)",
+                (chave, json.dumps(valor, ensure_ascii=False), agora, agora),
+            )
+            if self.max_itens is not None:
+                total = self._conn.execute(f"SELECT COUNT(*) FROM {self.tabela}").fetchone()[0]
+                excedente = total - self.max_itens
+                if excedente > 0:
+                    self._conn.execute(
+                        f"DELETE FROM {self.tabela} WHERE chave IN ("
+                        f"SELECT chave FROM {self.tabela} ORDER BY ultimo_acesso LIMIT ?)",
+                        (excedente,),
+                    )
+            self._conn.commit()
+
+    def limpar_expirados(self):
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.tabela} WHERE criado_em < ?", (time.time() - self.ttl,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def estatisticas(self):
+        with self._lock:
+            itens = self._conn.execute(f"SELECT COUNT(*) FROM {self.tabela}").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": round(self.hits / total, 3) if total else 0.0,
+            "itens": itens,
+        }
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache_seo = None
+_cache_seo_lock = threading.Lock()
+
+
+def obter_cache_seo():
+    global _cache_seo
+    with _cache_seo_lock:
+        if _cache_seo is None:
+            _cache_seo = CacheSQLite(
+                os.getenv("SEO_CACHE_PATH", "cache/seo.sqlite"),
+                tabela="avaliacoes_seo",
+                ttl=float(os.getenv("SEO_CACHE_TTL", 7 * 24 * 3600)),
+                max_itens=int(os.getenv("SEO_CACHE_MAX_ITEMS", "10000")),
+            )
+        return _cache_seo
@@ -0,0 +1,480 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+from jsonl_output import EscritorJSONL, urls_concluidas
+from rate_limit import BaldeTokens
+from static_extractor import extrair_estatico, obter_sessao_http
+from telemetry import obter_logger
+from url_discovery import DescobertaURLs, normalizar_url
+
+# Limites de educação com o site rastreado (podem ser sobrescritos na chamada)
+TRABALHADORES = int(os.getenv("CRAWL_WORKERS", "8"))
+TAXA_POR_HOST = float(os.getenv("CRAWL_RATE", "2"))            # requisições por segundo
+RAJADA_POR_HOST = int(os.getenv("CRAWL_BURST", "2"))
+CONCORRENCIA_POR_HOST = int(os.getenv("CRAWL_HOST_CONCURRENCY", "2"))
+AGENTE_ROBOTS = os.getenv("CRAWL_ROBOTS_AGENT", "seo-blog-analyzer")
+
+log = obter_logger("crawler")
+
+# Extensões que nunca são páginas de artigo
+_EXTENSOES_IGNORADAS = re.compile(
+    r"\.(jpe?g|png|gif|webp|svg|ico|pdf|zip|gz|mp[34]|webm|css|js|json|xml|txt|woff2?)$", re.IGNORECASE
+)
+
+
+class FiltroBloom:
+    """Conjunto aproximado de URLs já vistas: ~1,8 byte por URL com 0,1% de falso positivo.
+
+    Um falso positivo só faz o rastreador deixar de visitar uma URL; nunca
+    visita a mesma duas vezes.
+    """
+
+    def __init__(self, capacidade=10_000_000, taxa_erro=0.001, bits=None):
+        self.capacidade = capacidade
+        self.taxa_erro = taxa_erro
+        self.m = math.ceil(-capacidade * math.log(taxa_erro) / math.log(2) ** 2)
+        self.k = max(1, round(self.m / capacidade * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.m + 7) // 8)
+        self.itens = 0
+
+    def _posicoes(self, item):
+        # Duplo hash (Kirsch-Mitzenmacher): k posições a partir de dois valores de 64 bits
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._posicoes(item))
+
+    def adicionar(self, item):
+        """Adiciona o item; devolve False se ele (provavelmente) já estava no filtro."""
+        novo = False
+        for p in self._posicoes(item):
+            byte, bit = p >> 3, 1 << (p & 7)
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                novo = True
+        self.itens += novo
+        return novo
+
+    def salvar(self, caminho):
+        cabecalho = json.dumps({"capacidade": self.capacidade, "taxa_erro": self.taxa_erro, "itens": self.itens})
+        temporario = Path(f"{caminho}.tmp")
+        with open(temporario, "wb") as f:
+            f.write(cabecalho.encode("utf-8") + b"\n")
+            f.write(self.bits)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho):
+        with open(caminho, "rb") as f:
+            cabecalho = json.loads(f.readline())
+            filtro = cls(cabecalho["capacidade"], cabecalho["taxa_erro"], bytearray(f.read()))
+        filtro.itens = cabecalho["itens"]
+        return filtro
+
+
+class Fronteira:
+    """Fila de prioridade das URLs pendentes, em SQLite para pausar e retomar.
+
+    URLs retiradas ficam marcadas como em andamento até serem concluídas; ao
+    reabrir a fronteira, as que estavam em andamento voltam para a fila.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = str(caminho)
+        if self.caminho != ":memory:":
+            Path(self.caminho).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.caminho)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pendentes (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                host TEXT NOT NULL,
+                prioridade REAL NOT NULL,
+                profundidade INTEGER NOT NULL,
+                em_andamento INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_pendentes_fila ON pendentes (em_andamento, prioridade, id);
+            CREATE TABLE IF NOT EXISTS contadores (nome TEXT PRIMARY KEY, valor INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS hosts (host TEXT PRIMARY KEY);
+            UPDATE pendentes SET em_andamento = 0 WHERE em_andamento = 1;
+            """
+        )
+        self._conn.commit()
+
+    def adicionar(self, url, profundidade, prioridade):
+        self._conn.execute(
+            "INSERT OR IGNORE INTO pendentes (url, host, prioridade, profundidade) VALUES (?, ?, ?, ?)",
+            (url, urlsplit(url).netloc, prioridade, profundidade),
+        )
+
+    def retirar(self, hosts_ocupados=()):
+        """Próxima URL (id, url, host, profundidade) de um host livre, ou None."""
+        marcadores = ",".join("?" * len(hosts_ocupados))
+        filtro_hosts = f"AND host NOT IN ({marcadores})" if hosts_ocupados else ""
+        linha = self._conn.execute(
+            f"SELECT id, url, host, profundidade FROM pendentes WHERE em_andamento = 0 {filtro_hosts} "
+            "ORDER BY prioridade, id LIMIT 1",
+            tuple(hosts_ocupados),
+        ).fetchone()
+        if linha:
+            self._conn.execute("UPDATE pendentes SET em_andamento = 1 WHERE id = ?", (linha[0],))
+        return linha
+
+    def devolver(self, id_):
+        self._conn.execute("UPDATE pendentes SET em_andamento = 0 WHERE id = ?", (id_,))
+
+    def concluir(self, id_):
+        self._conn.execute("DELETE FROM pendentes WHERE id = ?", (id_,))
+
+    def pendentes(self):
+        return self._conn.execute("SELECT COUNT(*) FROM pendentes WHERE em_andamento = 0").fetchone()[0]
+
+    def adicionar_host(self, host):
+        self._conn.execute("INSERT OR IGNORE INTO hosts (host) VALUES (?)", (host,))
+
+    def hosts(self):
+        return {host for (host,) in self._conn.execute("SELECT host FROM hosts")}
+
+    def incrementar(self, nome, valor=1):
+        self._conn.execute(
+            "INSERT INTO contadores (nome, valor) VALUES (?, ?) "
+            "ON CONFLICT(nome) DO UPDATE SET valor = valor + excluded.valor",
+            (nome, valor),
+        )
+
+    def contadores(self):
+        return dict(self._conn.execute("SELECT nome, valor FROM contadores"))
+
+    def salvar(self):
+        self._conn.commit()
+
+    def fechar(self):
+        self._conn.commit()
+        self._conn.close()
+
+
+def prioridade_padrao(url, profundidade):
+    # Menor = antes. Largura primeiro; listagens com query string e paginação ficam para depois
+    partes = urlsplit(url)
+    prioridade = profundidade * 10
+    if partes.query:
+        prioridade += 5
+    if re.search(r"/(page|pagina|tag|categoria|category|autor|author)/", partes.path):
+        prioridade += 3
+    return prioridade
+
+
+def extrair_pagina(url, pool=None, modo=None):
+    """Extrator padrão do rastreador, com o mesmo fluxo de main.extrair_conteudo.
+
+    A diferença é que, no modo "estatico", uma página insuficiente (listagem,
+    home) é devolvida com os links em vez de gerar erro, para o rastreio seguir.
+    """
+    from main import MODO_EXTRACAO, extrair_conteudo_site
+
+    modo = modo or MODO_EXTRACAO
+    motivo = None
+    if modo != "playwright":
+        resultado, motivo = extrair_estatico(url)
+        if resultado is None:
+            raise Exception(f"Falha ao baixar {url}: {motivo}")
+        resultado["metodo_extracao"] = "estatico"
+        if motivo is None:
+            return resultado
+        if modo == "estatico":
+            resultado["motivo_fallback"] = motivo
+            return resultado
+
+    resultado = extrair_conteudo_site(url, pool=pool)
+    resultado["metodo_extracao"] = "playwright"
+    if motivo:
+        resultado["motivo_fallback"] = motivo
+    return resultado
+
+
+class Rastreador:
+    """Rastreia um site inteiro entregando cada página ao extrator.
+
+    Mantém `trabalhadores` extrações em paralelo, mas nunca mais que
+    `concorrencia_por_host` no mesmo host nem acima da taxa do token bucket
+    (reduzida pelo Crawl-delay do robots.txt, quando houver). O estado fica em
+    `diretorio` (fronteira SQLite + filtro de Bloom), então uma execução
+    interrompida continua de onde parou.
+    """
+
+    def __init__(self, diretorio, sementes=(), extrator=None, trabalhadores=None, taxa=None, rajada=None,
+                 concorrencia_por_host=None, profundidade_maxima=None, incluir=None, excluir=None,
+                 respeitar_robots=True, capacidade=10_000_000, sessao=None, prioridade=prioridade_padrao):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.extrator = extrator or extrair_pagina
+        self.trabalhadores = trabalhadores or TRABALHADORES
+        self.taxa = taxa or TAXA_POR_HOST
+        self.rajada = rajada or RAJADA_POR_HOST
+        self.concorrencia_por_host = concorrencia_por_host or CONCORRENCIA_POR_HOST
+        self.profundidade_maxima = profundidade_maxima
+        self.incluir = [re.compile(p) for p in (incluir or [])]
+        self.excluir = [re.compile(p) for p in (excluir or [])]
+        self.respeitar_robots = respeitar_robots
+        self.sessao = sessao or obter_sessao_http()
+        self.prioridade = prioridade
+
+        self.fronteira = Fronteira(self.diretorio / "fronteira.sqlite")
+        caminho_bloom = self.diretorio / "vistas.bloom"
+        self.vistas = FiltroBloom.carregar(caminho_bloom) if caminho_bloom.exists() else FiltroBloom(capacidade)
+        self._caminho_bloom = caminho_bloom
+
+        self._baldes = {}
+        self._em_uso = {}
+        self._robots = {}
+        # Só os hosts das sementes entram no escopo; ficam salvos para a retomada
+        for semente in sementes:
+            self.fronteira.adicionar_host(urlsplit(normalizar_url(semente)).netloc)
+        self.hosts = self.fronteira.hosts()
+        for semente in sementes:
+            self.enfileirar(semente, 0)
+        self.fronteira.salvar()
+
+    def no_escopo(self, url, profundidade):
+        partes = urlsplit(url)
+        if partes.scheme not in ("http", "https") or partes.netloc not in self.hosts:
+            return False
+        if self.profundidade_maxima is not None and profundidade > self.profundidade_maxima:
+            return False
+        if _EXTENSOES_IGNORADAS.search(partes.path):
+            return False
+        if self.incluir and profundidade > 0 and not any(p.search(partes.path) for p in self.incluir):
+            return False
+        return not any(p.search(partes.path) for p in self.excluir)
+
+    def enfileirar(self, url, profundidade):
+        url = normalizar_url(url)
+        if not self.no_escopo(url, profundidade) or not self.vistas.adicionar(url):
+            return False
+        self.fronteira.adicionar(url, profundidade, self.prioridade(url, profundidade))
+        return True
+
+    def semear_sitemaps(self, origem, limite=None):
+        """Coloca na fronteira as URLs dos sitemaps/feeds do site (profundidade 0)."""
+        host = urlsplit(normalizar_url(origem)).netloc
+        self.fronteira.adicionar_host(host)
+        self.hosts.add(host)
+        total = 0
+        for entrada in DescobertaURLs(sessao=self.sessao).descobrir(origem, limite):
+            total += self.enfileirar(entrada["url"], 0)
+        self.fronteira.salvar()
+        return total
+
+    def _regras_robots(self, host, esquema):
+        if host not in self._robots:
+            regras = RobotFileParser()
+            try:
+                response = self.sessao.get(f"{esquema}://{host}/robots.txt", timeout=20)
+                if response.status_code >= 500:
+                    regras.disallow_all = True
+                elif response.status_code < 400:
+                    regras.parse(response.text.splitlines())
+                    regras.modified()
+                else:
+                    regras.allow_all = True
+            except Exception as e:
+                log.warning(f"robots.txt de {host} indisponível ({e}); host ignorado")
+                regras.disallow_all = True
+            self._robots[host] = regras
+            # Crawl-delay e Request-rate só podem reduzir a taxa configurada
+            taxa = self.taxa
+            atraso = regras.crawl_delay(AGENTE_ROBOTS)
+            if atraso:
+                taxa = min(taxa, 1 / float(atraso))
+            limite = regras.request_rate(AGENTE_ROBOTS)
+            if limite:
+                taxa = min(taxa, limite.requests / limite.seconds)
+            self._baldes[host] = BaldeTokens(taxa, 1 if taxa < self.taxa else self.rajada)
+        return self._robots[host]
+
+    def _permitido(self, url):
+        if not self.respeitar_robots:
+            return True
+        partes = urlsplit(url)
+        return self._regras_robots(partes.netloc, partes.scheme).can_fetch(AGENTE_ROBOTS, url)
+
+    def _balde(self, host):
+        if host not in self._baldes:
+            self._baldes[host] = BaldeTokens(self.taxa, self.rajada)
+        return self._baldes[host]
+
+    def _proxima(self):
+        """Retorna (item, espera): o próximo item liberado, ou quanto esperar por um token."""
+        while True:
+            ocupados, espera = [], None
+            for host, em_uso in self._em_uso.items():
+                aguardar = self._balde(host).espera()
+                if em_uso >= self.concorrencia_por_host or aguardar > 0:
+                    ocupados.append(host)
+                    if em_uso < self.concorrencia_por_host:
+                        espera = aguardar if espera is None else min(espera, aguardar)
+
+            item = self.fronteira.retirar(ocupados)
+            if item is None:
+                return None, espera
+            id_, url, host, _ = item
+            if not self._permitido(url):
+                self.fronteira.concluir(id_)
+                self.fronteira.incrementar("bloqueadas_robots")
+                continue
+            balde = self._balde(host)
+            aguardar = balde.espera()
+            if aguardar > 0:
+                # Host novo cujo robots.txt acabou de reduzir a taxa: devolve para a fila
+                self.fronteira.devolver(id_)
+                self._em_uso.setdefault(host, 0)
+                continue
+            balde.reservar()
+            self._em_uso[host] = self._em_uso.get(host, 0) + 1
+            return item, 0.0
+
+    def _registrar_links(self, resultado, profundidade):
+        # A canônica conta como vista: a mesma página com outra URL não é visitada de novo
+        if resultado.get("canonical"):
+            self.vistas.adicionar(normalizar_url(resultado["canonical"]))
+        return sum(self.enfileirar(url, profundidade + 1) for url in resultado.get("urls_internas", []))
+
+    def rastrear(self, max_paginas=None, intervalo_salvar=500):
+        """Gera o resultado da extração de cada página, à medida que ficam prontas.
+
+        Páginas que falham geram {"link", "erro"}. Interromper o gerador (ou o
+        processo) preserva a fronteira; a próxima chamada continua dela. O estado
+        é gravado a cada `intervalo_salvar` páginas (None: só no fim), sempre
+        depois de o consumidor receber a página, para que uma queda repita páginas
+        em vez de perdê-las.
+        """
+        feitas = 0
+        em_andamento = {}
+        executor = ThreadPoolExecutor(self.trabalhadores)
+        try:
+            while True:
+                espera = None
+                while len(em_andamento) < self.trabalhadores and (
+                    max_paginas is None or feitas + len(em_andamento) < max_paginas
+                ):
+                    item, espera = self._proxima()
+                    if item is None:
+                        break
+                    em_andamento[executor.submit(self.extrator, item[1])] = item
+
+                if not em_andamento:
+                    if espera is None:
+                        break
+                    time.sleep(espera)
+                    continue
+
+                concluidas, _ = wait(em_andamento, timeout=espera, return_when=FIRST_COMPLETED)
+                for futuro in concluidas:
+                    id_, url, host, profundidade = em_andamento.pop(futuro)
+                    self._em_uso[host] -= 1
+                    try:
+                        resultado = futuro.result()
+                        resultado["profundidade"] = profundidade
+                        self.fronteira.incrementar("links_novos", self._registrar_links(resultado, profundidade))
+                        self.fronteira.incrementar("extraidas")
+                    except Exception as e:
+                        resultado = {"link": url, "profundidade": profundidade, "erro": str(e)}
+                        self.fronteira.incrementar("erros")
+                    self.fronteira.concluir(id_)
+                    feitas += 1
+                    yield resultado
+                    if intervalo_salvar and feitas % intervalo_salvar == 0:
+                        self.salvar()
+        finally:
+            for futuro in em_andamento:
+                futuro.cancel()
+            executor.shutdown(wait=True)
+            self.salvar()
+
+    def marcar_concluidas(self, urls):
+        # Páginas que já estão na saída não voltam para a fila, mesmo que o filtro
+        # de Bloom gravado seja de antes delas
+        for url in urls:
+            self.vistas.adicionar(normalizar_url(url))
+
+    def salvar(self):
+        self.fronteira.salvar()
+        self.vistas.salvar(self._caminho_bloom)
+
+    def estatisticas(self):
+        return {**self.fronteira.contadores(), "pendentes": self.fronteira.pendentes(), "vistas": self.vistas.itens}
+
+    def fechar(self):
+        self.salvar()
+        self.fronteira.fechar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rastreia um blog inteiro e extrai o conteúdo de cada página.")
+    parser.add_argument("sementes", nargs="*", help="URLs iniciais (omitir para retomar um rastreio)")
+    parser.add_argument("--nome", required=True, help="nome do rastreio; o estado fica em crawl/<nome>")
+    parser.add_argument("--max-paginas", type=int)
+    parser.add_argument("--profundidade", type=int, help="profundidade máxima a partir das sementes")
+    parser.add_argument("--incluir", action="append", help="regex que o caminho deve conter (pode repetir)")
+    parser.add_argument("--excluir", action="append", help="regex de caminhos ignorados (pode repetir)")
+    parser.add_argument("--sitemaps", action="store_true", help="semeia também com os sitemaps/feeds do site")
+    parser.add_argument("--trabalhadores", type=int)
+    parser.add_argument("--taxa", type=float, help="requisições por segundo por host")
+    parser.add_argument("--por-host", type=int, help="requisições simultâneas por host")
+    parser.add_argument("--ignorar-robots", action="store_true")
+    args = parser.parse_args()
+
+    rastreador = Rastreador(
+        Path(os.getenv("CRAWL_DIR", "crawl")) / args.nome,
+        sementes=args.sementes,
+        trabalhadores=args.trabalhadores,
+        taxa=args.taxa,
+        concorrencia_por_host=args.por_host,
+        profundidade_maxima=args.profundidade,
+        incluir=args.incluir,
+        excluir=args.excluir,
+        respeitar_robots=not args.ignorar_robots,
+    )
+    if args.sitemaps:
+        for semente in args.sementes:
+            print(f"{rastreador.semear_sitemaps(semente)} URLs adicionadas a partir dos sitemaps de {semente}")
+
+    # JSONL: pode ser anexado ao retomar e é aceito pelo openai_batch.py preparar
+    saida = Path("output_files") / f"crawl_{args.nome}.jsonl"
+    # Ao retomar, a saída manda: o que já foi gravado não é gravado de novo
+    concluidas = urls_concluidas(saida)
+    rastreador.marcar_concluidas(concluidas)
+    try:
+        with EscritorJSONL(saida) as escritor:
+            for resultado in rastreador.rastrear(args.max_paginas, intervalo_salvar=None):
+                if "erro" in resultado:
+                    print(f"[ERRO] {resultado['link']}: {resultado['erro']}")
+                    continue
+                if resultado["link"] in concluidas:
+                    continue
+                if escritor.escrever(resultado):
+                    # A fronteira acompanha o fsync da saída; o filtro de Bloom,
+                    # maior, só no fim (as páginas da saída o completam na retomada)
+                    rastreador.fronteira.salvar()
+                print(f"[{resultado['profundidade']}] {resultado['link']} ({resultado['metodo_extracao']})")
+    except KeyboardInterrupt:
+        print("Rastreio pausado; rode de novo com o mesmo --nome para continuar.")
+    finally:
+        estatisticas = rastreador.estatisticas()
+        rastreador.fechar()
+        print(f"Páginas em {saida}. Estatísticas: {estatisticas}")
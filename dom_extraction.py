@@ -0,0 +1,92 @@
+from urllib.parse import urlsplit
+
+from resource_policy import dominio_base
+
+# Executado dentro da página em um único page.evaluate: evita uma ida e volta
+# ao navegador por seletor e já traz os sinais estruturais de SEO
+SCRIPT_EXTRACAO = """
+(dominioBase) => {
+  const texto = (el) => (el.textContent || "").trim();
+  const atributo = (seletor, nome) => {
+    const el = document.querySelector(seletor);
+    return el ? (el.getAttribute(nome) || "").trim() : "";
+  };
+
+  const h1 = document.querySelector("h1");
+  // Headings e parágrafos na ordem do documento: cada heading guarda o índice
+  // do primeiro parágrafo que vem depois dele, para separar o texto por seção
+  const headings = [];
+  const paragrafos = [];
+  for (const el of document.querySelectorAll("h1, h2, h3, h4, h5, h6, p")) {
+    const t = texto(el);
+    if (!t) continue;
+    if (el.tagName === "P") paragrafos.push(t);
+    else headings.push({ nivel: Number(el.tagName[1]), texto: t, paragrafo: paragrafos.length });
+  }
+
+  const imagens = Array.from(document.querySelectorAll("img"));
+  const imagensComAlt = imagens.filter((img) => (img.getAttribute("alt") || "").trim()).length;
+
+  const hreflang = Array.from(document.querySelectorAll("link[rel='alternate'][hreflang]"), (l) => ({
+    lang: l.getAttribute("hreflang"),
+    href: l.href,
+  }));
+
+  let internos = 0, externos = 0, nofollow = 0;
+  const urlsInternas = new Set();
+  for (const a of document.querySelectorAll("a[href]")) {
+    let url;
+    try { url = new URL(a.getAttribute("href"), document.baseURI); } catch (e) { continue; }
+    if (url.protocol !== "http:" && url.protocol !== "https:") continue;
+    const host = url.hostname.toLowerCase();
+    if (host === dominioBase || host.endsWith("." + dominioBase)) {
+      internos++;
+      url.hash = "";
+      urlsInternas.add(url.href);
+    } else {
+      externos++;
+    }
+    if ((a.getAttribute("rel") || "").toLowerCase().includes("nofollow")) nofollow++;
+  }
+
+  return {
+    titulo: h1 ? texto(h1) : "",
+    headings,
+    paragrafos,
+    meta_description: atributo("meta[name='description']", "content"),
+    canonical: atributo("link[rel='canonical']", "href"),
+    hreflang,
+    imagens: { total: imagens.length, com_alt: imagensComAlt },
+    links: { internos, externos, nofollow },
+    urls_internas: Array.from(urlsInternas),
+  };
+}
+"""
+
+
+def dominio_da_url(url):
+    return dominio_base(urlsplit(url).hostname)
+
+
+def montar_resultado(url, dados):
+    # Converte o retorno do script (ou do parser estático) no dicionário de
+    # resultado, mantendo as chaves antigas titulo/subtitulos/texto
+    headings = dados.get("headings", [])
+    imagens = dados.get("imagens", {"total": 0, "com_alt": 0})
+
+    return {
+        'link': url,
+        'titulo': (dados.get("titulo") or "").strip(),
+        'subtitulos': [h["texto"] for h in headings if h["nivel"] in (2, 3)],
+        'texto': "\n\n".join(p.strip() for p in dados.get("paragrafos", []) if p.strip()),
+        'headings': headings,
+        'meta_description': dados.get("meta_description", ""),
+        'canonical': dados.get("canonical", ""),
+        'hreflang': dados.get("hreflang", []),
+        'imagens': {
+            **imagens,
+            "cobertura_alt": round(imagens["com_alt"] / imagens["total"], 3) if imagens["total"] else None,
+        },
+        'links': dados.get("links", {"internos": 0, "externos": 0, "nofollow": 0}),
+        'urls_internas': dados.get("urls_internas", []),
+    }
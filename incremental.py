@@ -0,0 +1,183 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+# O PageSpeed não depende do texto do artigo: é atualizado por calendário próprio
+INTERVALO_PAGESPEED = float(os.getenv("INCREMENTAL_PAGESPEED_DAYS", "7")) * 24 * 3600
+
+ETAPAS = ("extracao", "avaliacao", "pagespeed")
+
+# Campos gerados por finalizar_avaliacao, reaproveitados quando o conteúdo não muda
+CAMPOS_AVALIACAO = (
+    "nota_seo",
+    "explicacao",
+    "sugestoes",
+    "origem_avaliacao",
+    "nota_local",
+    "detalhes_nota_local",
+)
+
+_ESPACOS = re.compile(r"\s+")
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize("NFC", texto or "")
+    return _ESPACOS.sub(" ", texto).strip().lower()
+
+
+def hash_conteudo(resultado):
+    """Hash do conteúdo relevante para o SEO, insensível a espaços e maiúsculas.
+
+    Só entra o que a avaliação usa; mudanças de layout, anúncios ou contadores
+    fora do texto não disparam uma nova avaliação.
+    """
+    partes = [
+        resultado.get("titulo"),
+        *(f"h{h['nivel']} {h['texto']}" for h in resultado.get("headings", [])),
+        resultado.get("texto"),
+        resultado.get("meta_description"),
+        resultado.get("canonical"),
+    ]
+    bruto = "\n".join(_normalizar(p) for p in partes)
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+def cabecalhos_condicionais(pagina):
+    cabecalhos = {}
+    if pagina.get("etag"):
+        cabecalhos["If-None-Match"] = pagina["etag"]
+    if pagina.get("last_modified"):
+        cabecalhos["If-Modified-Since"] = pagina["last_modified"]
+    return cabecalhos
+
+
+def avaliacao_anterior(anterior):
+    # Avaliações que terminaram em erro não são reaproveitadas
+    if not anterior or anterior.get("nota_seo") is None:
+        return None
+    return {campo: anterior[campo] for campo in CAMPOS_AVALIACAO if campo in anterior}
+
+
+def reaproveitar_conteudo(resultado, anterior, pagina):
+    """Compara a extração atual com a última análise da URL.
+
+    `resultado` é None quando o servidor respondeu 304; nesse caso o conteúdo da
+    última análise é reutilizado. Retorna (resultado, hash, avaliação): a
+    avaliação vem preenchida só quando o conteúdo não mudou.
+    """
+    if resultado is None:
+        resultado = {k: v for k, v in anterior.items() if not k.startswith("_")}
+        hash_atual = pagina.get("hash_conteudo") or hash_conteudo(resultado)
+    else:
+        hash_atual = hash_conteudo(resultado)
+
+    avaliacao = None
+    if hash_atual == pagina.get("hash_conteudo"):
+        avaliacao = avaliacao_anterior(anterior)
+    return resultado, hash_atual, avaliacao
+
+
+def pagespeed_vencido(pagina, anterior, agora=None, intervalo=None):
+    intervalo = INTERVALO_PAGESPEED if intervalo is None else intervalo
+    if not anterior or not anterior.get("page_speed") or not pagina.get("pagespeed_em"):
+        return True
+    return (agora or time.time()) - pagina["pagespeed_em"] >= intervalo
+
+
+class ResumoIncremental:
+    """Conta, por etapa, quantas URLs executaram a etapa e quantas a pularam."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.contagem = {etapa: {"executada": 0, "pulada": 0} for etapa in ETAPAS}
+
+    def registrar(self, etapas):
+        with self._lock:
+            for etapa, executada in etapas.items():
+                self.contagem[etapa]["executada" if executada else "pulada"] += 1
+
+    def somar(self, contagem):
+        # Junta a `contagem` de outro resumo (de outro processo, por exemplo)
+        with self._lock:
+            for etapa, c in contagem.items():
+                for chave, valor in c.items():
+                    self.contagem[etapa][chave] += valor
+
+    def __str__(self):
+        return ", ".join(
+            f"{etapa}: {c['executada']} executadas / {c['pulada']} puladas"
+            for etapa, c in self.contagem.items()
+        )
+
+
+class EstadoIncremental:
+    """Validadores HTTP, hash do conteúdo e datas da última verificação de cada URL."""
+
+    def __init__(self, caminho):
+        self.caminho = str(caminho)
+        if self.caminho != ":memory:":
+            Path(self.caminho).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.caminho, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS paginas (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                hash_conteudo TEXT,
+                verificado_em REAL,
+                alterado_em REAL,
+                pagespeed_em REAL
+            )"""
+        )
+        self._conn.commit()
+
+    def obter(self, url):
+        with self._lock:
+            linha = self._conn.execute("SELECT * FROM paginas WHERE url = ?", (url,)).fetchone()
+        return dict(linha) if linha else {}
+
+    def registrar(self, url, pagina, validadores, hash_atual, pagespeed_atualizado, agora=None):
+        """Grava o resultado da verificação; validadores ausentes na resposta mantêm os anteriores."""
+        agora = agora or time.time()
+        alterado = hash_atual != pagina.get("hash_conteudo")
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO paginas "
+                "(url, etag, last_modified, hash_conteudo, verificado_em, alterado_em, pagespeed_em) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    validadores.get("etag") or pagina.get("etag"),
+                    validadores.get("last_modified") or pagina.get("last_modified"),
+                    hash_atual,
+                    agora,
+                    agora if alterado else pagina.get("alterado_em"),
+                    agora if pagespeed_atualizado else pagina.get("pagespeed_em"),
+                ),
+            )
+            self._conn.commit()
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+_estado = None
+_estado_lock = threading.Lock()
+
+
+def obter_estado_incremental():
+    global _estado
+    with _estado_lock:
+        if _estado is None:
+            _estado = EstadoIncremental(os.getenv("INCREMENTAL_STATE_PATH", "cache/incremental.sqlite"))
+        return _estado
@@ -0,0 +1,456 @@
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+from pathlib import Path
+
+from jsonl_output import EscritorJSONL, ler_jsonl
+from pt_text import STOPWORDS_PT, iterar_palavras, palavras_relevantes, radical
+from telemetry import obter_logger
+
+# Artigos relacionados guardados por artigo
+TOP_K = int(os.getenv("INTERNAL_LINKS_TOP_K", "5"))
+# Termos de maior TF-IDF mantidos no vetor de cada artigo: o resto quase não
+# muda o cosseno e só aumenta o custo do produto
+TERMOS_POR_ARTIGO = int(os.getenv("INTERNAL_LINKS_TERMS", "60"))
+# Termos presentes em mais que esta fração dos artigos não distinguem assuntos
+MAX_DF = float(os.getenv("INTERNAL_LINKS_MAX_DF", "0.2"))
+# Abaixo deste total de artigos o corte por MAX_DF não vale: num blog pequeno
+# 20% são dois ou três artigos e quase nenhum termo sobraria
+MIN_ARTIGOS_MAX_DF = int(os.getenv("INTERNAL_LINKS_MAX_DF_MIN_ARTICLES", "50"))
+SIMILARIDADE_MINIMA = float(os.getenv("INTERNAL_LINKS_MIN_SIMILARITY", "0.1"))
+# Linhas da matriz processadas (e gravadas) por vez
+BLOCO = 1000
+MAX_PALAVRAS_ANCORA = 6
+
+log = obter_logger("internal_links")
+
+_PONTUACAO_FRASE = set(".!?;:\n()[]|")
+
+
+def termos_do_artigo(resultado):
+    # Título e subtítulos contam em dobro: dizem do que o artigo trata
+    destaque = " ".join([resultado.get("titulo") or ""] + list(resultado.get("subtitulos") or []))
+    contagem = Counter(radical(p) for p in palavras_relevantes(resultado.get("texto") or ""))
+    for p in palavras_relevantes(destaque):
+        contagem[radical(p)] += 2
+    return contagem
+
+
+def _comprimir(dados):
+    return zlib.compress(json.dumps(dados, ensure_ascii=False).encode("utf-8"), 6)
+
+
+def _descomprimir(bruto):
+    return json.loads(zlib.decompress(bruto))
+
+
+def _normalizar_url(url):
+    return (url or "").rstrip("/")
+
+
+class IndiceLinksInternos:
+    """Índice TF-IDF esparso dos artigos do blog e seus artigos mais relacionados.
+
+    Cada artigo guarda a contagem dos seus termos (radicais, sem stopwords),
+    comprimida; a frequência de documentos de cada termo fica numa tabela
+    própria e é atualizada a cada inclusão, então o IDF está sempre em dia.
+    `recalcular` monta a matriz esparsa normalizada e faz o produto A·Aᵀ linha a
+    linha (Gustavson) sobre um índice invertido, em blocos de BLOCO artigos,
+    guardando só os TOP_K vizinhos de cada um.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = str(caminho)
+        if self.caminho != ":memory:":
+            Path(self.caminho).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.caminho, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS artigos (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                titulo TEXT,
+                hash_conteudo TEXT NOT NULL,
+                termos BLOB NOT NULL,
+                texto BLOB NOT NULL,
+                links BLOB NOT NULL,
+                pendente INTEGER NOT NULL DEFAULT 1
+            );
+            CREATE INDEX IF NOT EXISTS idx_artigos_pendente ON artigos (pendente);
+            CREATE TABLE IF NOT EXISTS frequencia (termo TEXT PRIMARY KEY, documentos INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS relacionados (
+                origem INTEGER NOT NULL,
+                destino INTEGER NOT NULL,
+                similaridade REAL NOT NULL,
+                PRIMARY KEY (origem, destino)
+            );
+            CREATE INDEX IF NOT EXISTS idx_relacionados_destino ON relacionados (destino);
+            """
+        )
+        self._conn.commit()
+
+    def _frequencia(self, termos, delta):
+        self._conn.executemany(
+            "INSERT INTO frequencia (termo, documentos) VALUES (?, ?) "
+            "ON CONFLICT(termo) DO UPDATE SET documentos = documentos + excluded.documentos",
+            [(termo, delta) for termo in termos],
+        )
+
+    def adicionar(self, resultado, commit=True):
+        """Inclui ou atualiza um artigo; ele e seus vizinhos ficam pendentes de `recalcular`.
+
+        Retorna False quando o artigo já estava indexado com o mesmo conteúdo.
+        """
+        url = resultado.get("link") or resultado.get("url")
+        texto = resultado.get("texto") or ""
+        if not url or not texto.strip():
+            return False
+        termos = termos_do_artigo(resultado)
+        hash_conteudo = hashlib.blake2b(
+            json.dumps([resultado.get("titulo"), sorted(termos.items())], ensure_ascii=False).encode("utf-8"),
+            digest_size=16,
+        ).hexdigest()
+        links = sorted({_normalizar_url(u) for u in resultado.get("urls_internas", [])})
+
+        with self._lock:
+            existente = self._conn.execute(
+                "SELECT id, hash_conteudo, termos FROM artigos WHERE url = ?", (url,)
+            ).fetchone()
+            if existente and existente[1] == hash_conteudo:
+                return False
+            if existente:
+                self._frequencia(_descomprimir(existente[2]), -1)
+                self._invalidar(existente[0])
+                self._conn.execute(
+                    "UPDATE artigos SET titulo = ?, hash_conteudo = ?, termos = ?, texto = ?, links = ?, "
+                    "pendente = 1 WHERE id = ?",
+                    (resultado.get("titulo"), hash_conteudo, _comprimir(termos), _comprimir(texto),
+                     _comprimir(links), existente[0]),
+                )
+            else:
+                self._conn.execute(
+                    "INSERT INTO artigos (url, titulo, hash_conteudo, termos, texto, links) VALUES (?, ?, ?, ?, ?, ?)",
+                    (url, resultado.get("titulo"), hash_conteudo, _comprimir(termos), _comprimir(texto),
+                     _comprimir(links)),
+                )
+            self._frequencia(termos, 1)
+            if commit:
+                self._conn.commit()
+        return True
+
+    def _invalidar(self, artigo_id):
+        # Quem tinha este artigo entre os relacionados precisa ser recalculado
+        self._conn.execute(
+            "UPDATE artigos SET pendente = 1 WHERE id IN (SELECT origem FROM relacionados WHERE destino = ?)",
+            (artigo_id,),
+        )
+        self._conn.execute("DELETE FROM relacionados WHERE origem = ? OR destino = ?", (artigo_id, artigo_id))
+
+    def adicionar_varios(self, resultados, lote=500):
+        novos = 0
+        for i, resultado in enumerate(resultados, 1):
+            if "erro" not in resultado:
+                novos += self.adicionar(resultado, commit=False)
+            if i % lote == 0:
+                with self._lock:
+                    self._conn.commit()
+        with self._lock:
+            self._conn.commit()
+        return novos
+
+    def remover(self, url):
+        with self._lock:
+            linha = self._conn.execute("SELECT id, termos FROM artigos WHERE url = ?", (url,)).fetchone()
+            if linha:
+                self._frequencia(_descomprimir(linha[1]), -1)
+                self._invalidar(linha[0])
+                self._conn.execute("DELETE FROM artigos WHERE id = ?", (linha[0],))
+                self._conn.commit()
+            return linha is not None
+
+    def _idf(self):
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*) FROM artigos").fetchone()[0]
+            frequencias = self._conn.execute("SELECT termo, documentos FROM frequencia WHERE documentos > 0").fetchall()
+        limite = max(2, MAX_DF * total) if total >= MIN_ARTIGOS_MAX_DF else total
+        # Termos de um só artigo não ligam nada a nada; os comuns demais ficam de fora
+        return total, {
+            termo: math.log((1 + total) / (1 + documentos)) + 1
+            for termo, documentos in frequencias
+            if 1 < documentos <= limite
+        }
+
+    def _vetor(self, termos, idf):
+        pesos = [(termo, (1 + math.log(n)) * idf[termo]) for termo, n in termos.items() if termo in idf]
+        pesos = heapq.nlargest(TERMOS_POR_ARTIGO, pesos, key=lambda p: p[1])
+        norma = math.sqrt(sum(p * p for _, p in pesos)) or 1.0
+        return [(termo, p / norma) for termo, p in pesos]
+
+    def recalcular(self, completo=False):
+        """Atualiza os TOP_K relacionados dos artigos pendentes (ou de todos).
+
+        Os vizinhos encontrados também ganham o artigo na sua lista se ele
+        superar o pior relacionado que já tinham. Retorna quantos artigos foram recalculados.
+        """
+        inicio = time.monotonic()
+        with self._lock:
+            if not completo and not self._conn.execute("SELECT 1 FROM artigos WHERE pendente = 1 LIMIT 1").fetchone():
+                return 0
+        total, idf = self._idf()
+        vocabulario = {}
+        ids = array("I")
+        vetores = {}
+        postings = {}
+        with self._lock:
+            linhas = self._conn.execute("SELECT id, termos, pendente FROM artigos ORDER BY id").fetchall()
+        pendentes = []
+        for indice, (artigo_id, bruto, pendente) in enumerate(linhas):
+            vetor = [(vocabulario.setdefault(termo, len(vocabulario)), peso)
+                     for termo, peso in self._vetor(_descomprimir(bruto), idf)]
+            ids.append(artigo_id)
+            for termo, peso in vetor:
+                lista = postings.get(termo)
+                if lista is None:
+                    lista = postings[termo] = (array("I"), array("f"))
+                lista[0].append(indice)
+                lista[1].append(peso)
+            if completo or pendente:
+                pendentes.append(indice)
+                vetores[indice] = vetor
+        del linhas
+
+        for bloco_inicio in range(0, len(pendentes), BLOCO):
+            bloco = pendentes[bloco_inicio:bloco_inicio + BLOCO]
+            resultado = {}
+            for linha in bloco:
+                acumulado = {}
+                for termo, peso in vetores[linha]:
+                    indices, pesos = postings[termo]
+                    for outro, peso_outro in zip(indices, pesos):
+                        acumulado[outro] = acumulado.get(outro, 0.0) + peso * peso_outro
+                acumulado.pop(linha, None)
+                resultado[linha] = heapq.nlargest(
+                    TOP_K, ((s, o) for o, s in acumulado.items() if s >= SIMILARIDADE_MINIMA)
+                )
+            self._gravar(ids, resultado)
+            log.info(f"{bloco_inicio + len(bloco)} de {len(pendentes)} artigos recalculados")
+
+        log.info(f"{len(pendentes)} artigos recalculados em {time.monotonic() - inicio:.1f}s "
+                 f"({total} no índice, {len(vocabulario)} termos)")
+        return len(pendentes)
+
+    def _gravar(self, ids, resultado):
+        with self._lock:
+            for linha, vizinhos in resultado.items():
+                origem = ids[linha]
+                self._conn.execute("DELETE FROM relacionados WHERE origem = ?", (origem,))
+                self._conn.executemany(
+                    "INSERT INTO relacionados (origem, destino, similaridade) VALUES (?, ?, ?)",
+                    [(origem, ids[outro], round(s, 4)) for s, outro in vizinhos],
+                )
+                # A similaridade é simétrica: o vizinho pode ganhar este artigo
+                for s, outro in vizinhos:
+                    destino = ids[outro]
+                    if self._conn.execute(
+                        "SELECT 1 FROM relacionados WHERE origem = ? AND destino = ?", (destino, origem)
+                    ).fetchone():
+                        self._conn.execute(
+                            "UPDATE relacionados SET similaridade = ? WHERE origem = ? AND destino = ?",
+                            (round(s, 4), destino, origem),
+                        )
+                        continue
+                    piores = self._conn.execute(
+                        "SELECT COUNT(*), MIN(similaridade) FROM relacionados WHERE origem = ?", (destino,)
+                    ).fetchone()
+                    if piores[0] < TOP_K or s > piores[1]:
+                        self._conn.execute(
+                            "INSERT INTO relacionados (origem, destino, similaridade) VALUES (?, ?, ?)",
+                            (destino, origem, round(s, 4)),
+                        )
+                        if piores[0] >= TOP_K:
+                            self._conn.execute(
+                                "DELETE FROM relacionados WHERE rowid = (SELECT rowid FROM relacionados "
+                                "WHERE origem = ? ORDER BY similaridade LIMIT 1)",
+                                (destino,),
+                            )
+                self._conn.execute("UPDATE artigos SET pendente = 0 WHERE id = ?", (origem,))
+            self._conn.commit()
+
+    def relacionados(self, url):
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT d.url, d.titulo, r.similaridade FROM artigos o "
+                "JOIN relacionados r ON r.origem = o.id JOIN artigos d ON d.id = r.destino "
+                "WHERE o.url = ? ORDER BY r.similaridade DESC",
+                (url,),
+            ).fetchall()
+        return [{"url": u, "titulo": t, "similaridade": s} for u, t, s in linhas]
+
+    def sugestoes(self, url=None, por_artigo=None):
+        """Gera {origem, destino, ancora, trecho, similaridade} para cada relacionado ainda sem link.
+
+        A âncora é o trecho do texto da origem que mais casa com o título e os
+        termos principais do destino; sem trecho assim, a sugestão vem com
+        `trecho` None e o título do destino como âncora (o link pede uma frase nova).
+        """
+        por_artigo = por_artigo or TOP_K
+        _, idf = self._idf()
+        consulta = "SELECT id, url, texto, links FROM artigos"
+        parametros = ()
+        if url:
+            consulta, parametros = consulta + " WHERE url = ?", (url,)
+        with self._lock:
+            origens = self._conn.execute(consulta + " ORDER BY id", parametros).fetchall()
+
+        destinos = {}
+        for origem_id, origem_url, texto, links in origens:
+            with self._lock:
+                vizinhos = self._conn.execute(
+                    "SELECT d.id, d.url, d.titulo, d.termos, r.similaridade FROM relacionados r "
+                    "JOIN artigos d ON d.id = r.destino WHERE r.origem = ? ORDER BY r.similaridade DESC",
+                    (origem_id,),
+                ).fetchall()
+            links = set(_descomprimir(links))
+            vizinhos = [v for v in vizinhos if _normalizar_url(v[1]) not in links][:por_artigo]
+            if not vizinhos:
+                continue
+            palavras = _palavras_com_radical(_descomprimir(texto))
+            for destino_id, destino_url, titulo, termos, valor in vizinhos:
+                if destino_id not in destinos:
+                    destinos[destino_id] = _alvo_ancora(titulo, _descomprimir(termos), idf)
+                ancora = _melhor_ancora(palavras, destinos[destino_id])
+                yield {
+                    "origem": origem_url,
+                    "destino": destino_url,
+                    "titulo_destino": titulo,
+                    "ancora": ancora[0] if ancora else titulo,
+                    "trecho": ancora[1] if ancora else None,
+                    "similaridade": valor,
+                }
+            # Os alvos são pequenos, mas não precisam crescer com o blog inteiro
+            if len(destinos) > 10_000:
+                destinos.clear()
+
+    def total(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM artigos").fetchone()[0]
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _alvo_ancora(titulo, termos, idf, quantidade=10):
+    # Radical -> peso: termos do título valem 2, os principais do texto valem 1
+    alvo = {t: 1 for t in heapq.nlargest(
+        quantidade, (t for t in termos if t in idf), key=lambda t: (1 + math.log(termos[t])) * idf[t]
+    )}
+    alvo.update({radical(p): 2 for p in palavras_relevantes(titulo or "")})
+    return alvo
+
+
+def _palavras_com_radical(texto):
+    # [(texto inteiro, radical ou None se stopword, início, fim, começa frase nova)]
+    palavras = []
+    anterior = 0
+    for m in iterar_palavras(texto):
+        palavra = m.group().lower()
+        quebra = bool(_PONTUACAO_FRASE.intersection(texto[anterior:m.start()]))
+        relevante = palavra not in STOPWORDS_PT and len(palavra) > 2 and not palavra.isdigit()
+        palavras.append((texto, radical(palavra) if relevante else None, m.start(), m.end(), quebra))
+        anterior = m.end()
+    return palavras
+
+
+def _melhor_ancora(palavras, alvo):
+    """Maior sequência de palavras da mesma frase que casam com o alvo (stopwords só no meio).
+
+    Retorna (âncora, frase em volta) ou None se nada soma pelo menos um termo do título.
+    """
+    melhor = None
+    i = 0
+    while i < len(palavras):
+        if palavras[i][1] not in alvo:
+            i += 1
+            continue
+        fim, casados = i, {palavras[i][1]}
+        j = i + 1
+        while j < len(palavras) and j - i < MAX_PALAVRAS_ANCORA and not palavras[j][4]:
+            r = palavras[j][1]
+            if r is not None and r not in alvo:
+                break
+            if r is not None:
+                fim = j
+                casados.add(r)
+            j += 1
+        pontos = sum(alvo[r] for r in casados)
+        if pontos >= 2 and (melhor is None or pontos > melhor[0]):
+            melhor = (pontos, i, fim)
+        i = fim + 1
+
+    if melhor is None:
+        return None
+    _, i, fim = melhor
+    texto = palavras[i][0]
+    inicio_frase = i
+    while inicio_frase > 0 and not palavras[inicio_frase][4]:
+        inicio_frase -= 1
+    fim_frase = fim
+    while fim_frase + 1 < len(palavras) and not palavras[fim_frase + 1][4]:
+        fim_frase += 1
+    frase = texto[palavras[inicio_frase][2]:palavras[fim_frase][3]]
+    if len(frase) > 240:
+        frase = texto[max(palavras[inicio_frase][2], palavras[i][2] - 100):palavras[fim][3] + 100]
+    return texto[palavras[i][2]:palavras[fim][3]], frase.strip()
+
+
+def obter_indice_links(caminho=None):
+    return IndiceLinksInternos(caminho or os.getenv("INTERNAL_LINKS_INDEX_PATH", "cache/links_internos.sqlite"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sugestões de links internos entre artigos relacionados.")
+    parser.add_argument("--indice", help="arquivo do índice (padrão: INTERNAL_LINKS_INDEX_PATH)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("atualizar", help="inclui artigos novos ou alterados e recalcula os relacionados")
+    p.add_argument("arquivos", nargs="*", help="arquivos JSONL; sem nenhum, usa a última análise de cada URL do armazém")
+    p.add_argument("--completo", action="store_true", help="recalcula todos os artigos, não só os pendentes")
+    p = sub.add_parser("sugerir", help="gera as sugestões de link")
+    p.add_argument("--url", help="só as sugestões a partir deste artigo")
+    p.add_argument("--por-artigo", type=int, help="máximo de sugestões por artigo")
+    p.add_argument("--saida", help="grava as sugestões em JSONL em vez de imprimir")
+    args = parser.parse_args()
+
+    indice = obter_indice_links(args.indice)
+    if args.comando == "atualizar":
+        if args.arquivos:
+            fontes = (r for caminho in args.arquivos for r in ler_jsonl(caminho))
+        else:
+            from result_store import obter_armazem
+
+            fontes = obter_armazem().iterar_ultimos()
+        print(f"{indice.adicionar_varios(fontes)} artigos novos ou alterados; {indice.total()} no índice")
+        print(f"{indice.recalcular(args.completo)} artigos recalculados")
+    elif args.saida:
+        with EscritorJSONL(args.saida) as escritor:
+            for sugestao in indice.sugestoes(args.url, args.por_artigo):
+                escritor.escrever(sugestao)
+        print(f"{escritor.escritos} sugestões gravadas em {args.saida}")
+    else:
+        for sugestao in indice.sugestoes(args.url, args.por_artigo):
+            trecho = f"\n    “{sugestao['trecho']}”" if sugestao["trecho"] else " (sem trecho: escreva uma frase nova)"
+            print(f"{sugestao['origem']} → {sugestao['destino']}  âncora: \"{sugestao['ancora']}\""
+                  f" ({sugestao['similaridade']:.2f}){trecho}")
+    indice.fechar()
@@ -0,0 +1,249 @@
+import importlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# Segundos que um trabalho fica reservado para um trabalhador sem renovação
+LEASE_PADRAO = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+# Tentativas antes de o trabalho ir para a fila de mortos
+MAX_TENTATIVAS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Espera antes de uma nova tentativa: base * 2^(tentativa - 1)
+ESPERA_BASE = float(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+
+ESTADOS = ("pendente", "em_execucao", "concluido", "morto")
+
+
+class FilaSQLite:
+    """Fila de trabalhos durável em SQLite, compartilhada por vários processos.
+
+    Cada trabalho é uma URL. `reservar` entrega o próximo trabalho com um lease:
+    se o trabalhador morrer sem concluir nem renovar, o lease vence e outro
+    trabalhador o pega de volta. Falhas voltam para a fila com espera
+    exponencial até `max_tentativas`; depois disso o trabalho fica "morto"
+    (dead-letter) até ser reenfileirado manualmente.
+
+    Qualquer classe com os mesmos métodos pode substituir esta (ver `criar_fila`).
+    """
+
+    def __init__(self, caminho, max_tentativas=None, espera_base=None):
+        self.caminho = str(caminho)
+        self.max_tentativas = max_tentativas or MAX_TENTATIVAS
+        self.espera_base = ESPERA_BASE if espera_base is None else espera_base
+        if self.caminho != ":memory:":
+            Path(self.caminho).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Transações controladas à mão: a reserva precisa de BEGIN IMMEDIATE para
+        # que dois processos nunca peguem o mesmo trabalho
+        self._conn = sqlite3.connect(self.caminho, check_same_thread=False, timeout=30,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS trabalhos (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                estado TEXT NOT NULL,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                disponivel_em REAL NOT NULL,
+                trabalhador TEXT,
+                lease_ate REAL,
+                erro TEXT,
+                criado_em REAL NOT NULL,
+                atualizado_em REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_trabalhos_fila ON trabalhos (estado, disponivel_em);
+            CREATE INDEX IF NOT EXISTS idx_trabalhos_lease ON trabalhos (estado, lease_ate);
+            """
+        )
+
+    def _transacao(self, funcao):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                resultado = funcao(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return resultado
+
+    def enfileirar(self, urls, reabrir=False):
+        """Adiciona URLs; as que já estão na fila são ignoradas.
+
+        Com `reabrir`, URLs concluídas ou mortas voltam a ficar pendentes.
+        Retorna quantos trabalhos ficaram pendentes.
+        """
+        agora = time.time()
+
+        def inserir(conn):
+            total = 0
+            for url in urls:
+                url = url.strip()
+                if not url:
+                    continue
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO trabalhos (url, estado, disponivel_em, criado_em, atualizado_em) "
+                    "VALUES (?, 'pendente', ?, ?, ?)",
+                    (url, agora, agora, agora),
+                )
+                if not cursor.rowcount and reabrir:
+                    cursor = conn.execute(
+                        "UPDATE trabalhos SET estado = 'pendente', tentativas = 0, disponivel_em = ?, "
+                        "trabalhador = NULL, lease_ate = NULL, erro = NULL, atualizado_em = ? "
+                        "WHERE url = ? AND estado IN ('concluido', 'morto')",
+                        (agora, agora, url),
+                    )
+                total += cursor.rowcount
+            return total
+
+        return self._transacao(inserir)
+
+    def reservar(self, trabalhador, lease=None):
+        """Reserva o próximo trabalho disponível; retorna dict {id, url, tentativas} ou None.
+
+        Trabalhos com lease vencido contam como disponíveis. Se um deles já
+        esgotou as tentativas (o trabalhador morreu em todas), vai para os mortos.
+        """
+        lease = lease or LEASE_PADRAO
+        agora = time.time()
+
+        def reservar_um(conn):
+            while True:
+                linha = conn.execute(
+                    "SELECT id, url, tentativas, estado FROM trabalhos "
+                    "WHERE estado = 'pendente' AND disponivel_em <= ? "
+                    "UNION ALL "
+                    "SELECT id, url, tentativas, estado FROM trabalhos "
+                    "WHERE estado = 'em_execucao' AND lease_ate < ? "
+                    "LIMIT 1",
+                    (agora, agora),
+                ).fetchone()
+                if linha is None:
+                    return None
+                if linha["estado"] == "em_execucao" and linha["tentativas"] >= self.max_tentativas:
+                    conn.execute(
+                        "UPDATE trabalhos SET estado = 'morto', trabalhador = NULL, lease_ate = NULL, "
+                        "erro = COALESCE(erro, 'lease vencido'), atualizado_em = ? WHERE id = ?",
+                        (agora, linha["id"]),
+                    )
+                    continue
+                conn.execute(
+                    "UPDATE trabalhos SET estado = 'em_execucao', tentativas = tentativas + 1, "
+                    "trabalhador = ?, lease_ate = ?, atualizado_em = ? WHERE id = ?",
+                    (trabalhador, agora + lease, agora, linha["id"]),
+                )
+                return {"id": linha["id"], "url": linha["url"], "tentativas": linha["tentativas"] + 1}
+
+        return self._transacao(reservar_um)
+
+    def renovar(self, id_trabalho, trabalhador, lease=None):
+        """Estende o lease; retorna False se o trabalho não pertence mais ao trabalhador."""
+        lease = lease or LEASE_PADRAO
+        agora = time.time()
+        return self._transacao(lambda conn: conn.execute(
+            "UPDATE trabalhos SET lease_ate = ?, atualizado_em = ? "
+            "WHERE id = ? AND trabalhador = ? AND estado = 'em_execucao'",
+            (agora + lease, agora, id_trabalho, trabalhador),
+        ).rowcount == 1)
+
+    def concluir(self, id_trabalho, trabalhador):
+        agora = time.time()
+        return self._transacao(lambda conn: conn.execute(
+            "UPDATE trabalhos SET estado = 'concluido', lease_ate = NULL, erro = NULL, atualizado_em = ? "
+            "WHERE id = ? AND trabalhador = ? AND estado = 'em_execucao'",
+            (agora, id_trabalho, trabalhador),
+        ).rowcount == 1)
+
+    def falhar(self, id_trabalho, trabalhador, erro):
+        """Devolve o trabalho à fila com espera exponencial, ou o move para os mortos."""
+        agora = time.time()
+
+        def registrar_falha(conn):
+            linha = conn.execute(
+                "SELECT tentativas FROM trabalhos WHERE id = ? AND trabalhador = ? AND estado = 'em_execucao'",
+                (id_trabalho, trabalhador),
+            ).fetchone()
+            if linha is None:
+                return None
+            if linha["tentativas"] >= self.max_tentativas:
+                estado, disponivel_em = "morto", agora
+            else:
+                estado = "pendente"
+                disponivel_em = agora + self.espera_base * 2 ** (linha["tentativas"] - 1)
+            conn.execute(
+                "UPDATE trabalhos SET estado = ?, disponivel_em = ?, trabalhador = NULL, lease_ate = NULL, "
+                "erro = ?, atualizado_em = ? WHERE id = ?",
+                (estado, disponivel_em, str(erro)[:2000], agora, id_trabalho),
+            )
+            return estado
+
+        return self._transacao(registrar_falha)
+
+    def liberar(self, id_trabalho, trabalhador):
+        """Devolve o trabalho sem contar a tentativa (trabalhador encerrado no meio)."""
+        agora = time.time()
+        return self._transacao(lambda conn: conn.execute(
+            "UPDATE trabalhos SET estado = 'pendente', tentativas = MAX(tentativas - 1, 0), "
+            "disponivel_em = ?, trabalhador = NULL, lease_ate = NULL, atualizado_em = ? "
+            "WHERE id = ? AND trabalhador = ? AND estado = 'em_execucao'",
+            (agora, agora, id_trabalho, trabalhador),
+        ).rowcount == 1)
+
+    def mortos(self, limite=100):
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT id, url, tentativas, erro, atualizado_em FROM trabalhos "
+                "WHERE estado = 'morto' ORDER BY atualizado_em DESC LIMIT ?",
+                (limite,),
+            ).fetchall()
+        return [dict(linha) for linha in linhas]
+
+    def reenfileirar_mortos(self):
+        agora = time.time()
+        return self._transacao(lambda conn: conn.execute(
+            "UPDATE trabalhos SET estado = 'pendente', tentativas = 0, disponivel_em = ?, atualizado_em = ? "
+            "WHERE estado = 'morto'",
+            (agora, agora),
+        ).rowcount)
+
+    def contadores(self):
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT estado, COUNT(*) FROM trabalhos GROUP BY estado"
+            ).fetchall()
+        contagem = dict.fromkeys(ESTADOS, 0)
+        contagem.update({estado: total for estado, total in linhas})
+        return contagem
+
+    def ativos(self):
+        """Trabalhos pendentes ou em execução (a fila só terminou quando isso é zero)."""
+        contagem = self.contadores()
+        return contagem["pendente"] + contagem["em_execucao"]
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Backends disponíveis por nome; "modulo:Classe" também é aceito, para usar uma
+# fila externa (Redis, Postgres...) sem alterar este módulo
+BACKENDS = {"sqlite": FilaSQLite}
+
+
+def criar_fila(caminho=None, backend=None, **opcoes):
+    """Cria a fila configurada em JOB_QUEUE_BACKEND / JOB_QUEUE_PATH.
+
+    Cada processo deve criar a sua: conexões não atravessam um fork.
+    """
+    backend = backend or os.getenv("JOB_QUEUE_BACKEND", "sqlite")
+    caminho = caminho or os.getenv("JOB_QUEUE_PATH", "cache/fila_trabalhos.sqlite")
+    if backend in BACKENDS:
+        classe = BACKENDS[backend]
+    else:
+        modulo, _, nome = backend.partition(":")
+        classe = getattr(importlib.import_module(modulo), nome)
+    return classe(caminho, **opcoes)
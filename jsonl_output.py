@@ -0,0 +1,123 @@
+import json
+import os
+import time
+from pathlib import Path
+
+# Quantos registros (ou segundos) entre um fsync e outro
+FSYNC_REGISTROS = int(os.getenv("OUTPUT_FSYNC_EVERY", "20"))
+FSYNC_SEGUNDOS = float(os.getenv("OUTPUT_FSYNC_SECONDS", "5"))
+
+
+def reparar_final(caminho):
+    """Remove uma última linha incompleta (execução interrompida no meio da escrita)."""
+    caminho = Path(caminho)
+    if not caminho.exists() or caminho.stat().st_size == 0:
+        return
+    with open(caminho, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        tamanho = f.tell()
+        # Procura o último "\n" de trás para frente, em blocos
+        posicao = tamanho
+        while posicao > 0:
+            inicio = max(0, posicao - 65536)
+            f.seek(inicio)
+            bloco = f.read(posicao - inicio)
+            indice = bloco.rfind(b"\n")
+            if indice != -1:
+                fim = inicio + indice + 1
+                break
+            posicao = inicio
+        else:
+            fim = 0
+        if fim < tamanho:
+            f.truncate(fim)
+
+
+def ler_jsonl(caminho):
+    """Lê um registro por vez; linhas corrompidas são ignoradas."""
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            if linha.strip():
+                try:
+                    yield json.loads(linha)
+                except json.JSONDecodeError:
+                    continue
+
+
+def urls_concluidas(caminho):
+    """URLs com resultado válido no JSONL: o próprio arquivo de saída é o checkpoint.
+
+    Registros com "erro" não contam, para que a próxima execução tente de novo.
+    """
+    if not Path(caminho).exists():
+        return set()
+    return {r["link"] for r in ler_jsonl(caminho) if "link" in r and "erro" not in r}
+
+
+class EscritorJSONL:
+    """Anexa um resultado por linha assim que fica pronto.
+
+    O arquivo é aberto em modo append, então retomar uma execução só acrescenta
+    linhas. `flush` a cada registro e `fsync` a cada `fsync_registros` registros
+    ou `fsync_segundos`: uma queda perde no máximo esse intervalo. `escrever`
+    retorna True quando sincronizou, para o chamador gravar junto o próprio estado.
+    """
+
+    def __init__(self, caminho, fsync_registros=None, fsync_segundos=None):
+        self.caminho = Path(caminho)
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        self.fsync_registros = fsync_registros or FSYNC_REGISTROS
+        self.fsync_segundos = FSYNC_SEGUNDOS if fsync_segundos is None else fsync_segundos
+        self.escritos = 0
+        reparar_final(self.caminho)
+        self._arquivo = open(self.caminho, "a", encoding="utf-8")
+        self._pendentes = 0
+        self._ultimo_fsync = time.monotonic()
+
+    def escrever(self, registro):
+        self._arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self._arquivo.flush()
+        self.escritos += 1
+        self._pendentes += 1
+        if (self._pendentes >= self.fsync_registros
+                or time.monotonic() - self._ultimo_fsync >= self.fsync_segundos):
+            self.sincronizar()
+            return True
+        return False
+
+    def sincronizar(self):
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+        self._pendentes = 0
+        self._ultimo_fsync = time.monotonic()
+
+    def fechar(self):
+        if not self._arquivo.closed:
+            self.sincronizar()
+            self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def exportar_lista_json(caminho_jsonl, caminho_json):
+    """Converte o JSONL na lista JSON dos arquivos antigos, um registro por vez."""
+    with open(caminho_json, "w", encoding="utf-8") as f:
+        f.write("[")
+        for i, registro in enumerate(ler_jsonl(caminho_jsonl)):
+            f.write(",\n" if i else "\n")
+            f.write(json.dumps(registro, ensure_ascii=False, indent=2))
+        f.write("\n]\n")
+    return caminho_json
+
+
+def para_dataframe(caminho_jsonl):
+    # pandas é opcional: só é necessário para quem quer analisar os resultados em DataFrame
+    try:
+        import pandas as pd
+    except ImportError as e:
+        raise ImportError("Instale o pandas para carregar os resultados em DataFrame (pip install pandas).") from e
+    return pd.read_json(caminho_jsonl, lines=True)
@@ -0,0 +1,227 @@
+import os
+import zlib
+
+from pagespeed import mesclar_estrategias
+from telemetry import obter_logger
+
+# Perfil de limitação usado na medição local; vazio desliga a coleta
+PERFIL_LAB = os.getenv("LAB_VITALS_PROFILE", "")
+# Espera máxima, depois do load, pela rede ficar ociosa antes de ler as métricas
+ESPERA_LAB_MS = int(os.getenv("LAB_VITALS_TIMEOUT_MS", "15000"))
+# Com a medição local ligada, fração das URLs que também vão à API do PageSpeed
+AMOSTRA_PAGESPEED = float(os.getenv("PAGESPEED_SAMPLE_RATE", "0"))
+
+# Mesmos valores que o Lighthouse aplica pelo DevTools: o perfil mobile é o
+# "4G lento" (RTT 150 ms, 1,6 Mbps) multiplicado pelos fatores de ajuste dele
+PERFIS = {
+    "desktop": {"cpu": 1, "latencia_ms": 40, "download_kbps": 10240, "upload_kbps": 10240,
+                "viewport": {"width": 1350, "height": 940}},
+    "mobile": {"cpu": 4, "latencia_ms": 562.5, "download_kbps": 1474.6, "upload_kbps": 675,
+               "viewport": {"width": 412, "height": 823}},
+    "nenhum": {"cpu": 1, "latencia_ms": 0, "download_kbps": 0, "upload_kbps": 0, "viewport": None},
+}
+
+log = obter_logger("lab_vitals")
+
+# Registrado antes de qualquer script da página: os observers com buffered
+# pegam também as entradas anteriores a eles
+SCRIPT_OBSERVADORES = """
+(() => {
+  const v = window.__vitaisLab = { fcp: null, lcp: null, cls: 0, longas: [] };
+  const observar = (type, cb) => {
+    try {
+      new PerformanceObserver((lista) => lista.getEntries().forEach(cb)).observe({ type, buffered: true });
+    } catch (e) {}
+  };
+  observar("paint", (e) => { if (e.name === "first-contentful-paint") v.fcp = e.startTime; });
+  observar("largest-contentful-paint", (e) => { v.lcp = e.startTime; });
+  // CLS: maior janela de mudanças com menos de 1 s entre elas e até 5 s no total
+  let janela = 0, inicio = 0, anterior = 0;
+  observar("layout-shift", (e) => {
+    if (e.hadRecentInput) return;
+    if (janela && e.startTime - anterior < 1000 && e.startTime - inicio < 5000) {
+      janela += e.value;
+    } else {
+      janela = e.value;
+      inicio = e.startTime;
+    }
+    anterior = e.startTime;
+    v.cls = Math.max(v.cls, janela);
+  });
+  observar("longtask", (e) => { v.longas.push([e.startTime, e.duration]); });
+})();
+"""
+
+SCRIPT_LEITURA = """
+() => {
+  const v = window.__vitaisLab || { longas: [] };
+  const nav = performance.getEntriesByType("navigation")[0];
+  // TBT: parte de cada tarefa longa depois do FCP que passa de 50 ms
+  const tbt = v.longas.reduce((soma, [inicio, duracao]) => {
+    const util = inicio + duracao - Math.max(inicio, v.fcp || 0);
+    return soma + Math.max(0, util - 50);
+  }, 0);
+  return {
+    ttfb_ms: nav ? nav.responseStart : null,
+    fcp_ms: v.fcp,
+    lcp_ms: v.lcp,
+    cls: v.cls,
+    tbt_ms: tbt,
+    tarefas_longas: v.longas.length,
+    dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd : null,
+    load_ms: nav ? nav.loadEventEnd : null,
+    bytes_documento: nav ? nav.transferSize : null,
+  };
+}
+"""
+
+
+def ler_perfil(texto=None):
+    """Perfil por nome (desktop, mobile, nenhum) ou "cpu=4,latencia_ms=150,download_kbps=1600,upload_kbps=750"."""
+    texto = (texto if texto is not None else PERFIL_LAB).strip()
+    if not texto:
+        return None
+    if texto in PERFIS:
+        return dict(PERFIS[texto], nome=texto)
+    perfil = dict(PERFIS["nenhum"], nome="personalizado")
+    for parte in texto.split(","):
+        chave, _, valor = parte.partition("=")
+        chave = chave.strip()
+        if chave not in perfil or chave in ("nome", "viewport"):
+            raise ValueError(f"LAB_VITALS_PROFILE inválido: {texto}")
+        perfil[chave] = float(valor)
+    return perfil
+
+
+def na_amostra_pagespeed(url, fracao=None):
+    # Estável entre execuções: a mesma URL cai (ou não) na amostra toda noite
+    fracao = AMOSTRA_PAGESPEED if fracao is None else fracao
+    return zlib.crc32(url.encode("utf-8")) % 10000 < fracao * 10000
+
+
+def _comandos_limitacao(perfil):
+    # Mensagens CDP: a rede em bytes/s (-1 desliga o limite), a CPU como multiplicador
+    def vazao(kbps):
+        return kbps * 1024 / 8 if kbps else -1
+
+    return [
+        ("Network.enable", {}),
+        ("Network.emulateNetworkConditions", {
+            "offline": False,
+            "latency": perfil["latencia_ms"],
+            "downloadThroughput": vazao(perfil["download_kbps"]),
+            "uploadThroughput": vazao(perfil["upload_kbps"]),
+        }),
+        ("Emulation.setCPUThrottlingRate", {"rate": perfil["cpu"]}),
+    ]
+
+
+class RedeLab:
+    """Conta requisições e bytes transferidos (comprimidos) pelos eventos de rede do CDP."""
+
+    def __init__(self):
+        self.tipos = {}
+        self.por_tipo = {}
+
+    def requisicao(self, evento):
+        tipo = evento.get("type", "Other").lower()
+        self.tipos[evento["requestId"]] = tipo
+        item = self.por_tipo.setdefault(tipo, {"requisicoes": 0, "bytes": 0})
+        # Redirecionamentos reaproveitam o requestId: contam como requisições novas
+        item["requisicoes"] += 1
+
+    def concluida(self, evento):
+        tipo = self.tipos.get(evento["requestId"], "other")
+        self.por_tipo.setdefault(tipo, {"requisicoes": 0, "bytes": 0})["bytes"] += int(evento["encodedDataLength"])
+
+    def registrar(self, cdp):
+        cdp.on("Network.requestWillBeSent", self.requisicao)
+        cdp.on("Network.loadingFinished", self.concluida)
+
+    def resumo(self):
+        return {
+            "requisicoes": sum(t["requisicoes"] for t in self.por_tipo.values()),
+            "bytes_transferidos": sum(t["bytes"] for t in self.por_tipo.values()),
+            "por_tipo": self.por_tipo,
+        }
+
+
+def preparar(page, perfil):
+    """Aplica a limitação e os observers antes do goto (API síncrona). Retorna o contador de rede."""
+    if perfil.get("viewport"):
+        page.set_viewport_size(perfil["viewport"])
+    page.add_init_script(SCRIPT_OBSERVADORES)
+    cdp = page.context.new_cdp_session(page)
+    rede = RedeLab()
+    rede.registrar(cdp)
+    for metodo, parametros in _comandos_limitacao(perfil):
+        cdp.send(metodo, parametros)
+    return rede
+
+
+async def preparar_async(page, perfil):
+    if perfil.get("viewport"):
+        await page.set_viewport_size(perfil["viewport"])
+    await page.add_init_script(SCRIPT_OBSERVADORES)
+    cdp = await page.context.new_cdp_session(page)
+    rede = RedeLab()
+    rede.registrar(cdp)
+    for metodo, parametros in _comandos_limitacao(perfil):
+        await cdp.send(metodo, parametros)
+    return rede
+
+
+def coletar(page, rede, perfil):
+    """Espera o carregamento assentar e lê as métricas (API síncrona)."""
+    try:
+        page.wait_for_load_state("load", timeout=ESPERA_LAB_MS)
+        page.wait_for_load_state("networkidle", timeout=ESPERA_LAB_MS)
+    except Exception as e:
+        log.debug(f"Medição local sem rede ociosa: {e}")
+    return montar_bloco(page.evaluate(SCRIPT_LEITURA), rede, perfil)
+
+
+async def coletar_async(page, rede, perfil):
+    try:
+        await page.wait_for_load_state("load", timeout=ESPERA_LAB_MS)
+        await page.wait_for_load_state("networkidle", timeout=ESPERA_LAB_MS)
+    except Exception as e:
+        log.debug(f"Medição local sem rede ociosa: {e}")
+    return montar_bloco(await page.evaluate(SCRIPT_LEITURA), rede, perfil)
+
+
+def _segundos(ms):
+    return "N/A" if ms is None else f"{ms / 1000:.1f} s"
+
+
+def _milissegundos(ms):
+    return "N/A" if ms is None else f"{ms:,.0f} ms"
+
+
+def montar_bloco(metricas, rede, perfil):
+    # Mesmo formato do resumir_lighthouse. INP exige interação e Speed Index
+    # exige o filme do carregamento: não existem nesta medição
+    cls = "N/A" if metricas.get("cls") is None else f"{metricas['cls']:.3f}"
+    resumo = {
+        "core_web_vitals": {
+            "LCP": _segundos(metricas.get("lcp_ms")),
+            "INP": "N/A",
+            "CLS": cls,
+            "FCP": _segundos(metricas.get("fcp_ms")),
+            "TTFB": _milissegundos(metricas.get("ttfb_ms")),
+        },
+        "performance": {
+            "FCP": _segundos(metricas.get("fcp_ms")),
+            "TotalBlockingTime": _milissegundos(metricas.get("tbt_ms")),
+            "SpeedIndex": "N/A",
+            "LCP": _segundos(metricas.get("lcp_ms")),
+            "CLS": cls,
+        },
+        "fonte": "laboratorio_local",
+        "laboratorio": {
+            **{chave: round(valor, 3 if chave == "cls" else 1) if isinstance(valor, float) else valor
+               for chave, valor in metricas.items()},
+            **rede.resumo(),
+        },
+    }
+    return mesclar_estrategias({perfil["nome"]: resumo})
@@ -0,0 +1,225 @@
+import os
+from collections import Counter
+
+from pt_text import STOPWORDS_PT, flesch_pt, palavras_relevantes, sem_acentos, tokenizar
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Critério -> peso na nota final (soma 10)
+PESOS = {
+    "titulo_tamanho": 0.75,
+    "palavra_chave_titulo": 1.5,
+    "palavra_chave_inicio": 0.5,
+    "h1_unico": 0.75,
+    "hierarquia_headings": 0.75,
+    "subtitulos": 0.75,
+    "tamanho_texto": 1.5,
+    "legibilidade": 1.5,
+    "meta_description": 1.0,
+    "links_internos": 0.75,
+    "links_externos": 0.25,
+    "alt_imagens": 0.5,
+}
+CRITERIOS = list(PESOS)
+
+# Critérios que dependem dos sinais estruturais (headings, meta, links, imagens);
+# sem eles a nota é normalizada só pelos demais
+_CRITERIOS_ESTRUTURAIS = {
+    "h1_unico", "hierarquia_headings", "meta_description",
+    "links_internos", "links_externos", "alt_imagens",
+}
+
+SUGESTOES = {
+    "titulo_tamanho": "Ajuste o título (H1) para ter entre 30 e 65 caracteres.",
+    "palavra_chave_titulo": "Inclua a palavra-chave principal \"{palavra_chave}\" no título.",
+    "palavra_chave_inicio": "Use a palavra-chave \"{palavra_chave}\" já no primeiro parágrafo.",
+    "h1_unico": "Mantenha exatamente um H1 na página.",
+    "hierarquia_headings": "Corrija a hierarquia dos headings, sem pular níveis (ex.: H2 direto para H4).",
+    "subtitulos": "Divida o texto com mais subtítulos H2/H3 (cerca de um a cada 300 palavras).",
+    "tamanho_texto": "Amplie o conteúdo para pelo menos 1.000 palavras, aprofundando o tema.",
+    "legibilidade": "Encurte frases e prefira palavras mais simples para melhorar a legibilidade.",
+    "meta_description": "Escreva uma meta description entre 120 e 160 caracteres com a palavra-chave.",
+    "links_internos": "Adicione pelo menos 3 links internos para artigos relacionados.",
+    "links_externos": "Cite ao menos uma fonte externa confiável com link.",
+    "alt_imagens": "Preencha o atributo alt de todas as imagens.",
+}
+
+# sempre: toda página vai ao LLM | sugestoes: nota local, LLM só para sugestões
+# limiar: LLM só quando a nota local cai na faixa duvidosa | nunca: só nota local
+MODO_LLM = os.getenv("SEO_LLM_MODE", "sempre")
+FAIXA_LIMIAR = tuple(float(v) for v in os.getenv("SEO_LLM_BAND", "4,7").split(","))
+
+
+def _faixa(valor, minimo, ideal_min, ideal_max=None, maximo=None):
+    # 0 abaixo de `minimo`, sobe linear até 1 em `ideal_min`; se houver teto,
+    # cai de novo até 0 entre `ideal_max` e `maximo`
+    if valor < minimo:
+        return 0.0
+    if valor < ideal_min:
+        return (valor - minimo) / (ideal_min - minimo)
+    if ideal_max is None or valor <= ideal_max:
+        return 1.0
+    if valor >= maximo:
+        return 0.0
+    return 1 - (valor - ideal_max) / (maximo - ideal_max)
+
+
+def inferir_palavra_chave(resultado, frequencia=None):
+    # Termo do título que mais aparece no texto, na falta de uma palavra-chave informada
+    if resultado.get("palavra_chave"):
+        return resultado["palavra_chave"].lower()
+    termos_titulo = palavras_relevantes(resultado.get("titulo", ""))
+    if not termos_titulo:
+        return ""
+    if frequencia is None:
+        frequencia = Counter(tokenizar(resultado.get("texto", "")))
+    return max(termos_titulo, key=lambda t: (frequencia[t], len(t)))
+
+
+def _contem(tokens, termo):
+    # Compara por palavras e sem acentos; termos compostos exigem todas as palavras
+    if not termo:
+        return False
+    normalizados = {sem_acentos(t) for t in set(tokens)}
+    return all(sem_acentos(p) in normalizados for p in tokenizar(termo) if p not in STOPWORDS_PT)
+
+
+def metricas_artigo(resultado):
+    """Calcula as métricas brutas e a fração atendida (0 a 1) de cada critério."""
+    titulo = resultado.get("titulo", "")
+    texto = resultado.get("texto", "")
+    paragrafos = [p for p in texto.split("\n\n") if p.strip()]
+    tokens = tokenizar(texto)
+    palavras = len(tokens)
+    palavra_chave = inferir_palavra_chave(resultado, Counter(tokens))
+    estrutural = "headings" in resultado
+
+    headings = resultado.get("headings", [])
+    niveis = [h["nivel"] for h in headings]
+    saltos = sum(1 for a, b in zip(niveis, niveis[1:]) if b > a + 1)
+    n_subtitulos = len(resultado.get("subtitulos", []))
+    imagens = resultado.get("imagens", {})
+    links = resultado.get("links", {})
+    meta = resultado.get("meta_description", "")
+    legibilidade = flesch_pt(texto, tokens)
+    # "Início" do texto: primeiros dois parágrafos, limitados a 100 palavras
+    tokens_inicio = tokenizar(" ".join(paragrafos[:2]))[:100]
+
+    metricas = {
+        "palavra_chave": palavra_chave,
+        "caracteres_titulo": len(titulo),
+        "palavras": palavras,
+        "paragrafos": len(paragrafos),
+        "subtitulos": n_subtitulos,
+        "flesch": round(legibilidade, 1),
+        "h1": niveis.count(1),
+        "saltos_headings": saltos,
+        "caracteres_meta": len(meta),
+        "links_internos": links.get("internos", 0),
+        "links_externos": links.get("externos", 0),
+    }
+
+    fracoes = {
+        "titulo_tamanho": _faixa(len(titulo), 10, 30, 65, 90),
+        "palavra_chave_titulo": 1.0 if _contem(tokenizar(titulo), palavra_chave) else 0.0,
+        "palavra_chave_inicio": 1.0 if _contem(tokens_inicio, palavra_chave) else 0.0,
+        "h1_unico": 1.0 if niveis.count(1) == 1 else 0.0,
+        "hierarquia_headings": 1.0 if headings and saltos == 0 else (0.5 if saltos == 1 else 0.0),
+        "subtitulos": _faixa(n_subtitulos, 0, max(2, palavras // 300)),
+        "tamanho_texto": _faixa(palavras, 300, 1000),
+        "legibilidade": _faixa(legibilidade, 20, 50),
+        "meta_description": _faixa(len(meta), 50, 120, 160, 250),
+        "links_internos": _faixa(links.get("internos", 0), 0, 3),
+        "links_externos": 1.0 if links.get("externos", 0) else 0.0,
+        "alt_imagens": imagens.get("cobertura_alt") if imagens.get("total") else 1.0,
+    }
+    disponiveis = {c: estrutural or c not in _CRITERIOS_ESTRUTURAIS for c in CRITERIOS}
+    return metricas, fracoes, disponiveis
+
+
+def _notas(matriz_fracoes, matriz_disponiveis):
+    # nota = 10 * soma(peso * fração) / soma(peso dos critérios disponíveis)
+    pesos = [PESOS[c] for c in CRITERIOS]
+    if np is not None:
+        f = np.asarray(matriz_fracoes, dtype=float)
+        d = np.asarray(matriz_disponiveis, dtype=float)
+        w = np.asarray(pesos)
+        return list(10 * ((f * d) @ w) / (d @ w))
+    notas = []
+    for fracoes, disponiveis in zip(matriz_fracoes, matriz_disponiveis):
+        obtido = sum(p * f * d for p, f, d in zip(pesos, fracoes, disponiveis))
+        possivel = sum(p * d for p, d in zip(pesos, disponiveis))
+        notas.append(10 * obtido / possivel)
+    return notas
+
+
+def pontuar_lote(resultados):
+    """Nota local de vários artigos; os pesos são aplicados à matriz inteira de uma vez."""
+    linhas = [metricas_artigo(r) for r in resultados]
+    matriz_fracoes = [[fracoes[c] for c in CRITERIOS] for _, fracoes, _ in linhas]
+    matriz_disponiveis = [[disponiveis[c] for c in CRITERIOS] for _, _, disponiveis in linhas]
+
+    pontuacoes = []
+    for (metricas, fracoes, disponiveis), nota in zip(linhas, _notas(matriz_fracoes, matriz_disponiveis)):
+        pontuacoes.append({
+            "nota": round(float(nota), 2),
+            "metricas": metricas,
+            "criterios": {
+                c: {"peso": PESOS[c], "atendido": round(fracoes[c], 2)}
+                for c in CRITERIOS if disponiveis[c]
+            },
+        })
+    return pontuacoes
+
+
+def pontuar_artigo(resultado):
+    return pontuar_lote([resultado])[0]
+
+
+def sugestoes_locais(pontuacao, quantidade=3):
+    # Critérios que mais tiraram pontos, em ordem de impacto
+    perdas = sorted(
+        ((c["peso"] * (1 - c["atendido"]), nome) for nome, c in pontuacao["criterios"].items()),
+        reverse=True,
+    )
+    palavra_chave = pontuacao["metricas"]["palavra_chave"]
+    return [
+        SUGESTOES[nome].format(palavra_chave=palavra_chave)
+        for perda, nome in perdas[:quantidade] if perda > 0
+    ]
+
+
+def explicacao_local(pontuacao):
+    atendidos = [n for n, c in pontuacao["criterios"].items() if c["atendido"] >= 0.99]
+    faltantes = [n for n, c in pontuacao["criterios"].items() if c["atendido"] < 0.99]
+    m = pontuacao["metricas"]
+    return (
+        f"Avaliação local (regras): {m['palavras']} palavras, Flesch {m['flesch']}, "
+        f"palavra-chave \"{m['palavra_chave']}\". "
+        f"Critérios atendidos: {', '.join(atendidos) or 'nenhum'}. "
+        f"A melhorar: {', '.join(faltantes) or 'nenhum'}."
+    )
+
+
+def avaliacao_local(pontuacao):
+    return {
+        "nota_seo": pontuacao["nota"],
+        "explicacao": explicacao_local(pontuacao),
+        "sugestoes": sugestoes_locais(pontuacao),
+    }
+
+
+def tipo_consulta_llm(pontuacao, modo=None, faixa=None):
+    """Decide se o LLM é chamado: "completa", "sugestoes" ou None (só nota local)."""
+    modo = modo or MODO_LLM
+    minimo, maximo = faixa or FAIXA_LIMIAR
+    if modo == "sempre":
+        return "completa"
+    if modo == "sugestoes":
+        return "sugestoes"
+    if modo == "limiar" and minimo <= pontuacao["nota"] <= maximo:
+        return "completa"
+    return None
@@ -1,203 +1,406 @@
+import argparse
+import hashlib
 import json
-import requests
-import re
 from datetime import datetime
 from pathlib import Path
-from playwright.sync_api import sync_playwright
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from browser_pool import obter_pool
+from cache import obter_cache_seo
+from dom_extraction import SCRIPT_EXTRACAO, dominio_da_url, montar_resultado
+from incremental import (
+    cabecalhos_condicionais,
+    obter_estado_incremental,
+    pagespeed_vencido,
+    reaproveitar_conteudo,
+)
+from lab_vitals import coletar, ler_perfil, na_amostra_pagespeed, preparar
+from pagespeed import obter_cliente_pagespeed
+from rate_limit import obter_limitador
+from resource_policy import politica_do_ambiente
+from result_store import obter_armazem
+from seo import (
+    MODELO_SEO,
+    TEMPERATURA_SEO,
+    avaliacao_com_erro,
+    chave_cache_seo,
+    estimar_tokens,
+    finalizar_avaliacao,
+    interpretar_resposta_seo,
+    preparar_avaliacao,
+    tokens_usados,
+)
+from snapshot_archive import arquivamento_ativo, arquivar
+from static_extractor import NAO_MODIFICADO, extrair_estatico_condicional
+from telemetry import etapa, obter_logger, obter_metricas, rastrear_url, registrar_tokens
 
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# auto: tenta só HTTP e recorre ao Playwright quando necessário | estatico | playwright
+MODO_EXTRACAO = os.getenv("EXTRACTION_MODE", "auto")
 
-PAGESPEED_API_KEY = os.getenv("GOOGLE_PAGESPEED_API_KEY")
+# Imagens, mídia, fontes e rastreadores não são baixados durante a extração
+POLITICA_RECURSOS = politica_do_ambiente()
 
-def extrair_conteudo_site(url): 
+# Com LAB_VITALS_PROFILE, a etapa de PageSpeed mede a página no navegador local
+PERFIL_VITAIS = ler_perfil()
 
-    with sync_playwright() as p:
-        print("[DEBUG] Iniciando Playwright")
-        browser = p.chromium.launch(headless=False, args=["--start-maximized"])
+# Etapas de analisar_url; a avaliação depende da extração
+ETAPAS = ("extracao", "avaliacao", "pagespeed")
 
-        context = browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            ),
-            viewport={"width": 1280, "height": 800},
-            timezone_id="America/Sao_Paulo",
-            locale="pt-BR",
-        )
+log = obter_logger("main")
 
-        page = context.new_page()
+_cliente_openai = None
 
-        try:
-            print("[DEBUG] Acessando URL...")
-            page.goto(url, timeout=60000, wait_until="domcontentloaded")
-
-            print("[DEBUG] Esperando seletor...")
-            page.wait_for_selector('article, h1, p', timeout=15000)
+def criar_cliente_openai():
+    # Importado só aqui: o SDK da OpenAI leva mais tempo para carregar que o resto
+    # do projeto inteiro, e execuções sem LLM não precisam dele
+    from openai import OpenAI
 
-            print("[DEBUG] Tirando screenshot...")
-            page.screenshot(path="erro_debug.png", full_page=True)
+    # As novas tentativas ficam com o rate_limit, que conhece as cotas e o Retry-After
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
 
-            print("[DEBUG] Extraindo título...")
-            titulo = page.locator('h1').first.text_content() or ""
+def obter_cliente_openai():
+    global _cliente_openai
+    if _cliente_openai is None:
+        _cliente_openai = criar_cliente_openai()
+    return _cliente_openai
 
-            print("[DEBUG] Extraindo subtítulos...")
-            subtitulos = page.locator('h2, h3').all_text_contents()
-
-            print("[DEBUG] Extraindo parágrafos...")
-            paragrafos = page.locator('p').all_text_contents()
-            texto = "\n\n".join(paragrafos)
-
-            print("[DEBUG] Finalizando extração")
-            return {
-                'link': url,
-                'titulo': titulo.strip(),
-                'subtitulos': [s.strip() for s in subtitulos if s.strip()],
-                'texto': texto.strip()
-            }
-
-        except Exception as e:
-            print(f"[ERRO AO EXECUTAR] {e}")
-            page.screenshot(path="erro_debug.png", full_page=True)
-            raise Exception("Falha ao extrair conteúdo. Verifique o console e o screenshot.")
+def extrair_conteudo_site(url, pool=None, politica=POLITICA_RECURSOS, vitais=None):
+    pool = pool or obter_pool()
+    return pool.executar(lambda page: _extrair_da_pagina(page, url, politica, vitais))
 
-        finally:
-            browser.close()
+def _extrair_da_pagina(page, url, politica=None, vitais=None):
+    # Com `vitais` (perfil de lab_vitals), a mesma navegação mede as Core Web
+    # Vitals, que vão em resultado["vitais_lab"]. Bloquear imagens e fontes
+    # distorceria LCP e bytes transferidos, então a política fica de fora
+    rede = preparar(page, vitais) if vitais else None
+    estatisticas = politica.aplicar(page, url) if politica and not vitais else None
 
-def consultar_pagespeed_api(url):
     try:
-        api_url = "https://www.googleapis.com/pagespeedonline/v5/runPagespeed"
-        params = {
-            "url": url,
-            "key": PAGESPEED_API_KEY,
-            "strategy": "desktop",
-            "category": ["performance", "accessibility", "best-practices", "seo"]
-        }
-
-        response = requests.get(api_url, params=params, timeout=60)
-        data = response.json()
-
-        if "lighthouseResult" not in data:
-            print(f"[AVISO] Nenhum dado encontrado para {url}")
-            return {}
-
-        lighthouse = data["lighthouseResult"]
-        audits = lighthouse.get("audits", {})
-        categories = lighthouse.get("categories", {})
-
-        def safe_get(d, key):
-            return d.get(key, {}).get("displayValue", "N/A")
-
-        def safe_score(cat):
-            score = categories.get(cat, {}).get("score")
-            return round(score * 100) if score is not None else "N/A"
-
-        return {
-            "core_web_vitals": {
-                "LCP": safe_get(audits, "largest-contentful-paint"),
-                "INP": safe_get(audits, "interaction-to-next-paint"),
-                "CLS": safe_get(audits, "cumulative-layout-shift"),
-                "FCP": safe_get(audits, "first-contentful-paint"),
-                "TTFB": safe_get(audits, "server-response-time"),
-            },
-            "performance": {
-                "FCP": safe_get(audits, "first-contentful-paint"),
-                "TotalBlockingTime": safe_get(audits, "total-blocking-time"),
-                "SpeedIndex": safe_get(audits, "speed-index"),
-                "LCP": safe_get(audits, "largest-contentful-paint"),
-                "CLS": safe_get(audits, "cumulative-layout-shift"),
-            },
-            "accessibility": safe_score("accessibility"),
-            "best_practices": safe_score("best-practices"),
-            "seo": safe_score("seo")
-        }
+        with etapa("navegador.goto"):
+            resposta = page.goto(url, timeout=60000, wait_until="domcontentloaded")
 
-    except Exception as e:
-        print(f"[ERRO] Falha ao consultar PageSpeed para {url}: {e}")
-        return {}
-
-if __name__ == "__main__":
-
-    input_path = Path("input_url.txt")
-
-    if not input_path.exists():
-        print("❌ Nenhuma URL encontrada no arquivo input_url.txt.")
-        exit(1)
-
-    with open(input_path, "r") as f:
-        url = f.read().strip()
-
-    try:
-        resultado = extrair_conteudo_site(url)
+        with etapa("navegador.wait_for_selector"):
+            page.wait_for_selector('article, h1, p', timeout=15000)
 
-        print("[DEBUG] Avaliando SEO com GPT-4o...")
+        vitais_lab = None
+        if vitais:
+            with etapa("navegador.vitais"):
+                vitais_lab = coletar(page, rede, vitais)
 
-        prompt_seo = f"""
-Avalie o seguinte conteúdo de blog com base nas boas práticas de SEO. 
-Considere os critérios: uso de palavras-chave no título, headings, meta description, links internos/externos, tamanho e legibilidade do texto. 
-Retorne um dicionário JSON com:
+        if arquivamento_ativo():
+            with etapa("navegador.arquivar"):
+                arquivar(url, page.content(), "playwright",
+                         resposta.status if resposta else None, resposta.headers if resposta else None)
 
-- "nota_seo": um número float entre 0 e 10 (não use porcentagem)
-- "explicacao": um parágrafo com os pontos fortes e fracos
-- "sugestoes": uma lista com 3 sugestões práticas e aplicáveis de melhorias SEO
+        with etapa("navegador.extracao"):
+            dados = page.evaluate(SCRIPT_EXTRACAO, dominio_da_url(page.url))
+            resultado = montar_resultado(url, dados)
 
-Conteúdo:
-Título: {resultado["titulo"]}
-Subtítulos: {resultado["subtitulos"]}
-Texto: {resultado["texto"][:3000]}...
-"""
+        if estatisticas:
+            resultado['recursos'] = estatisticas.resumo()
+        if vitais_lab:
+            resultado['vitais_lab'] = vitais_lab
+        return resultado
 
+    except Exception as e:
+        log.error(f"Falha na extração com Playwright de {url}: {e}")
+        # Um arquivo por URL: extrações simultâneas não sobrescrevem o das outras
+        screenshot = f"erro_debug_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]}.png"
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt_seo}],
-                temperature=0.4
-            )
-
-            raw_response = response.choices[0].message.content
-            print("[DEBUG] Conteúdo retornado pelo GPT-4o:")
-            print(raw_response)
-
-            # Remove blocos de markdown (```json ... ```)
-            cleaned_response = re.sub(r"```json|```", "", raw_response).strip()
-
-            # Tenta carregar como JSON
-            seo_analysis = json.loads(cleaned_response)
+            page.screenshot(path=screenshot, full_page=True)
+        except Exception:
+            pass
+        raise Exception(f"Falha ao extrair conteúdo. Verifique o console e o screenshot {screenshot}.")
+
+def extrair_conteudo(url, pool=None, modo=None, vitais=None):
+    return extrair_conteudo_condicional(url, pool=pool, modo=modo, vitais=vitais)[0]
+
+def extrair_conteudo_condicional(url, cabecalhos=None, pool=None, modo=None, vitais=None):
+    """Retorna (resultado, validadores); resultado é None quando a página não mudou (HTTP 304)."""
+    modo = modo or MODO_EXTRACAO
+    motivo = None
+    validadores = {}
+
+    if modo != "playwright":
+        with etapa("extracao.estatica") as span:
+            try:
+                resultado, motivo, validadores = extrair_estatico_condicional(url, cabecalhos)
+            except Exception as e:
+                resultado, motivo = None, f"erro HTTP: {e}"
+            span.definir(motivo_fallback=motivo)
+
+        if motivo == NAO_MODIFICADO:
+            log.debug("Página não modificada desde a última análise")
+            return None, validadores
+        if motivo is None:
+            resultado["metodo_extracao"] = "estatico"
+            return resultado, validadores
+        if modo == "estatico":
+            raise Exception(f"Extração estática insuficiente: {motivo}")
+        log.debug(f"Recorrendo ao Playwright ({motivo})")
+
+    with etapa("extracao.playwright"):
+        resultado = extrair_conteudo_site(url, pool=pool, vitais=vitais)
+    resultado["metodo_extracao"] = "playwright"
+    if motivo:
+        resultado["motivo_fallback"] = motivo
+    return resultado, validadores
+
+def consultar_pagespeed_api(url, estrategias=None):
+    with etapa("pagespeed"):
+        return obter_cliente_pagespeed().consultar_estrategias(url, estrategias)
+
+def medir_vitais_lab(url, pool=None, perfil=None):
+    """Carrega a página no pool só para medir as Core Web Vitals de laboratório."""
+    perfil = perfil or PERFIL_VITAIS
+    pool = pool or obter_pool()
+
+    def medir(page):
+        rede = preparar(page, perfil)
+        with etapa("navegador.goto"):
+            page.goto(url, timeout=60000, wait_until="domcontentloaded")
+        with etapa("navegador.vitais"):
+            return coletar(page, rede, perfil)
+
+    return pool.executar(medir)
+
+def consultar_desempenho(url, resultado=None, pool=None):
+    """Bloco page_speed da URL: pela API do PageSpeed ou, com LAB_VITALS_PROFILE, medido localmente.
+
+    A medição da extração (`vitais_lab` do resultado) é reaproveitada; sem ela,
+    a página é carregada de novo no navegador. URLs na amostra de
+    PAGESPEED_SAMPLE_RATE também vão à API, em "pagespeed_api", para comparação.
+    """
+    vitais_lab = (resultado or {}).pop("vitais_lab", None)
+    if PERFIL_VITAIS is None:
+        return consultar_pagespeed_api(url)
+    if vitais_lab is None:
+        with etapa("pagespeed.laboratorio"):
+            vitais_lab = medir_vitais_lab(url, pool)
+    if na_amostra_pagespeed(url):
+        vitais_lab["pagespeed_api"] = consultar_pagespeed_api(url)
+    return vitais_lab
+
+def avaliar_seo(resultado, cliente=None, cache=None, modo_llm=None):
+    pontuacao, tipo, prompt_seo = preparar_avaliacao(resultado, modo_llm)
+    log.debug(f"Nota local de SEO: {pontuacao['nota']}")
+    if tipo is None:
+        return finalizar_avaliacao(pontuacao, None)
+
+    cache = cache or obter_cache_seo()
+    chave = chave_cache_seo(resultado, tipo)
+
+    avaliacao = cache.obter(chave)
+    obter_metricas().incrementar("seo_cache_total", cache="seo", resultado="hit" if avaliacao is not None else "miss")
+    if avaliacao is not None:
+        log.debug("Avaliação de SEO encontrada no cache")
+        return finalizar_avaliacao(pontuacao, tipo, avaliacao)
+
+    cliente = cliente or obter_cliente_openai()
 
-            resultado["nota_seo"] = seo_analysis.get("nota_seo")
-            resultado["explicacao"] = seo_analysis.get("explicacao")
-            resultado["sugestoes"] = seo_analysis.get("sugestoes")
+    try:
+        with etapa("llm", modelo=MODELO_SEO, tipo=tipo) as span:
+            response = obter_limitador("openai").executar(
+                lambda: cliente.chat.completions.create(
+                    model=MODELO_SEO,
+                    messages=[{"role": "user", "content": prompt_seo}],
+                    temperature=TEMPERATURA_SEO
+                ),
+                tokens=estimar_tokens(prompt_seo),
+                medir_tokens=tokens_usados,
+            )
+            registrar_tokens(span, response.usage)
 
-            print("[DEBUG] Análise de SEO concluída")
+        raw_response = response.choices[0].message.content
+        log.debug(f"Conteúdo retornado pelo GPT-4o: {raw_response}")
 
-        except Exception as e:
-            print(f"[ERRO] Falha ao analisar SEO: {e}")
-            resultado["nota_seo"] = None
-            resultado["explicacao"] = "Erro durante a análise de SEO."
-            resultado["sugestoes"] = []
+        avaliacao = interpretar_resposta_seo(raw_response)
+        cache.salvar(chave, avaliacao)
+        return finalizar_avaliacao(pontuacao, tipo, avaliacao)
 
-        print("[DEBUG] Consultando métricas do PageSpeed...")
-        resultado["page_speed"] = consultar_pagespeed_api(url)
-
-        output_dir = Path("output_files")
+    except Exception as e:
+        log.error(f"Falha ao analisar SEO: {e}")
+        return finalizar_avaliacao(pontuacao, tipo, avaliacao_com_erro())
+
+def analisar_url(url, cliente=None, pool=None, cache=None, modo=None, etapas=ETAPAS, modo_llm=None):
+    # `tempos` traz o tempo total e a soma de cada etapa (goto, LLM, PageSpeed...)
+    with rastrear_url(url) as rastreio:
+        vitais = PERFIL_VITAIS if "pagespeed" in etapas else None
+        resultado = extrair_conteudo(url, pool=pool, modo=modo, vitais=vitais) if "extracao" in etapas else {"link": url}
+        if "avaliacao" in etapas:
+            resultado.update(avaliar_seo(resultado, cliente=cliente, cache=cache, modo_llm=modo_llm))
+        if "pagespeed" in etapas:
+            resultado["page_speed"] = consultar_desempenho(url, resultado, pool)
+        resultado["tempos"] = rastreio.resumo()
+    return resultado
+
+def analisar_url_incremental(url, cliente=None, pool=None, cache=None, estado=None, armazem=None, resumo=None,
+                             modo=None):
+    """Como analisar_url, mas só refaz as etapas necessárias desde a última análise.
+
+    A página é baixada com If-None-Match/If-Modified-Since; se o conteúdo não
+    mudou, a avaliação anterior é reaproveitada, e o PageSpeed só é consultado
+    quando passa do intervalo INCREMENTAL_PAGESPEED_DAYS. O campo
+    `incremental` do resultado diz quais etapas foram executadas.
+    """
+    with rastrear_url(url) as rastreio:
+        resultado = _analisar_incremental(url, cliente, pool, cache, estado, armazem, resumo, modo)
+        resultado["tempos"] = rastreio.resumo()
+    return resultado
+
+def _analisar_incremental(url, cliente, pool, cache, estado, armazem, resumo, modo):
+    estado = estado or obter_estado_incremental()
+    armazem = armazem or obter_armazem()
+    agora = time.time()
+
+    anterior = armazem.ultimo_por_url(url)
+    # Sem análise salva não há o que reaproveitar
+    pagina = estado.obter(url) if anterior else {}
+
+    medir_pagespeed = pagespeed_vencido(pagina, anterior, agora)
+    resultado, validadores = extrair_conteudo_condicional(
+        url, cabecalhos_condicionais(pagina), pool=pool, modo=modo,
+        vitais=PERFIL_VITAIS if medir_pagespeed else None,
+    )
+    etapas = {"extracao": resultado is not None}
+    resultado, hash_atual, avaliacao = reaproveitar_conteudo(resultado, anterior, pagina)
+
+    etapas["avaliacao"] = avaliacao is None
+    if avaliacao is None:
+        avaliacao = avaliar_seo(resultado, cliente=cliente, cache=cache)
+    else:
+        log.debug("Conteúdo inalterado; avaliação de SEO reaproveitada")
+    resultado.update(avaliacao)
+
+    etapas["pagespeed"] = medir_pagespeed
+    if etapas["pagespeed"]:
+        resultado["page_speed"] = consultar_desempenho(url, resultado, pool)
+    else:
+        resultado["page_speed"] = anterior["page_speed"]
+
+    estado.registrar(url, pagina, validadores, hash_atual, etapas["pagespeed"], agora)
+    if resumo is not None:
+        resumo.registrar(etapas)
+    resultado["incremental"] = etapas
+    return resultado
+
+def salvar_resultado(resultado, output_dir="output_files", armazem=None, registrar=True):
+    # O histórico consultável fica no armazém SQLite; o JSON é mantido por compatibilidade.
+    # Resultados parciais (só algumas etapas) não entram no histórico
+    with etapa("gravacao"):
+        if registrar:
+            (armazem or obter_armazem()).salvar(resultado)
+
+        output_dir = Path(output_dir)
         output_dir.mkdir(exist_ok=True)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         output_path = output_dir / f"resultado_{timestamp}.json"
 
         with open(output_path, "w", encoding="utf-8") as f:
             json.dump(resultado, f, ensure_ascii=False, indent=2)
 
-        print(f"Resultado salvo em: {output_path}")
-        # Salva nome do último arquivo gerado para o app ler
-        with open("last_result.txt", "w") as f:
-            f.write(str(output_path))
-
-    except Exception as e:
-        print(f"Erro ao executar a análise: {e}")
-        exit(1)
+    return output_path
+
+def ler_urls(urls, arquivo=None):
+    """URLs dos argumentos e de um arquivo (- para stdin); sem nenhum dos dois, do input_url.txt."""
+    if not urls and arquivo is None and Path("input_url.txt").exists():
+        arquivo = "input_url.txt"
+    vistas = set()
+    for url in list(urls) + list(_linhas(arquivo) if arquivo else []):
+        if not url.startswith("http"):
+            log.warning(f"Entrada ignorada, não é uma URL http(s): {url}")
+        elif url not in vistas:
+            vistas.add(url)
+            yield url
+
+def _linhas(caminho):
+    entrada = sys.stdin if caminho == "-" else open(caminho, "r", encoding="utf-8")
+    with entrada:
+        for linha in entrada:
+            if linha.strip() and not linha.lstrip().startswith("#"):
+                yield linha.strip()
+
+def _etapas(texto):
+    etapas = tuple(e.strip() for e in texto.split(",") if e.strip())
+    if not etapas or any(e not in ETAPAS for e in etapas):
+        raise argparse.ArgumentTypeError(f"etapas válidas: {','.join(ETAPAS)}")
+    if "avaliacao" in etapas and "extracao" not in etapas:
+        raise argparse.ArgumentTypeError("a etapa avaliacao depende de extracao")
+    return etapas
+
+def _executar(args):
+    urls = list(ler_urls(args.urls, args.arquivo))
+    if not urls:
+        print("❌ Nenhuma URL informada (argumentos, --arquivo, --arquivo - para stdin ou input_url.txt).")
+        return 1
+
+    # O pool (e o Playwright) só é criado quando a extração recorre ao navegador
+    pool = None
+    if args.visivel and "extracao" in args.etapas:
+        from browser_pool import PoolNavegadores
+
+        pool = PoolNavegadores(headless=False)
+    # Resultados parciais não entram no histórico: a reanálise incremental parte dele
+    completa = set(args.etapas) == set(ETAPAS)
+
+    def analisar(url):
+        try:
+            return analisar_url(url, pool=pool, modo=args.modo_extracao, etapas=args.etapas, modo_llm=args.modo_llm)
+        except Exception as e:
+            log.error(f"Erro ao analisar {url}: {e}")
+            return {"link": url, "erro": str(e)}
+
+    escritor = None
+    if args.formato != "arquivos":
+        from jsonl_output import EscritorJSONL
+
+        saida = Path(args.saida or Path("output_files") / f"analise_{datetime.now():%Y%m%d_%H%M%S}.jsonl")
+        escritor = EscritorJSONL(saida)
+    erros = 0
+    with ThreadPoolExecutor(args.concorrencia) as executor:
+        for resultado in executor.map(analisar, urls):
+            if "erro" in resultado:
+                erros += 1
+                print(f"Erro ao executar a análise de {resultado['link']}: {resultado['erro']}")
+            if escritor is not None:
+                escritor.escrever(resultado)
+                if completa and "erro" not in resultado:
+                    obter_armazem().salvar(resultado)
+            elif "erro" not in resultado:
+                output_path = salvar_resultado(resultado, args.saida or "output_files", registrar=completa)
+                print(f"Resultado salvo em: {output_path}")
+
+    if escritor is not None:
+        escritor.fechar()
+        if args.formato == "json":
+            from jsonl_output import exportar_lista_json
+
+            print(f"Lista JSON exportada em {exportar_lista_json(saida, saida.with_suffix('.json'))}")
+        print(f"{escritor.escritos} resultados salvos em {saida}")
+    if pool is not None:
+        pool.fechar()
+    return 1 if erros else 0
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Análise SEO de artigos: extração, avaliação (nota local + GPT) e PageSpeed."
+    )
+    parser.add_argument("urls", nargs="*", help="URLs a analisar")
+    parser.add_argument("--arquivo", help="arquivo com uma URL por linha (- para stdin)")
+    parser.add_argument("--etapas", type=_etapas, default=ETAPAS,
+                        help=f"etapas separadas por vírgula (padrão: {','.join(ETAPAS)})")
+    parser.add_argument("--modo-extracao", choices=["auto", "estatico", "playwright"])
+    parser.add_argument("--modo-llm", choices=["sempre", "sugestoes", "limiar", "nunca"])
+    parser.add_argument("--visivel", action="store_true", help="mostra o navegador")
+    parser.add_argument("--concorrencia", type=int, default=1, help="URLs analisadas ao mesmo tempo")
+    parser.add_argument("--formato", choices=["arquivos", "jsonl", "json"], default="arquivos",
+                        help="um JSON por URL (padrão), um arquivo JSONL, ou JSONL + lista JSON")
+    parser.add_argument("--saida", help="pasta (formato arquivos) ou arquivo JSONL")
+    sys.exit(_executar(parser.parse_args()))
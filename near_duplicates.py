@@ -0,0 +1,373 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from array import array
+from pathlib import Path
+
+from jsonl_output import ler_jsonl
+from pt_text import palavras_relevantes, sem_acentos, tokenizar
+from telemetry import obter_logger
+
+# Similaridade de Jaccard (estimada) a partir da qual dois artigos são quase duplicados
+LIMIAR_DUPLICADOS = float(os.getenv("DUPLICATE_THRESHOLD", "0.6"))
+# Palavras por shingle
+TAMANHO_SHINGLE = int(os.getenv("DUPLICATE_SHINGLE_WORDS", "5"))
+# Um balde LSH muito cheio (o mesmo template em milhares de páginas) só
+# contribui com esta quantidade de candidatos, para a busca não ficar quadrática
+MAX_CANDIDATOS_BALDE = 100
+
+# 128 posições na assinatura: os 7 bits altos do hash escolhem a posição e os
+# 25 bits restantes são o valor (one permutation hashing)
+PERMUTACOES = 128
+_BITS_VALOR = 25
+_VAZIO = 1 << _BITS_VALOR
+_MASCARA_VALOR = _VAZIO - 1
+
+log = obter_logger("near_duplicates")
+
+
+def _hash32(texto):
+    # crc32 é estável entre processos (hash() de str não é) e rápido; a
+    # multiplicação espalha os bits para os 7 bits altos ficarem uniformes
+    return (zlib.crc32(texto.encode("utf-8")) * 0x9E3779B1) & 0xFFFFFFFF
+
+
+def tokens_do_artigo(resultado):
+    subtitulos = " ".join(resultado.get("subtitulos") or [])
+    return tokenizar(f"{subtitulos} {resultado.get('texto') or ''}")
+
+
+def assinatura_minhash(tokens, tamanho=TAMANHO_SHINGLE):
+    """Assinatura MinHash de 128 posições dos shingles de `tamanho` palavras.
+
+    Usa uma única função de hash para todas as posições (one permutation
+    hashing), o que custa um hash por shingle em vez de 128. Posições que
+    ficaram vazias (textos curtos) copiam a próxima posição preenchida,
+    deslocada pela distância (densificação por rotação), para que a fração de
+    posições iguais continue estimando a similaridade de Jaccard.
+    Retorna um array('I') ou None se o texto não tem palavras.
+    """
+    if not tokens:
+        return None
+    minimos = [_VAZIO] * PERMUTACOES
+    for i in range(max(1, len(tokens) - tamanho + 1)):
+        h = _hash32(" ".join(tokens[i:i + tamanho]))
+        posicao, valor = h >> _BITS_VALOR, h & _MASCARA_VALOR
+        if valor < minimos[posicao]:
+            minimos[posicao] = valor
+
+    assinatura = array("I", minimos)
+    for posicao in range(PERMUTACOES):
+        if minimos[posicao] == _VAZIO:
+            distancia = 1
+            while minimos[(posicao + distancia) % PERMUTACOES] == _VAZIO:
+                distancia += 1
+            # Valores emprestados ficam acima de _VAZIO e nunca colidem com valores reais
+            assinatura[posicao] = minimos[(posicao + distancia) % PERMUTACOES] + distancia * _VAZIO
+    return assinatura
+
+
+def similaridade(a, b):
+    return sum(x == y for x, y in zip(a, b)) / PERMUTACOES
+
+
+def parametros_lsh(limiar, permutacoes=PERMUTACOES):
+    """(bandas, linhas por banda) com bandas * linhas = permutacoes.
+
+    Escolhe o ponto de colisão (1/bandas)^(1/linhas) mais próximo do limiar
+    sem passar dele: prioriza não perder pares, que depois são conferidos
+    pela similaridade da assinatura inteira.
+    """
+    opcoes = [(permutacoes // r, r) for r in range(1, permutacoes + 1) if permutacoes % r == 0]
+    abaixo = [o for o in opcoes if (1 / o[0]) ** (1 / o[1]) <= limiar]
+    return max(abaixo, key=lambda o: (1 / o[0]) ** (1 / o[1])) if abaixo else opcoes[0]
+
+
+def chave_titulo(titulo):
+    # Mesmos termos relevantes, em qualquer ordem: "Como investir em CDB" e
+    # "CDB: como investir" disputam a mesma busca
+    return " ".join(sorted({sem_acentos(p) for p in palavras_relevantes(titulo or "")})) or None
+
+
+class IndiceDuplicados:
+    """Índice LSH persistente (SQLite) de assinaturas MinHash dos artigos.
+
+    Cada artigo guarda uma assinatura de 512 bytes e uma linha por banda; um
+    artigo novo só é comparado com os que caem em algum balde em comum, então
+    indexar N artigos custa ~O(N) consultas indexadas em vez de N² comparações.
+    Os pares acima do limiar são gravados na hora, e `grupos` os junta.
+    """
+
+    def __init__(self, caminho, limiar=None):
+        self.caminho = str(caminho)
+        if self.caminho != ":memory:":
+            Path(self.caminho).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.caminho, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS parametros (nome TEXT PRIMARY KEY, valor TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS artigos (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                titulo TEXT,
+                chave_titulo TEXT,
+                palavras INTEGER NOT NULL,
+                hash_conteudo TEXT NOT NULL,
+                assinatura BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_artigos_titulo ON artigos (chave_titulo);
+            CREATE TABLE IF NOT EXISTS baldes (
+                banda INTEGER NOT NULL,
+                chave INTEGER NOT NULL,
+                artigo INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_baldes ON baldes (banda, chave);
+            CREATE INDEX IF NOT EXISTS idx_baldes_artigo ON baldes (artigo);
+            CREATE TABLE IF NOT EXISTS pares (
+                a INTEGER NOT NULL,
+                b INTEGER NOT NULL,
+                similaridade REAL NOT NULL,
+                PRIMARY KEY (a, b)
+            );
+            CREATE INDEX IF NOT EXISTS idx_pares_b ON pares (b);
+            """
+        )
+        # Os parâmetros ficam gravados: um índice existente continua com os seus
+        salvos = dict(self._conn.execute("SELECT nome, valor FROM parametros"))
+        if salvos:
+            self.limiar = float(salvos["limiar"])
+            self.tamanho_shingle = int(salvos["tamanho_shingle"])
+        else:
+            self.limiar = LIMIAR_DUPLICADOS if limiar is None else limiar
+            self.tamanho_shingle = TAMANHO_SHINGLE
+            self._conn.executemany(
+                "INSERT INTO parametros (nome, valor) VALUES (?, ?)",
+                [("limiar", str(self.limiar)), ("tamanho_shingle", str(self.tamanho_shingle))],
+            )
+        self._conn.commit()
+        self.bandas, self.linhas = parametros_lsh(self.limiar)
+
+    def _chaves_bandas(self, assinatura):
+        bruto = assinatura.tobytes()
+        passo = self.linhas * assinatura.itemsize
+        return [
+            int.from_bytes(hashlib.blake2b(bruto[i * passo:(i + 1) * passo], digest_size=8).digest(),
+                           "little", signed=True)
+            for i in range(self.bandas)
+        ]
+
+    def _remover(self, artigo_id):
+        self._conn.execute("DELETE FROM baldes WHERE artigo = ?", (artigo_id,))
+        self._conn.execute("DELETE FROM pares WHERE a = ? OR b = ?", (artigo_id, artigo_id))
+        self._conn.execute("DELETE FROM artigos WHERE id = ?", (artigo_id,))
+
+    def adicionar(self, resultado, commit=True):
+        """Indexa um artigo (ou atualiza o da mesma URL); retorna [(url, similaridade)] dos quase duplicados.
+
+        Um artigo já indexado com o mesmo conteúdo não é recalculado.
+        """
+        url = resultado.get("link") or resultado.get("url")
+        tokens = tokens_do_artigo(resultado)
+        if not url or not tokens:
+            return []
+        hash_conteudo = hashlib.blake2b(" ".join(tokens).encode("utf-8"), digest_size=16).hexdigest()
+
+        with self._lock:
+            existente = self._conn.execute(
+                "SELECT id, hash_conteudo FROM artigos WHERE url = ?", (url,)
+            ).fetchone()
+            if existente and existente[1] == hash_conteudo:
+                return self._vizinhos(existente[0])
+
+        assinatura = assinatura_minhash(tokens, self.tamanho_shingle)
+        chaves = self._chaves_bandas(assinatura)
+        titulo = resultado.get("titulo") or ""
+
+        with self._lock:
+            existente = self._conn.execute("SELECT id FROM artigos WHERE url = ?", (url,)).fetchone()
+            if existente:
+                self._remover(existente[0])
+            candidatos = set()
+            for banda, chave in enumerate(chaves):
+                candidatos.update(linha[0] for linha in self._conn.execute(
+                    "SELECT artigo FROM baldes WHERE banda = ? AND chave = ? LIMIT ?",
+                    (banda, chave, MAX_CANDIDATOS_BALDE),
+                ))
+
+            artigo_id = self._conn.execute(
+                "INSERT INTO artigos (url, titulo, chave_titulo, palavras, hash_conteudo, assinatura) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, titulo, chave_titulo(titulo), len(tokens), hash_conteudo, assinatura.tobytes()),
+            ).lastrowid
+            self._conn.executemany(
+                "INSERT INTO baldes (banda, chave, artigo) VALUES (?, ?, ?)",
+                [(banda, chave, artigo_id) for banda, chave in enumerate(chaves)],
+            )
+
+            duplicados = []
+            candidatos = sorted(candidatos)
+            # Em blocos: o SQLite limita o número de parâmetros de um IN (...)
+            for inicio in range(0, len(candidatos), 500):
+                bloco = candidatos[inicio:inicio + 500]
+                for outro_id, outra_url, bruto in self._conn.execute(
+                    f"SELECT id, url, assinatura FROM artigos WHERE id IN ({','.join('?' * len(bloco))})", bloco
+                ):
+                    outra = array("I")
+                    outra.frombytes(bruto)
+                    valor = similaridade(assinatura, outra)
+                    if valor >= self.limiar:
+                        duplicados.append((outra_url, valor))
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO pares (a, b, similaridade) VALUES (?, ?, ?)",
+                            (min(artigo_id, outro_id), max(artigo_id, outro_id), valor),
+                        )
+            if commit:
+                self._conn.commit()
+        return sorted(duplicados, key=lambda d: -d[1])
+
+    def adicionar_varios(self, resultados, lote=500):
+        """Indexa um iterável de resultados com um commit a cada `lote`; retorna quantos foram indexados."""
+        total = 0
+        for resultado in resultados:
+            if "erro" in resultado:
+                continue
+            self.adicionar(resultado, commit=False)
+            total += 1
+            if total % lote == 0:
+                with self._lock:
+                    self._conn.commit()
+                if total % (lote * 20) == 0:
+                    log.info(f"{total} artigos indexados")
+        with self._lock:
+            self._conn.commit()
+        return total
+
+    def _vizinhos(self, artigo_id):
+        linhas = self._conn.execute(
+            "SELECT a.url, p.similaridade FROM pares p JOIN artigos a "
+            "ON a.id = CASE WHEN p.a = ? THEN p.b ELSE p.a END "
+            "WHERE p.a = ? OR p.b = ? ORDER BY p.similaridade DESC",
+            (artigo_id, artigo_id, artigo_id),
+        ).fetchall()
+        return [(url, valor) for url, valor in linhas]
+
+    def remover(self, url):
+        with self._lock:
+            linha = self._conn.execute("SELECT id FROM artigos WHERE url = ?", (url,)).fetchone()
+            if linha:
+                self._remover(linha[0])
+                self._conn.commit()
+            return linha is not None
+
+    def grupos(self, limiar=None):
+        """Grupos de quase duplicados (componentes conexos dos pares), do maior para o menor."""
+        limiar = self.limiar if limiar is None else limiar
+        with self._lock:
+            pares = self._conn.execute(
+                "SELECT a, b, similaridade FROM pares WHERE similaridade >= ?", (limiar,)
+            ).fetchall()
+
+        # Union-find com compressão de caminho
+        pai = {}
+
+        def raiz(x):
+            pai.setdefault(x, x)
+            while pai[x] != x:
+                pai[x] = pai[pai[x]]
+                x = pai[x]
+            return x
+
+        for a, b, _ in pares:
+            pai[raiz(a)] = raiz(b)
+        componentes = {}
+        for a, b, valor in pares:
+            grupo = componentes.setdefault(raiz(a), {"ids": set(), "similaridades": []})
+            grupo["ids"].update((a, b))
+            grupo["similaridades"].append(valor)
+
+        grupos = []
+        with self._lock:
+            for grupo in componentes.values():
+                ids = sorted(grupo["ids"])
+                artigos = self._conn.execute(
+                    f"SELECT url, titulo, palavras FROM artigos WHERE id IN ({','.join('?' * len(ids))}) ORDER BY url",
+                    ids,
+                ).fetchall()
+                grupos.append({
+                    "artigos": [{"url": u, "titulo": t, "palavras": p} for u, t, p in artigos],
+                    "similaridade_min": round(min(grupo["similaridades"]), 3),
+                    "similaridade_max": round(max(grupo["similaridades"]), 3),
+                })
+        return sorted(grupos, key=lambda g: (-len(g["artigos"]), -g["similaridade_max"]))
+
+    def colisoes_titulo(self):
+        """Artigos cujos títulos (H1) têm os mesmos termos relevantes: candidatos a canibalização."""
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT chave_titulo, url, titulo FROM artigos WHERE chave_titulo IN ("
+                "SELECT chave_titulo FROM artigos WHERE chave_titulo IS NOT NULL "
+                "GROUP BY chave_titulo HAVING COUNT(*) > 1) ORDER BY chave_titulo, url"
+            ).fetchall()
+        colisoes = {}
+        for chave, url, titulo in linhas:
+            colisoes.setdefault(chave, []).append({"url": url, "titulo": titulo})
+        return [{"termos": chave, "artigos": artigos} for chave, artigos in colisoes.items()]
+
+    def total(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM artigos").fetchone()[0]
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+def obter_indice_duplicados(caminho=None):
+    return IndiceDuplicados(caminho or os.getenv("DUPLICATE_INDEX_PATH", "cache/duplicados.sqlite"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quase duplicados e títulos que competem entre si no blog inteiro.")
+    parser.add_argument("--indice", help="arquivo do índice (padrão: DUPLICATE_INDEX_PATH)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("indexar", help="adiciona artigos ao índice (JSONL do lote/rastreador ou o armazém)")
+    p.add_argument("arquivos", nargs="*", help="arquivos JSONL; sem nenhum, usa a última análise de cada URL do armazém")
+    p = sub.add_parser("relatorio", help="grupos de quase duplicados e colisões de título")
+    p.add_argument("--limiar", type=float, help="similaridade mínima (não abaixo da usada ao indexar)")
+    p.add_argument("--saida", help="salva o relatório em JSON")
+    args = parser.parse_args()
+
+    indice = obter_indice_duplicados(args.indice)
+    if args.comando == "indexar":
+        if args.arquivos:
+            fontes = (r for caminho in args.arquivos for r in ler_jsonl(caminho))
+        else:
+            from result_store import obter_armazem
+
+            fontes = obter_armazem().iterar_ultimos()
+        total = indice.adicionar_varios(fontes)
+        print(f"{total} artigos indexados; {indice.total()} no índice")
+    else:
+        relatorio = {"grupos": indice.grupos(args.limiar), "colisoes_titulo": indice.colisoes_titulo()}
+        for grupo in relatorio["grupos"]:
+            print(f"\n{len(grupo['artigos'])} quase duplicados "
+                  f"(similaridade {grupo['similaridade_min']:.2f}–{grupo['similaridade_max']:.2f}):")
+            for artigo in grupo["artigos"]:
+                print(f"  {artigo['url']}  ({artigo['palavras']} palavras)")
+        for colisao in relatorio["colisoes_titulo"]:
+            print(f"\nTítulos com os termos \"{colisao['termos']}\":")
+            for artigo in colisao["artigos"]:
+                print(f"  {artigo['url']}  {artigo['titulo']}")
+        print(f"\n{len(relatorio['grupos'])} grupos de quase duplicados, "
+              f"{len(relatorio['colisoes_titulo'])} colisões de título")
+        if args.saida:
+            with open(args.saida, "w", encoding="utf-8") as f:
+                json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    indice.fechar()
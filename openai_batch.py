@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from cache import chave_hash, obter_cache_seo
+from jsonl_output import EscritorJSONL, ler_jsonl, urls_concluidas
+from result_store import obter_armazem
+from seo import (
+    MODELO_SEO,
+    TEMPERATURA_SEO,
+    avaliacao_com_erro,
+    chave_cache_seo,
+    finalizar_avaliacao,
+    interpretar_resposta_seo,
+    preparar_avaliacao,
+)
+from telemetry import obter_logger
+
+load_dotenv()
+
+log = obter_logger("openai_batch")
+
+DIRETORIO_LOTE = Path(os.getenv("OPENAI_BATCH_DIR", "batch"))
+ENDPOINT = "/v1/chat/completions"
+
+
+def custom_id_artigo(resultado, tipo):
+    # Estável: o mesmo artigo com o mesmo conteúdo gera sempre o mesmo id
+    return "seo-" + chave_hash(resultado["link"], chave_cache_seo(resultado, tipo))[:32]
+
+
+def ler_artigos(caminho):
+    # Aceita tanto uma lista JSON (saída antiga) quanto JSONL (um artigo por linha)
+    if Path(caminho).suffix == ".jsonl":
+        yield from ler_jsonl(caminho)
+    else:
+        with open(caminho, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+
+
+def escrever_requisicoes(artigos, caminho_requisicoes, caminho_manifesto, modo_llm=None, cache=None):
+    """Serializa o prompt de cada artigo no formato JSONL da Batch API.
+
+    O manifesto guarda o artigo extraído de cada custom_id, para a ingestão
+    remontar o resultado completo. Artigos cuja avaliação já está no cache ou
+    que dispensam o LLM (pelo SEO_LLM_MODE) não entram no lote.
+    """
+    cache = cache or obter_cache_seo()
+    Path(caminho_requisicoes).parent.mkdir(parents=True, exist_ok=True)
+    contagem = {"no_lote": 0, "em_cache": 0, "so_local": 0}
+    vistos = set()
+
+    with open(caminho_requisicoes, "w", encoding="utf-8") as req, \
+            open(caminho_manifesto, "w", encoding="utf-8") as man:
+        for resultado in artigos:
+            _, tipo, prompt = preparar_avaliacao(resultado, modo_llm)
+            if tipo is None:
+                contagem["so_local"] += 1
+            elif cache.obter(chave_cache_seo(resultado, tipo)) is not None:
+                contagem["em_cache"] += 1
+            else:
+                custom_id = custom_id_artigo(resultado, tipo)
+                if custom_id in vistos:
+                    continue
+                vistos.add(custom_id)
+                req.write(json.dumps({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": ENDPOINT,
+                    "body": {
+                        "model": MODELO_SEO,
+                        "messages": [{"role": "user", "content": prompt}],
+                        "temperature": TEMPERATURA_SEO,
+                    },
+                }, ensure_ascii=False) + "\n")
+                contagem["no_lote"] += 1
+            man.write(json.dumps({"tipo": tipo, "artigo": resultado}, ensure_ascii=False) + "\n")
+
+    return contagem
+
+
+def enviar_lote(cliente, caminho_requisicoes):
+    with open(caminho_requisicoes, "rb") as f:
+        arquivo = cliente.files.create(file=f, purpose="batch")
+    lote = cliente.batches.create(
+        input_file_id=arquivo.id,
+        endpoint=ENDPOINT,
+        completion_window="24h",
+        metadata={"origem": "seo-blog-analyzer"},
+    )
+    return lote
+
+
+def baixar_resultados(cliente, batch_id, caminho_resultados, intervalo=30, timeout=None):
+    """Aguarda o lote terminar e salva o JSONL de saída; devolve o objeto do lote."""
+    inicio = time.monotonic()
+    while True:
+        lote = cliente.batches.retrieve(batch_id)
+        if lote.status in ("completed", "failed", "expired", "cancelled"):
+            break
+        if timeout is not None and time.monotonic() - inicio > timeout:
+            raise TimeoutError(f"Lote {batch_id} ainda está em '{lote.status}'")
+        time.sleep(intervalo)
+
+    if lote.output_file_id:
+        conteudo = cliente.files.content(lote.output_file_id)
+        Path(caminho_resultados).write_bytes(conteudo.read())
+    return lote
+
+
+def ingerir_resultados(caminho_resultados, caminho_manifesto, cache=None):
+    """Junta as respostas do lote aos artigos do manifesto, um registro por artigo.
+
+    As avaliações válidas também vão para o cache, para que a análise online
+    dos mesmos artigos não chame o LLM de novo.
+    """
+    cache = cache or obter_cache_seo()
+
+    respostas = {}
+    if Path(caminho_resultados).exists():
+        with open(caminho_resultados, "r", encoding="utf-8") as f:
+            for linha in f:
+                if linha.strip():
+                    item = json.loads(linha)
+                    respostas[item["custom_id"]] = item
+
+    with open(caminho_manifesto, "r", encoding="utf-8") as f:
+        for linha in f:
+            entrada = json.loads(linha)
+            resultado, tipo = entrada["artigo"], entrada["tipo"]
+            pontuacao, _, _ = preparar_avaliacao(resultado, "nunca")
+
+            if tipo is None:
+                yield {**resultado, **finalizar_avaliacao(pontuacao, None)}
+                continue
+
+            chave = chave_cache_seo(resultado, tipo)
+            avaliacao = cache.obter(chave)
+            if avaliacao is None:
+                item = respostas.get(custom_id_artigo(resultado, tipo))
+                try:
+                    if item is None or item.get("error"):
+                        raise ValueError((item or {}).get("error") or "sem resposta no lote")
+                    body = item["response"]["body"]
+                    avaliacao = interpretar_resposta_seo(body["choices"][0]["message"]["content"])
+                    cache.salvar(chave, avaliacao)
+                except Exception as e:
+                    log.error(f"Falha ao ler avaliação do lote para {resultado['link']}: {e}")
+                    avaliacao = avaliacao_com_erro()
+
+            yield {**resultado, **finalizar_avaliacao(pontuacao, tipo, avaliacao)}
+
+
+def _caminhos(nome):
+    # Sufixos anexados ao nome inteiro: com with_suffix, "lote.v1" e "lote.v2"
+    # virariam os mesmos arquivos
+    base = DIRETORIO_LOTE / nome
+    return (
+        base.parent / f"{base.name}.requisicoes.jsonl",
+        base.parent / f"{base.name}.manifesto.jsonl",
+        base.parent / f"{base.name}.resultados.jsonl",
+    )
+
+
+def _cliente():
+    from openai import OpenAI
+
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Avaliação SEO em lote pela Batch API da OpenAI.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("preparar", help="gera o JSONL de requisições a partir dos artigos extraídos")
+    p.add_argument("artigos", help="JSON ou JSONL com os artigos extraídos")
+    p.add_argument("--nome", default=datetime.now().strftime("lote_%Y%m%d_%H%M%S"))
+    p.add_argument("--modo-llm", choices=["sempre", "sugestoes", "limiar", "nunca"])
+
+    p = sub.add_parser("enviar", help="envia o JSONL preparado e cria o lote")
+    p.add_argument("nome")
+
+    p = sub.add_parser("baixar", help="espera o lote terminar e baixa as respostas")
+    p.add_argument("nome")
+    p.add_argument("batch_id")
+    p.add_argument("--intervalo", type=float, default=30)
+
+    p = sub.add_parser("ingerir", help="gera os resultados finais a partir das respostas")
+    p.add_argument("nome")
+
+    args = parser.parse_args()
+
+    if args.comando == "preparar":
+        requisicoes, manifesto, _ = _caminhos(args.nome)
+        contagem = escrever_requisicoes(ler_artigos(args.artigos), requisicoes, manifesto, args.modo_llm)
+        print(f"Lote '{args.nome}' preparado em {requisicoes}: {contagem}")
+
+    elif args.comando == "enviar":
+        requisicoes, _, _ = _caminhos(args.nome)
+        lote = enviar_lote(_cliente(), requisicoes)
+        print(f"Lote enviado: {lote.id} (status {lote.status})")
+
+    elif args.comando == "baixar":
+        _, _, resultados = _caminhos(args.nome)
+        lote = baixar_resultados(_cliente(), args.batch_id, resultados, args.intervalo)
+        print(f"Lote {lote.id} terminou com status {lote.status}; respostas em {resultados}")
+
+    elif args.comando == "ingerir":
+        _, manifesto, resultados = _caminhos(args.nome)
+        armazem = obter_armazem()
+        output_path = Path("output_files") / f"avaliacoes_seo_{args.nome}.jsonl"
+        # Reingerir o mesmo lote sobrescreve a saída anterior, mas o que ela já
+        # tinha já está no armazém e não vira uma segunda linha no histórico
+        armazenados = urls_concluidas(output_path)
+        output_path.unlink(missing_ok=True)
+        with EscritorJSONL(output_path) as escritor:
+            for registro in ingerir_resultados(resultados, manifesto):
+                if registro["link"] not in armazenados:
+                    armazem.salvar(registro)
+                escritor.escrever(registro)
+        print(f"{escritor.escritos} avaliações salvas em {output_path}")
@@ -0,0 +1,195 @@
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import CacheSQLite, chave_hash
+from rate_limit import obter_limitador
+from telemetry import etapa, obter_logger, obter_metricas
+
+log = obter_logger("pagespeed")
+
+# Pode apontar para o servidor local de testes (test/local_servers.py pagespeed)
+PAGESPEED_API_URL = os.getenv("PAGESPEED_API_URL", "https://www.googleapis.com/pagespeedonline/v5/runPagespeed")
+
+CATEGORIAS_PADRAO = ("performance", "accessibility", "best-practices", "seo")
+
+ESTRATEGIAS_PADRAO = tuple(
+    e.strip() for e in os.getenv("PAGESPEED_STRATEGIES", "desktop").split(",") if e.strip()
+)
+
+
+def montar_parametros(url, api_key, strategy="desktop", categorias=CATEGORIAS_PADRAO):
+    return {
+        "url": url,
+        "key": api_key,
+        "strategy": strategy,
+        "category": list(categorias),
+    }
+
+
+def resumir_lighthouse(data):
+    # Converte a resposta bruta da API v5 no bloco `page_speed` dos resultados
+    if "lighthouseResult" not in data:
+        return {}
+
+    lighthouse = data["lighthouseResult"]
+    audits = lighthouse.get("audits", {})
+    categories = lighthouse.get("categories", {})
+
+    def safe_get(d, key):
+        return d.get(key, {}).get("displayValue", "N/A")
+
+    def safe_score(cat):
+        score = categories.get(cat, {}).get("score")
+        return round(score * 100) if score is not None else "N/A"
+
+    return {
+        "core_web_vitals": {
+            "LCP": safe_get(audits, "largest-contentful-paint"),
+            "INP": safe_get(audits, "interaction-to-next-paint"),
+            "CLS": safe_get(audits, "cumulative-layout-shift"),
+            "FCP": safe_get(audits, "first-contentful-paint"),
+            "TTFB": safe_get(audits, "server-response-time"),
+        },
+        "performance": {
+            "FCP": safe_get(audits, "first-contentful-paint"),
+            "TotalBlockingTime": safe_get(audits, "total-blocking-time"),
+            "SpeedIndex": safe_get(audits, "speed-index"),
+            "LCP": safe_get(audits, "largest-contentful-paint"),
+            "CLS": safe_get(audits, "cumulative-layout-shift"),
+        },
+        "accessibility": safe_score("accessibility"),
+        "best_practices": safe_score("best-practices"),
+        "seo": safe_score("seo")
+    }
+
+
+def mesclar_estrategias(resumos):
+    # A primeira estratégia com dados preenche o topo do bloco (formato antigo,
+    # só desktop); todas ficam disponíveis em "por_estrategia"
+    preenchidos = {estrategia: resumo for estrategia, resumo in resumos.items() if resumo}
+    if not preenchidos:
+        return {}
+    principal = next(iter(preenchidos.values()))
+    return {**principal, "por_estrategia": preenchidos}
+
+
+class ClientePageSpeed:
+    """Cliente da API PageSpeed v5 com sessão HTTP reaproveitada e cache com TTL."""
+
+    def __init__(self, api_key=None, cache=None, timeout=60, max_conexoes=8):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.api_key = api_key or os.getenv("GOOGLE_PAGESPEED_API_KEY")
+        self.cache = cache
+        self.timeout = timeout
+        self.max_conexoes = max_conexoes
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_conexoes)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @staticmethod
+    def chave(url, strategy, categorias=CATEGORIAS_PADRAO):
+        return chave_hash(url, strategy, sorted(categorias))
+
+    def _do_cache(self, chave):
+        if self.cache is None:
+            return None
+        resumo = self.cache.obter(chave)
+        obter_metricas().incrementar(
+            "seo_cache_total", cache="pagespeed", resultado="hit" if resumo is not None else "miss"
+        )
+        return resumo
+
+    def _guardar(self, chave, url, strategy, response):
+        resumo = resumir_lighthouse(response.json())
+        if not resumo:
+            log.warning(f"Nenhum dado encontrado para {url} ({strategy}, HTTP {response.status_code})")
+        elif self.cache is not None:
+            self.cache.salvar(chave, resumo)
+        return resumo
+
+    def consultar(self, url, strategy="desktop", categorias=CATEGORIAS_PADRAO):
+        chave = self.chave(url, strategy, categorias)
+        resumo = self._do_cache(chave)
+        if resumo is not None:
+            return resumo
+
+        try:
+            with etapa(f"pagespeed.{strategy}") as span:
+                params = montar_parametros(url, self.api_key, strategy, categorias)
+                response = obter_limitador("pagespeed").executar(
+                    lambda: self.session.get(PAGESPEED_API_URL, params=params, timeout=self.timeout)
+                )
+                span.definir(http_status=response.status_code)
+                return self._guardar(chave, url, strategy, response)
+        except Exception as e:
+            log.error(f"Falha ao consultar PageSpeed ({strategy}) para {url}: {e}")
+            return {}
+
+    async def consultar_async(self, cliente_http, url, strategy="desktop", categorias=CATEGORIAS_PADRAO):
+        """Como `consultar`, com um httpx.AsyncClient no lugar da sessão do requests."""
+        chave = self.chave(url, strategy, categorias)
+        resumo = self._do_cache(chave)
+        if resumo is not None:
+            return resumo
+
+        try:
+            with etapa(f"pagespeed.{strategy}") as span:
+                params = montar_parametros(url, self.api_key, strategy, categorias)
+                response = await obter_limitador("pagespeed").executar_async(
+                    lambda: cliente_http.get(PAGESPEED_API_URL, params=params, timeout=self.timeout)
+                )
+                span.definir(http_status=response.status_code)
+                return self._guardar(chave, url, strategy, response)
+        except Exception as e:
+            log.error(f"Falha ao consultar PageSpeed ({strategy}) para {url}: {e}")
+            return {}
+
+    def consultar_estrategias(self, url, estrategias=None, categorias=CATEGORIAS_PADRAO):
+        estrategias = tuple(estrategias or ESTRATEGIAS_PADRAO)
+        if len(estrategias) == 1:
+            return mesclar_estrategias({estrategias[0]: self.consultar(url, estrategias[0], categorias)})
+
+        with ThreadPoolExecutor(max_workers=len(estrategias)) as executor:
+            futuros = {
+                estrategia: executor.submit(contextvars.copy_context().run, self.consultar, url, estrategia, categorias)
+                for estrategia in estrategias
+            }
+            return mesclar_estrategias({e: f.result() for e, f in futuros.items()})
+
+    async def consultar_estrategias_async(self, cliente_http, url, estrategias=None, categorias=CATEGORIAS_PADRAO):
+        estrategias = tuple(estrategias or ESTRATEGIAS_PADRAO)
+        resumos = await asyncio.gather(*(
+            self.consultar_async(cliente_http, url, estrategia, categorias) for estrategia in estrategias
+        ))
+        return mesclar_estrategias(dict(zip(estrategias, resumos)))
+
+    def fechar(self):
+        self.session.close()
+
+
+_cliente_pagespeed = None
+_cliente_pagespeed_lock = threading.Lock()
+
+
+def obter_cache_pagespeed():
+    return CacheSQLite(
+        os.getenv("PAGESPEED_CACHE_PATH", "cache/pagespeed.sqlite"),
+        tabela="pagespeed",
+        ttl=float(os.getenv("PAGESPEED_CACHE_TTL", 24 * 3600)),
+        max_itens=int(os.getenv("PAGESPEED_CACHE_MAX_ITEMS", "50000")),
+    )
+
+
+def obter_cliente_pagespeed():
+    global _cliente_pagespeed
+    with _cliente_pagespeed_lock:
+        if _cliente_pagespeed is None:
+            _cliente_pagespeed = ClientePageSpeed(cache=obter_cache_pagespeed())
+        return _cliente_pagespeed
@@ -0,0 +1,162 @@
+import os
+import re
+
+from pt_text import tokenizar
+
+# Orçamento de tokens do conteúdo do artigo no prompt (estrutura + trechos)
+ORCAMENTO_TOKENS = int(os.getenv("SEO_PROMPT_TOKENS", "700"))
+# Frases muito longas (ou texto sem pontuação) são cortadas neste número de palavras
+MAX_PALAVRAS_FRASE = 45
+# A estrutura entra sempre inteira; acima disso, os headings seguintes são omitidos
+MAX_HEADINGS = 60
+
+# Parágrafos curtos com estes termos são banner de cookies, rodapé, newsletter...
+# que a extração de <p> também captura; parágrafos longos nunca são descartados
+_RE_BOILERPLATE = re.compile(
+    r"cookie|pol[ií]tica de privacidade|termos de uso|direitos reservados|©|copyright"
+    r"|newsletter|inscreva-se|assine|cadastre-se|compartilh|leia tamb[ée]m|veja tamb[ée]m"
+    r"|siga-nos|redes sociais|clique aqui|saiba mais|all rights reserved|privacy policy",
+    re.IGNORECASE,
+)
+_MAX_PALAVRAS_BOILERPLATE = 40
+# Parágrafos menores que isso são navegação ("Próximo", "Compartilhar") ou legenda
+_MIN_PALAVRAS = 4
+_RE_FRASE = re.compile(r"(?<=[.!?…])\s+")
+
+_codificador = None
+
+
+def _obter_codificador():
+    # tiktoken é opcional: sem ele (ou sem o arquivo do vocabulário), a contagem é estimada
+    global _codificador
+    if _codificador is None:
+        try:
+            import tiktoken
+
+            _codificador = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _codificador = False
+    return _codificador
+
+
+def contar_tokens(texto):
+    codificador = _obter_codificador()
+    if codificador:
+        return len(codificador.encode(texto))
+    # Em português, ~4 caracteres por token no vocabulário do gpt-4o
+    return (len(texto) + 3) // 4
+
+
+def _assinatura(paragrafo):
+    return " ".join(tokenizar(paragrafo))
+
+
+def remover_boilerplate(paragrafos):
+    """Retorna os índices dos parágrafos que são conteúdo do artigo.
+
+    Descarta repetições (o mesmo aviso em vários pontos da página, ignorando
+    caixa e pontuação), fragmentos de navegação e parágrafos curtos com cara
+    de banner, rodapé ou chamada social.
+    """
+    vistos = set()
+    mantidos = []
+    for i, paragrafo in enumerate(paragrafos):
+        assinatura = _assinatura(paragrafo)
+        if assinatura in vistos:
+            continue
+        vistos.add(assinatura)
+        palavras = len(assinatura.split())
+        if palavras < _MIN_PALAVRAS:
+            continue
+        if palavras <= _MAX_PALAVRAS_BOILERPLATE and _RE_BOILERPLATE.search(paragrafo):
+            continue
+        mantidos.append(i)
+    return mantidos
+
+
+def _frases(paragrafo):
+    frases = []
+    for frase in _RE_FRASE.split(paragrafo):
+        palavras = frase.split()
+        if len(palavras) > MAX_PALAVRAS_FRASE:
+            frase = " ".join(palavras[:MAX_PALAVRAS_FRASE]) + "…"
+        if frase.strip():
+            frases.append(frase.strip())
+    return frases
+
+
+def _secoes(resultado, paragrafos):
+    # [(heading ou None, [índices de parágrafo])]; a primeira é a introdução.
+    # Resultados antigos não têm o índice "paragrafo" nos headings: o texto
+    # inteiro vira uma seção só, e os subtítulos aparecem apenas na estrutura
+    headings = [h for h in resultado.get("headings", []) if h["nivel"] > 1][:MAX_HEADINGS]
+    if not headings or any("paragrafo" not in h for h in headings):
+        return [(None, list(range(len(paragrafos))))], headings
+    secoes = [(None, list(range(headings[0]["paragrafo"])))]
+    for atual, seguinte in zip(headings, headings[1:] + [None]):
+        fim = seguinte["paragrafo"] if seguinte else len(paragrafos)
+        secoes.append((atual, list(range(atual["paragrafo"], fim))))
+    return secoes, []
+
+
+def compactar_conteudo(resultado, orcamento=None):
+    """Resumo extrativo do artigo que cabe em `orcamento` tokens.
+
+    Mantém a estrutura inteira (todos os headings, na ordem) e escolhe frases
+    por rodadas: primeiro a abertura da introdução, da conclusão e de cada
+    seção; com orçamento sobrando, a frase seguinte de cada uma, e assim por
+    diante. "[…]" marca onde houve texto omitido.
+    """
+    orcamento = orcamento or ORCAMENTO_TOKENS
+    paragrafos = [p for p in resultado.get("texto", "").split("\n\n") if p.strip()]
+    conteudo = set(remover_boilerplate(paragrafos))
+    palavras = sum(len(tokenizar(paragrafos[i])) for i in conteudo)
+    secoes, so_estrutura = _secoes(resultado, paragrafos)
+
+    # Frases de cada bloco (introdução, seções e conclusão), já sem boilerplate
+    blocos = []
+    for heading, indices in secoes:
+        indices = [i for i in indices if i in conteudo]
+        rotulo = f"H{heading['nivel']}: {heading['texto']}" if heading else "[Introdução]"
+        blocos.append({"rotulo": rotulo, "paragrafos": indices})
+    ultimo = next((b for b in reversed(blocos) if b["paragrafos"]), None)
+    if ultimo is not None and (ultimo is not blocos[0] or len(ultimo["paragrafos"]) > 1):
+        blocos.append({"rotulo": "[Conclusão]", "paragrafos": [ultimo["paragrafos"].pop()]})
+    for bloco in blocos:
+        bloco["frases"] = [f for i in bloco["paragrafos"] for f in _frases(paragrafos[i])]
+        bloco["escolhidas"] = 0
+
+    linhas_estrutura = [f"H{h['nivel']}: {h['texto']}" for h in so_estrutura]
+    omitidos = sum(1 for h in resultado.get("headings", []) if h["nivel"] > 1) - MAX_HEADINGS
+    if omitidos > 0:
+        linhas_estrutura.append(f"[+{omitidos} headings omitidos]")
+    ignorados = len(paragrafos) - len(conteudo)
+    cabecalho = f"[{palavras} palavras, {len(conteudo)} parágrafos"
+    cabecalho += f"; {ignorados} de boilerplate ignorados]" if ignorados else "]"
+    usados = contar_tokens(cabecalho) + sum(contar_tokens(l) + 1 for l in linhas_estrutura)
+    usados += sum(contar_tokens(b["rotulo"]) + 1 for b in blocos if b["frases"] or b["rotulo"][0] == "H")
+
+    # Rodadas: a n-ésima frase de cada bloco só entra depois da (n-1)-ésima de todos,
+    # com introdução e conclusão à frente das seções. Frase que não cabe encerra o bloco
+    rodada = 0
+    prioridade = [blocos[0]] + blocos[-1:] + blocos[1:-1] if blocos[-1]["rotulo"] == "[Conclusão]" else blocos
+    pendentes = [b for b in prioridade if b["frases"]]
+    while pendentes:
+        for bloco in pendentes:
+            custo = contar_tokens(bloco["frases"][rodada]) + 1
+            if usados + custo <= orcamento:
+                usados += custo
+                bloco["escolhidas"] += 1
+            else:
+                bloco["frases"] = bloco["frases"][:bloco["escolhidas"]] + [None]
+        rodada += 1
+        pendentes = [b for b in pendentes if len(b["frases"]) > rodada and b["frases"][rodada] is not None]
+
+    linhas = [cabecalho] + linhas_estrutura
+    for bloco in blocos:
+        if bloco["escolhidas"] or bloco["rotulo"][0] == "H":
+            linhas.append(bloco["rotulo"])
+        if bloco["escolhidas"]:
+            trecho = " ".join(bloco["frases"][:bloco["escolhidas"]])
+            linhas.append(trecho + " […]" if bloco["escolhidas"] < len(bloco["frases"]) else trecho)
+    return "\n".join(linhas)
@@ -0,0 +1,108 @@
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+STOPWORDS_PT = frozenset("""
+a à ao aos aquela aquelas aquele aqueles aquilo as às até com como da das de dela delas dele deles
+depois do dos e é ela elas ele eles em entre era eram essa essas esse esses esta está estão estas
+este estes eu foi foram há isso isto já la lhe lhes lo mais mas me mesmo meu meus minha minhas muito
+na não nas nem no nos nós nossa nossas nosso nossos num numa o os ou para pela pelas pelo pelos por
+qual quando que quem se seja sem ser será seu seus só sua suas também te tem têm ter teu tua um uma
+umas uns você vocês vos ser são sobre cada pode podem qualquer todo toda todos todas ainda então
+onde assim porque pois seus suas tal tão seja sejam estar sendo sido tendo vai vão fazer faz
+""".split())
+
+_RE_PALAVRA = re.compile(r"[a-zà-öø-ÿ0-9]+(?:-[a-zà-öø-ÿ0-9]+)*", re.IGNORECASE)
+_RE_FRASE = re.compile(r"[.!?…]+(?:\s+|$)")
+_RE_GRUPO_VOGAIS = re.compile(r"[aeiouyáéíóúâêôãõàü]+")
+_ACENTO_AGUDO = set("áéíóú")
+
+
+def tokenizar(texto):
+    return _RE_PALAVRA.findall(texto.lower())
+
+
+def palavras_relevantes(texto):
+    return [p for p in tokenizar(texto) if p not in STOPWORDS_PT and len(p) > 2 and not p.isdigit()]
+
+
+def dividir_frases(texto):
+    return [f for f in _RE_FRASE.split(texto) if f.strip()]
+
+
+@lru_cache(maxsize=100_000)
+def contar_silabas(palavra):
+    # Aproximação: cada grupo de vogais é uma sílaba; grupos com vogal de
+    # acento agudo ("saúde", "país") costumam ser hiato e contam como duas
+    silabas = 0
+    for grupo in _RE_GRUPO_VOGAIS.findall(palavra.lower()):
+        silabas += 2 if len(grupo) > 1 and _ACENTO_AGUDO.intersection(grupo) else 1
+    return max(silabas, 1)
+
+
+def flesch_pt(texto, palavras=None):
+    """Índice de Flesch adaptado ao português (Martins et al., 1996).
+
+    Quanto maior, mais fácil: acima de 75 é muito fácil, abaixo de 25 muito difícil.
+    """
+    palavras = tokenizar(texto) if palavras is None else palavras
+    if not palavras:
+        return 0.0
+    frases = max(len(dividir_frases(texto)), 1)
+    silabas = sum(contar_silabas(p) * n for p, n in Counter(palavras).items())
+    return 248.835 - 1.015 * (len(palavras) / frases) - 84.6 * (silabas / len(palavras))
+
+
+@lru_cache(maxsize=100_000)
+def sem_acentos(texto):
+    return "".join(
+        c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c)
+    )
+
+
+def iterar_palavras(texto):
+    # Como tokenizar, mas com a posição de cada palavra no texto original
+    return _RE_PALAVRA.finditer(texto)
+
+
+# Radicalização leve para o português, na linha do RSLP (Orengo & Huyck, 2001):
+# plural, advérbio, diminutivo/superlativo, sufixos nominais e, se nenhum
+# nominal casou, verbais; por fim a vogal temática. Cada passo remove no
+# máximo um sufixo e mantém pelo menos 3 letras. Não busca o radical "correto",
+# só leva variações da mesma palavra (investir, investimentos, investidor) ao mesmo termo.
+_PLURAL = (("ões", "ão"), ("ães", "ão"), ("ais", "al"), ("éis", "el"), ("eis", "el"), ("óis", "ol"),
+           ("ns", "m"), ("res", "r"), ("les", "l"), ("s", ""))
+_GRAU = ("zinho", "zinha", "inho", "inha", "íssimo", "íssima", "érrimo")
+_NOMINAIS = ("amento", "imento", "mento", "izações", "ização", "ações", "ação", "idade", "ismo", "ista",
+             "ável", "ível", "ância", "ência", "eiro", "eira", "ador", "edor", "idor", "ante", "ente",
+             "ário", "ária", "ório", "ória", "ivo", "iva", "ico", "ica", "oso", "osa", "ia")
+_VERBAIS = ("aríamos", "eríamos", "iríamos", "ássemos", "êssemos", "íssemos", "ariam", "eriam", "iriam",
+            "aram", "eram", "iram", "avam", "ando", "endo", "indo", "ado", "ada", "ido", "ida",
+            "amos", "emos", "imos", "ava", "ar", "er", "ir", "ou", "am", "em")
+
+
+def _sem_sufixo(palavra, sufixos, minimo=3):
+    for sufixo in sufixos:
+        if palavra.endswith(sufixo) and len(palavra) - len(sufixo) >= minimo:
+            return palavra[:-len(sufixo)], True
+    return palavra, False
+
+
+@lru_cache(maxsize=200_000)
+def radical(palavra):
+    palavra = palavra.lower()
+    if len(palavra) <= 3:
+        return sem_acentos(palavra)
+    if palavra.endswith("s") and not palavra.endswith(("ss", "us")):
+        for sufixo, troca in _PLURAL:
+            if palavra.endswith(sufixo) and len(palavra) - len(sufixo) >= 2:
+                palavra = palavra[:-len(sufixo)] + troca
+                break
+    palavra, _ = _sem_sufixo(palavra, ("mente",))
+    palavra, _ = _sem_sufixo(palavra, _GRAU)
+    palavra, nominal = _sem_sufixo(palavra, _NOMINAIS)
+    if not nominal:
+        palavra, _ = _sem_sufixo(palavra, _VERBAIS)
+    palavra, _ = _sem_sufixo(palavra, ("a", "e", "o"))
+    return sem_acentos(palavra)
@@ -0,0 +1,379 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from telemetry import obter_logger, obter_metricas
+
+log = obter_logger("rate_limit")
+
+# Novas tentativas em 429, 5xx, timeouts e erros de conexão
+MAX_RETENTATIVAS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+# Espera antes da tentativa n: aleatória entre 0 e base * 2^n, até o máximo (full jitter)
+ESPERA_BASE = float(os.getenv("RETRY_BASE_SECONDS", "1"))
+ESPERA_MAXIMA = float(os.getenv("RETRY_MAX_SECONDS", "60"))
+# Falhas seguidas que abrem o circuito, e por quanto tempo ele fica aberto
+FALHAS_CIRCUITO = int(os.getenv("CIRCUIT_FAILURES", "5"))
+CIRCUITO_ABERTO_SEGUNDOS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+# As cotas valem por chave de API; com N processos na mesma chave, cada um usa 1/N
+PROCESSOS = max(1, int(os.getenv("RATE_LIMIT_PROCESSES", "1")))
+
+# Limites no formato "quantidade/segundos"; vazio ou 0 desliga o balde. As
+# cotas da OpenAI variam com o tier da conta, então por padrão ficam por conta
+# do AIMD e do Retry-After dos 429; a do PageSpeed é a mesma para todas as chaves
+PROVEDORES = {
+    "openai": {
+        "requisicoes": os.getenv("OPENAI_RATE_LIMIT", ""),
+        "tokens": os.getenv("OPENAI_TOKEN_LIMIT", ""),
+        "concorrencia": int(os.getenv("OPENAI_MAX_CONCURRENCY", "16")),
+    },
+    "pagespeed": {
+        "requisicoes": os.getenv("PAGESPEED_RATE_LIMIT", "400/100"),
+        "tokens": None,
+        "concorrencia": int(os.getenv("PAGESPEED_MAX_CONCURRENCY", "8")),
+    },
+}
+
+STATUS_TRANSITORIOS = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitoAberto(Exception):
+    pass
+
+
+def ler_limite(texto):
+    """Converte "400/100" em (taxa por segundo, capacidade do balde), já dividido entre processos.
+
+    A capacidade deixa passar uma rajada de até 10 segundos de cota.
+    """
+    if not texto or not texto.strip() or texto.strip() == "0":
+        return None
+    quantidade, _, janela = texto.partition("/")
+    janela = float(janela or 1)
+    taxa = float(quantidade) / janela / PROCESSOS
+    return taxa, max(1.0, taxa * min(janela, 10))
+
+
+class BaldeTokens:
+    """Token bucket com reserva antecipada.
+
+    `reservar` desconta na hora (o saldo pode ficar negativo) e devolve quantos
+    segundos o chamador deve esperar; assim a fila de espera não precisa de lock
+    nem de thread própria e serve tanto a código síncrono quanto a asyncio.
+    """
+
+    def __init__(self, taxa, capacidade):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.disponivel = capacidade
+        self._atualizado = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reabastecer(self):
+        agora = time.monotonic()
+        self.disponivel = min(self.capacidade, self.disponivel + (agora - self._atualizado) * self.taxa)
+        self._atualizado = agora
+
+    def reservar(self, quantidade=1):
+        with self._lock:
+            self._reabastecer()
+            self.disponivel -= quantidade
+            return max(0.0, -self.disponivel / self.taxa)
+
+    def espera(self, quantidade=1):
+        # Segundos até haver `quantidade` no balde, sem descontar nada
+        with self._lock:
+            self._reabastecer()
+            return max(0.0, (quantidade - self.disponivel) / self.taxa)
+
+    def ajustar(self, quantidade):
+        # Positivo devolve o que foi reservado a mais; negativo cobra o consumo extra
+        with self._lock:
+            self._reabastecer()
+            self.disponivel = min(self.capacidade, self.disponivel + quantidade)
+
+
+class Disjuntor:
+    """Circuit breaker: depois de `limite_falhas` falhas seguidas, recusa chamadas por `segundos`.
+
+    Passado esse tempo o circuito fica meio aberto: um sucesso o fecha, uma
+    falha o reabre na hora.
+    """
+
+    def __init__(self, nome, limite_falhas=None, segundos=None):
+        self.nome = nome
+        self.limite_falhas = limite_falhas or FALHAS_CIRCUITO
+        self.segundos = CIRCUITO_ABERTO_SEGUNDOS if segundos is None else segundos
+        self.estado = "fechado"
+        self.falhas = 0
+        self.aberto_ate = 0.0
+        self._lock = threading.Lock()
+
+    def verificar(self):
+        with self._lock:
+            if self.estado != "aberto":
+                return
+            restante = self.aberto_ate - time.time()
+            if restante > 0:
+                raise CircuitoAberto(f"Circuito de {self.nome} aberto por mais {restante:.1f}s")
+            self.estado = "meio_aberto"
+
+    def sucesso(self):
+        with self._lock:
+            self.falhas = 0
+            self.estado = "fechado"
+
+    def falha(self):
+        with self._lock:
+            self.falhas += 1
+            if self.estado == "meio_aberto" or self.falhas >= self.limite_falhas:
+                if self.estado != "aberto":
+                    log.warning(f"Circuito de {self.nome} aberto após {self.falhas} falhas seguidas")
+                self.estado = "aberto"
+                self.aberto_ate = time.time() + self.segundos
+
+
+class ConcorrenciaAdaptativa:
+    """Limite de chamadas simultâneas ajustado por AIMD.
+
+    Cada sucesso soma 1/limite (+1 a cada "rodada" de chamadas); um erro de
+    cota ou sobrecarga corta o limite pela metade, no máximo uma vez por
+    `intervalo` segundos, para que uma rajada de 429 não o derrube até o mínimo.
+    """
+
+    def __init__(self, maximo, minimo=1, intervalo=5.0):
+        self.maximo = max(maximo, minimo)
+        self.minimo = minimo
+        self.intervalo = intervalo
+        self.limite = float(self.maximo)
+        self.em_uso = 0
+        self._ultima_reducao = 0.0
+        self._cond = threading.Condition()
+        self._esperas_async = []
+
+    def _tentar_entrar(self):
+        if self.em_uso < int(self.limite):
+            self.em_uso += 1
+            return True
+        return False
+
+    def _acordar(self):
+        self._cond.notify_all()
+        esperas, self._esperas_async = self._esperas_async, []
+        for loop, futuro in esperas:
+            loop.call_soon_threadsafe(lambda f=futuro: f.done() or f.set_result(None))
+
+    def entrar(self):
+        with self._cond:
+            while not self._tentar_entrar():
+                self._cond.wait()
+
+    async def entrar_async(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._tentar_entrar():
+                    return
+                futuro = loop.create_future()
+                self._esperas_async.append((loop, futuro))
+            await futuro
+
+    def sair(self):
+        with self._cond:
+            self.em_uso -= 1
+            self._acordar()
+
+    def sucesso(self):
+        with self._cond:
+            if self.limite < self.maximo:
+                self.limite = min(self.maximo, self.limite + 1 / self.limite)
+                self._acordar()
+
+    def reduzir(self):
+        with self._cond:
+            agora = time.monotonic()
+            if agora - self._ultima_reducao < self.intervalo:
+                return
+            self._ultima_reducao = agora
+            self.limite = max(self.minimo, self.limite / 2)
+            log.info(f"Concorrência reduzida para {int(self.limite)}")
+
+
+def _status(objeto):
+    status = getattr(objeto, "status_code", None)
+    if status is None:
+        status = getattr(getattr(objeto, "response", None), "status_code", None)
+    return status
+
+
+def _erro_de_rede(erro):
+    # Pelo nome, para cobrir requests, httpx e openai sem importar nenhum deles
+    nomes = " ".join(classe.__name__.lower() for classe in type(erro).__mro__)
+    return any(termo in nomes for termo in ("timeout", "connect", "transport"))
+
+
+def espera_retry_after(objeto):
+    """Segundos pedidos pelo servidor em Retry-After (ou retry-after-ms), se houver."""
+    headers = getattr(objeto, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(objeto, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        valor = headers.get("retry-after")
+        if not valor:
+            return None
+        try:
+            return max(0.0, float(valor))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class LimitadorProvedor:
+    """Camada comum às chamadas de uma API externa (OpenAI, PageSpeed).
+
+    Antes de cada tentativa: circuito, pausa pedida por Retry-After, baldes de
+    requisições e de tokens e concorrência adaptativa. Respostas 429/5xx e
+    erros de rede são repetidos com espera exponencial; o resultado da última
+    tentativa (resposta ou exceção) é devolvido ao chamador.
+    """
+
+    def __init__(self, nome, requisicoes=None, tokens=None, concorrencia=8, max_retentativas=None):
+        self.nome = nome
+        limite = ler_limite(requisicoes)
+        self.balde_requisicoes = BaldeTokens(*limite) if limite else None
+        limite = ler_limite(tokens)
+        self.balde_tokens = BaldeTokens(*limite) if limite else None
+        self.concorrencia = ConcorrenciaAdaptativa(concorrencia)
+        self.circuito = Disjuntor(nome)
+        self.max_retentativas = MAX_RETENTATIVAS if max_retentativas is None else max_retentativas
+        self._pausa_ate = 0.0
+        self._lock = threading.Lock()
+
+    def _espera_inicial(self, tokens):
+        self.circuito.verificar()
+        with self._lock:
+            espera = self._pausa_ate - time.monotonic()
+        if self.balde_requisicoes:
+            espera = max(espera, self.balde_requisicoes.reservar(1))
+        if self.balde_tokens and tokens:
+            espera = max(espera, self.balde_tokens.reservar(tokens))
+        return max(0.0, espera)
+
+    def _registrar(self, tentativa, tokens, resposta=None, erro=None):
+        """Retorna a espera antes da próxima tentativa, ou None se não há o que repetir."""
+        status = _status(erro if erro is not None else resposta)
+        transitorio = status in STATUS_TRANSITORIOS or (erro is not None and status is None and _erro_de_rede(erro))
+        metricas = obter_metricas()
+        if not transitorio:
+            # Inclui erros do chamador (400, 401, JSON inválido): o provedor respondeu
+            self.circuito.sucesso()
+            self.concorrencia.sucesso()
+            metricas.incrementar("seo_api_chamadas_total", provedor=self.nome, resultado="ok" if erro is None else "erro")
+            return None
+
+        self.circuito.falha()
+        self.concorrencia.reduzir()
+        if self.balde_tokens and tokens:
+            # A chamada foi recusada ou não terminou: a reserva volta para o balde
+            # e a próxima tentativa reserva de novo
+            self.balde_tokens.ajustar(tokens)
+        pedida = espera_retry_after(erro if erro is not None else resposta)
+        if pedida:
+            # A cota é da chave, não da chamada: todas as chamadas ao provedor esperam
+            with self._lock:
+                self._pausa_ate = max(self._pausa_ate, time.monotonic() + pedida)
+        if tentativa >= self.max_retentativas:
+            metricas.incrementar("seo_api_chamadas_total", provedor=self.nome, resultado="falha")
+            return None
+
+        motivo = status or type(erro).__name__
+        metricas.incrementar("seo_api_chamadas_total", provedor=self.nome, resultado="retentativa")
+        espera = random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** tentativa))
+        if pedida:
+            espera = min(ESPERA_MAXIMA, pedida) + random.uniform(0, ESPERA_BASE)
+        log.info(f"{self.nome}: {motivo}, nova tentativa em {espera:.1f}s ({tentativa + 1}/{self.max_retentativas})")
+        return espera
+
+    def _corrigir_tokens(self, tokens, medir_tokens, resposta):
+        if not (self.balde_tokens and tokens and medir_tokens):
+            return
+        try:
+            usados = medir_tokens(resposta)
+        except Exception:
+            return
+        if usados:
+            self.balde_tokens.ajustar(tokens - usados)
+
+    def _recusar(self):
+        obter_metricas().incrementar("seo_api_chamadas_total", provedor=self.nome, resultado="circuito_aberto")
+
+    def executar(self, funcao, tokens=0, medir_tokens=None):
+        """Chama `funcao()` respeitando as cotas do provedor.
+
+        `tokens` é a estimativa reservada no balde de tokens; com `medir_tokens`
+        (resposta -> tokens usados) a diferença é acertada depois da chamada.
+        """
+        for tentativa in range(self.max_retentativas + 1):
+            try:
+                time.sleep(self._espera_inicial(tokens))
+            except CircuitoAberto:
+                self._recusar()
+                raise
+            self.concorrencia.entrar()
+            try:
+                resposta = funcao()
+            except Exception as e:
+                espera = self._registrar(tentativa, tokens, erro=e)
+                if espera is None:
+                    raise
+            else:
+                espera = self._registrar(tentativa, tokens, resposta=resposta)
+                if espera is None:
+                    self._corrigir_tokens(tokens, medir_tokens, resposta)
+                    return resposta
+            finally:
+                self.concorrencia.sair()
+            time.sleep(espera)
+
+    async def executar_async(self, funcao, tokens=0, medir_tokens=None):
+        """Como `executar`, para `funcao` que devolve um awaitable."""
+        for tentativa in range(self.max_retentativas + 1):
+            try:
+                await asyncio.sleep(self._espera_inicial(tokens))
+            except CircuitoAberto:
+                self._recusar()
+                raise
+            await self.concorrencia.entrar_async()
+            try:
+                resposta = await funcao()
+            except Exception as e:
+                espera = self._registrar(tentativa, tokens, erro=e)
+                if espera is None:
+                    raise
+            else:
+                espera = self._registrar(tentativa, tokens, resposta=resposta)
+                if espera is None:
+                    self._corrigir_tokens(tokens, medir_tokens, resposta)
+                    return resposta
+            finally:
+                self.concorrencia.sair()
+            await asyncio.sleep(espera)
+
+
+_limitadores = {}
+_limitadores_lock = threading.Lock()
+
+
+def obter_limitador(nome):
+    # Um por provedor e processo, compartilhado pelas threads e pelo event loop
+    with _limitadores_lock:
+        if nome not in _limitadores:
+            _limitadores[nome] = LimitadorProvedor(nome, **PROVEDORES.get(nome, {}))
+        return _limitadores[nome]
@@ -0,0 +1,179 @@
+import os
+import re
+from urllib.parse import urlsplit
+
+# Tamanho médio aproximado por tipo de recurso, usado para estimar quanto deixou
+# de ser baixado (requisições abortadas não têm tamanho conhecido)
+TAMANHO_MEDIO_BYTES = {
+    "image": 45_000,
+    "media": 500_000,
+    "font": 35_000,
+    "script": 30_000,
+    "stylesheet": 15_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+    "other": 5_000,
+}
+
+DOMINIOS_RASTREAMENTO = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "taboola.com",
+    "outbrain.com",
+    "criteo.com",
+    "tiktok.com",
+    "linkedin.com",
+    "bing.com",
+]
+
+POLITICA_PADRAO = {
+    "tipos_bloqueados": ["image", "media", "font"],
+    # Quando preenchida, só terceiros desta lista são carregados
+    "dominios_permitidos": [],
+    "dominios_bloqueados": DOMINIOS_RASTREAMENTO,
+    "padroes_bloqueados": [r"/ads?/", r"[?&/]utm_", r"\bpixel\b", r"/beacon"],
+}
+
+# Sufixos com dois níveis mais comuns, para não tratar "xpi.com.br" e
+# "conteudos.xpi.com.br" como domínios diferentes
+_SUFIXOS_DUPLOS = {"com.br", "net.br", "org.br", "gov.br", "co.uk", "com.au", "com.ar", "com.mx"}
+
+
+def dominio_base(host):
+    partes = (host or "").lower().strip(".").split(".")
+    if len(partes) >= 3 and ".".join(partes[-2:]) in _SUFIXOS_DUPLOS:
+        return ".".join(partes[-3:])
+    return ".".join(partes[-2:])
+
+
+def _casa_dominio(host, dominios):
+    return any(host == d or host.endswith("." + d) for d in dominios)
+
+
+class EstatisticasRecursos:
+    def __init__(self):
+        self.requisicoes_permitidas = 0
+        self.requisicoes_bloqueadas = 0
+        self.bytes_recebidos = 0
+        self.bytes_economizados_estimados = 0
+        self.bloqueios_por_motivo = {}
+
+    def registrar_bloqueio(self, motivo, tipo):
+        self.requisicoes_bloqueadas += 1
+        self.bytes_economizados_estimados += TAMANHO_MEDIO_BYTES.get(tipo, TAMANHO_MEDIO_BYTES["other"])
+        self.bloqueios_por_motivo[motivo] = self.bloqueios_por_motivo.get(motivo, 0) + 1
+
+    def registrar_resposta(self, headers):
+        try:
+            self.bytes_recebidos += int(headers.get("content-length", 0))
+        except ValueError:
+            pass
+
+    def resumo(self):
+        return {
+            "requisicoes_permitidas": self.requisicoes_permitidas,
+            "requisicoes_bloqueadas": self.requisicoes_bloqueadas,
+            "bytes_recebidos": self.bytes_recebidos,
+            "bytes_economizados_estimados": self.bytes_economizados_estimados,
+            "bloqueios_por_motivo": dict(self.bloqueios_por_motivo),
+        }
+
+
+class PoliticaRecursos:
+    """Decide quais requisições da página são abortadas durante a extração."""
+
+    def __init__(self, tipos_bloqueados=None, dominios_permitidos=None,
+                 dominios_bloqueados=None, padroes_bloqueados=None):
+        self.tipos_bloqueados = set(
+            POLITICA_PADRAO["tipos_bloqueados"] if tipos_bloqueados is None else tipos_bloqueados
+        )
+        self.dominios_permitidos = [
+            d.lower() for d in (POLITICA_PADRAO["dominios_permitidos"] if dominios_permitidos is None else dominios_permitidos)
+        ]
+        self.dominios_bloqueados = [
+            d.lower() for d in (POLITICA_PADRAO["dominios_bloqueados"] if dominios_bloqueados is None else dominios_bloqueados)
+        ]
+        self.padroes_bloqueados = [
+            re.compile(p, re.IGNORECASE)
+            for p in (POLITICA_PADRAO["padroes_bloqueados"] if padroes_bloqueados is None else padroes_bloqueados)
+        ]
+
+    def motivo_bloqueio(self, url, tipo, dominio_pagina):
+        # Devolve o motivo do bloqueio, ou None se a requisição deve seguir
+        if tipo == "document":
+            return None
+        if tipo in self.tipos_bloqueados:
+            return f"tipo:{tipo}"
+
+        host = (urlsplit(url).hostname or "").lower()
+        if host and dominio_base(host) != dominio_pagina:
+            if _casa_dominio(host, self.dominios_bloqueados):
+                return "dominio_bloqueado"
+            if self.dominios_permitidos and not _casa_dominio(host, self.dominios_permitidos):
+                return "terceiro_nao_permitido"
+
+        for padrao in self.padroes_bloqueados:
+            if padrao.search(url):
+                return "padrao_url"
+        return None
+
+    def aplicar(self, page, url_pagina):
+        """Registra o roteamento na página (API síncrona) e devolve as estatísticas."""
+        estatisticas = EstatisticasRecursos()
+        dominio_pagina = dominio_base(urlsplit(url_pagina).hostname)
+
+        def rotear(route):
+            request = route.request
+            motivo = self.motivo_bloqueio(request.url, request.resource_type, dominio_pagina)
+            if motivo:
+                estatisticas.registrar_bloqueio(motivo, request.resource_type)
+                route.abort()
+            else:
+                estatisticas.requisicoes_permitidas += 1
+                route.continue_()
+
+        page.route("**/*", rotear)
+        page.on("response", lambda response: estatisticas.registrar_resposta(response.headers))
+        return estatisticas
+
+    async def aplicar_async(self, page, url_pagina):
+        estatisticas = EstatisticasRecursos()
+        dominio_pagina = dominio_base(urlsplit(url_pagina).hostname)
+
+        async def rotear(route):
+            request = route.request
+            motivo = self.motivo_bloqueio(request.url, request.resource_type, dominio_pagina)
+            if motivo:
+                estatisticas.registrar_bloqueio(motivo, request.resource_type)
+                await route.abort()
+            else:
+                estatisticas.requisicoes_permitidas += 1
+                await route.continue_()
+
+        await page.route("**/*", rotear)
+        page.on("response", lambda response: estatisticas.registrar_resposta(response.headers))
+        return estatisticas
+
+
+def politica_do_ambiente():
+    # RESOURCE_POLICY=nenhuma desliga o bloqueio; RESOURCE_BLOCK_TYPES e
+    # RESOURCE_ALLOW_DOMAINS sobrescrevem os padrões (listas separadas por vírgula)
+    if os.getenv("RESOURCE_POLICY", "padrao").lower() in ("nenhuma", "none", "off"):
+        return None
+
+    def lista(nome):
+        valor = os.getenv(nome)
+        return None if valor is None else [v.strip() for v in valor.split(",") if v.strip()]
+
+    return PoliticaRecursos(
+        tipos_bloqueados=lista("RESOURCE_BLOCK_TYPES"),
+        dominios_permitidos=lista("RESOURCE_ALLOW_DOMAINS"),
+        dominios_bloqueados=lista("RESOURCE_BLOCK_DOMAINS"),
+    )
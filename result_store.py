@@ -0,0 +1,208 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+def _nota(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+class ArmazemResultados:
+    """Histórico de análises em SQLite, indexado por URL, data da execução e nota.
+
+    `resultados` guarda todas as execuções; `ultimos` aponta para a execução mais
+    recente de cada URL, para que "piores notas atuais" também use índice.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = str(caminho)
+        if self.caminho != ":memory:":
+            Path(self.caminho).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.caminho, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS resultados (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                executado_em REAL NOT NULL,
+                nota_seo REAL,
+                nota_local REAL,
+                titulo TEXT,
+                dados TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_resultados_url ON resultados (url, executado_em);
+            CREATE INDEX IF NOT EXISTS idx_resultados_executado ON resultados (executado_em);
+            CREATE INDEX IF NOT EXISTS idx_resultados_nota ON resultados (nota_seo);
+
+            CREATE TABLE IF NOT EXISTS ultimos (
+                url TEXT PRIMARY KEY,
+                resultado_id INTEGER NOT NULL,
+                executado_em REAL NOT NULL,
+                nota_seo REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_ultimos_nota ON ultimos (nota_seo);
+            CREATE INDEX IF NOT EXISTS idx_ultimos_executado ON ultimos (executado_em);
+            """
+        )
+        self._conn.commit()
+
+    def salvar(self, resultado, executado_em=None):
+        url = resultado.get("link") or resultado.get("url")
+        if not url:
+            raise ValueError("Resultado sem 'link' não pode ser armazenado.")
+        executado_em = time.time() if executado_em is None else executado_em
+        nota = _nota(resultado.get("nota_seo"))
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO resultados (url, executado_em, nota_seo, nota_local, titulo, dados) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    executado_em,
+                    nota,
+                    _nota(resultado.get("nota_local")),
+                    resultado.get("titulo") or resultado.get("titulo_blog"),
+                    json.dumps(resultado, ensure_ascii=False),
+                ),
+            )
+            resultado_id = cursor.lastrowid
+            # Execuções antigas importadas fora de ordem não substituem a mais recente
+            self._conn.execute(
+                "INSERT INTO ultimos (url, resultado_id, executado_em, nota_seo) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET resultado_id = excluded.resultado_id, "
+                "executado_em = excluded.executado_em, nota_seo = excluded.nota_seo "
+                "WHERE excluded.executado_em >= ultimos.executado_em",
+                (url, resultado_id, executado_em, nota),
+            )
+            self._conn.commit()
+        return resultado_id
+
+    def _registros(self, sql, parametros):
+        with self._lock:
+            linhas = self._conn.execute(sql, parametros).fetchall()
+        return [
+            {**json.loads(dados), "_id": id_, "_executado_em": executado_em}
+            for id_, executado_em, dados in linhas
+        ]
+
+    def ultimo_por_url(self, url):
+        registros = self._registros(
+            "SELECT r.id, r.executado_em, r.dados FROM ultimos u "
+            "JOIN resultados r ON r.id = u.resultado_id WHERE u.url = ?",
+            (url,),
+        )
+        return registros[0] if registros else None
+
+    def ultimo(self):
+        registros = self._registros(
+            "SELECT id, executado_em, dados FROM resultados ORDER BY executado_em DESC LIMIT 1", ()
+        )
+        return registros[0] if registros else None
+
+    def historico(self, url, limite=50):
+        return self._registros(
+            "SELECT id, executado_em, dados FROM resultados WHERE url = ? "
+            "ORDER BY executado_em DESC LIMIT ?",
+            (url, limite),
+        )
+
+    def piores(self, n=10):
+        # Considera só a análise mais recente de cada URL
+        return self._registros(
+            "SELECT r.id, r.executado_em, r.dados FROM ultimos u "
+            "JOIN resultados r ON r.id = u.resultado_id "
+            "WHERE u.nota_seo IS NOT NULL ORDER BY u.nota_seo ASC LIMIT ?",
+            (n,),
+        )
+
+    def executados_desde(self, inicio, fim=None):
+        return self._registros(
+            "SELECT id, executado_em, dados FROM resultados WHERE executado_em >= ? AND executado_em < ? "
+            "ORDER BY executado_em",
+            (inicio, time.time() + 1 if fim is None else fim),
+        )
+
+    def iterar_ultimos(self, lote=500):
+        """Percorre a análise mais recente de cada URL em lotes, sem carregar todas na memória."""
+        ultimo_rowid = 0
+        while True:
+            with self._lock:
+                linhas = self._conn.execute(
+                    "SELECT u.rowid, r.id, r.executado_em, r.dados FROM ultimos u "
+                    "JOIN resultados r ON r.id = u.resultado_id WHERE u.rowid > ? ORDER BY u.rowid LIMIT ?",
+                    (ultimo_rowid, lote),
+                ).fetchall()
+            if not linhas:
+                return
+            for _, id_, executado_em, dados in linhas:
+                yield {**json.loads(dados), "_id": id_, "_executado_em": executado_em}
+            ultimo_rowid = linhas[-1][0]
+
+    def total(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM resultados").fetchone()[0]
+
+    def exportar_json(self, caminho, registros):
+        # Mesmo formato dos arquivos JSON antigos (sem os campos internos _id/_executado_em)
+        limpos = [{k: v for k, v in r.items() if not k.startswith("_")} for r in registros]
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(limpos, f, ensure_ascii=False, indent=2)
+        return caminho
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+_armazem = None
+_armazem_lock = threading.Lock()
+
+
+def obter_armazem():
+    global _armazem
+    with _armazem_lock:
+        if _armazem is None:
+            _armazem = ArmazemResultados(os.getenv("RESULT_STORE_PATH", "output_files/resultados.sqlite"))
+        return _armazem
+
+
+if __name__ == "__main__":
+    import argparse
+
+    # Opções comuns vão em cada subcomando: "piores 10 --exportar arquivo.json"
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument("--exportar", help="salva a consulta em um arquivo JSON")
+
+    parser = argparse.ArgumentParser(description="Consulta o histórico de análises.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("ultimo", parents=[comum], help="análise mais recente de uma URL").add_argument("url")
+    p = sub.add_parser("historico", parents=[comum], help="todas as análises de uma URL")
+    p.add_argument("url")
+    p.add_argument("--limite", type=int, default=50)
+    p = sub.add_parser("piores", parents=[comum], help="URLs com as menores notas atuais")
+    p.add_argument("n", type=int, nargs="?", default=10)
+    args = parser.parse_args()
+
+    armazem = obter_armazem()
+    if args.comando == "ultimo":
+        registros = [r for r in [armazem.ultimo_por_url(args.url)] if r]
+    elif args.comando == "historico":
+        registros = armazem.historico(args.url, args.limite)
+    else:
+        registros = armazem.piores(args.n)
+
+    for r in registros:
+        quando = time.strftime("%Y-%m-%d %H:%M", time.localtime(r["_executado_em"]))
+        print(f"{quando}  nota {r.get('nota_seo')}  {r.get('link')}")
+    if args.exportar:
+        print(f"Exportado para {armazem.exportar_json(args.exportar, registros)}")
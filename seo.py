@@ -0,0 +1,150 @@
+import json
+import re
+
+from cache import chave_hash
+from local_scoring import avaliacao_local, pontuar_artigo, tipo_consulta_llm
+from prompt_compaction import ORCAMENTO_TOKENS, compactar_conteudo, contar_tokens
+
+MODELO_SEO = "gpt-4o"
+# Incremente sempre que o texto de montar_prompt_seo mudar, para invalidar o cache
+VERSAO_PROMPT_SEO = 3
+TEMPERATURA_SEO = 0.4
+# Reserva para a resposta no limite de tokens por minuto (o JSON costuma ficar abaixo disso)
+TOKENS_RESPOSTA_SEO = 400
+
+
+def montar_prompt_seo(resultado):
+    return f"""
+Avalie o seguinte conteúdo de blog com base nas boas práticas de SEO.
+Considere os critérios: uso de palavras-chave no título, headings, meta description, links internos/externos, tamanho e legibilidade do texto.
+Retorne um dicionário JSON com:
+
+- "nota_seo": um número float entre 0 e 10 (não use porcentagem)
+- "explicacao": um parágrafo com os pontos fortes e fracos
+- "sugestoes": uma lista com 3 sugestões práticas e aplicáveis de melhorias SEO
+
+Sinais estruturais extraídos da página:
+{resumir_sinais(resultado)}
+
+Conteúdo (estrutura completa e trechos de cada seção):
+Título: {resultado["titulo"]}
+{compactar_conteudo(resultado)}
+"""
+
+
+def resumir_sinais(resultado):
+    # Resultados antigos (ou de extratores que não coletam esses sinais) não
+    # têm as chaves abaixo; nesse caso o modelo é avisado em vez de adivinhar
+    if "headings" not in resultado:
+        return "- não disponíveis"
+
+    imagens = resultado.get("imagens", {})
+    links = resultado.get("links", {})
+    linhas = [
+        f"- Meta description: {resultado.get('meta_description') or '(ausente)'}",
+        f"- Canonical: {resultado.get('canonical') or '(ausente)'}",
+        f"- Hreflang: {len(resultado.get('hreflang', []))} alternativas",
+        f"- Links internos: {links.get('internos', 0)} | externos: {links.get('externos', 0)} | nofollow: {links.get('nofollow', 0)}",
+        f"- Imagens com alt: {imagens.get('com_alt', 0)} de {imagens.get('total', 0)}",
+    ]
+    return "\n".join(linhas)
+
+
+def montar_prompt_sugestoes(resultado, pontuacao):
+    # Usado quando a nota vem da avaliação local: o LLM só propõe as melhorias
+    faltantes = [
+        nome for nome, criterio in pontuacao["criterios"].items() if criterio["atendido"] < 0.99
+    ]
+    return f"""
+Um artigo de blog recebeu nota de SEO {pontuacao["nota"]}/10 em uma avaliação automática.
+Critérios não atendidos: {", ".join(faltantes) or "nenhum"}.
+Retorne um dicionário JSON com:
+
+- "sugestoes": uma lista com 3 sugestões práticas e aplicáveis de melhorias SEO, específicas para este conteúdo
+
+Sinais estruturais extraídos da página:
+{resumir_sinais(resultado)}
+
+Conteúdo (estrutura completa e trechos de cada seção):
+Título: {resultado["titulo"]}
+{compactar_conteudo(resultado)}
+"""
+
+
+def estimar_tokens(prompt):
+    # Estimativa reservada no limitador da OpenAI antes da chamada
+    return contar_tokens(prompt) + TOKENS_RESPOSTA_SEO
+
+
+def tokens_usados(response):
+    return response.usage.total_tokens if response.usage else None
+
+
+def preparar_avaliacao(resultado, modo_llm=None):
+    """Calcula a nota local e decide se (e com qual prompt) o LLM será consultado.
+
+    Retorna (pontuacao, tipo, prompt); `tipo` e `prompt` são None quando a
+    nota local basta.
+    """
+    pontuacao = pontuar_artigo(resultado)
+    tipo = tipo_consulta_llm(pontuacao, modo_llm)
+    if tipo is None:
+        return pontuacao, None, None
+    if tipo == "sugestoes":
+        return pontuacao, tipo, montar_prompt_sugestoes(resultado, pontuacao)
+    return pontuacao, tipo, montar_prompt_seo(resultado)
+
+
+def finalizar_avaliacao(pontuacao, tipo, avaliacao_llm=None):
+    local = avaliacao_local(pontuacao)
+    if tipo is None:
+        avaliacao, origem = local, "local"
+    elif tipo == "sugestoes":
+        avaliacao = dict(local, sugestoes=avaliacao_llm.get("sugestoes") or local["sugestoes"])
+        origem = "local+llm"
+    else:
+        avaliacao, origem = dict(avaliacao_llm), "llm"
+
+    avaliacao["origem_avaliacao"] = origem
+    avaliacao["nota_local"] = pontuacao["nota"]
+    avaliacao["detalhes_nota_local"] = {
+        "metricas": pontuacao["metricas"],
+        "criterios": pontuacao["criterios"],
+    }
+    return avaliacao
+
+
+def chave_cache_seo(resultado, tipo="completa", modelo=MODELO_SEO):
+    return chave_hash(
+        modelo,
+        VERSAO_PROMPT_SEO,
+        tipo,
+        resultado["titulo"],
+        # A compactação usa o texto inteiro e a posição de cada heading
+        [[h["nivel"], h["texto"], h.get("paragrafo")] for h in resultado.get("headings", [])],
+        resultado["texto"],
+        ORCAMENTO_TOKENS,
+        resumir_sinais(resultado),
+    )
+
+
+def interpretar_resposta_seo(raw_response):
+    # Remove blocos de markdown (```json ... ```)
+    cleaned_response = re.sub(r"```json|```", "", raw_response).strip()
+
+    # Tenta carregar como JSON
+    seo_analysis = json.loads(cleaned_response)
+
+    return {
+        "nota_seo": seo_analysis.get("nota_seo"),
+        "explicacao": seo_analysis.get("explicacao"),
+        "sugestoes": seo_analysis.get("sugestoes"),
+    }
+
+
+def avaliacao_com_erro():
+    return {
+        "nota_seo": None,
+        "explicacao": "Erro durante a análise de SEO.",
+        "sugestoes": [],
+    }
@@ -0,0 +1,341 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from telemetry import obter_logger, obter_metricas
+
+# Pasta do arquivo de HTML; vazio desliga o arquivamento
+DIRETORIO_SNAPSHOTS = os.getenv("SNAPSHOT_ARCHIVE_DIR", "")
+NIVEL_ZSTD = int(os.getenv("SNAPSHOT_ZSTD_LEVEL", "10"))
+# Tamanho a partir do qual um pacote é fechado e outro é aberto
+TAMANHO_PACOTE = int(os.getenv("SNAPSHOT_PACK_MB", "256")) * 1024 * 1024
+# Cabeçalhos de resposta guardados com cada snapshot
+CABECALHOS_GUARDADOS = ("content-type", "content-language", "etag", "last-modified", "cache-control",
+                        "x-robots-tag", "link")
+
+log = obter_logger("snapshot_archive")
+
+
+def comprimir(dados):
+    import zstandard
+
+    return "zstd", zstandard.ZstdCompressor(level=NIVEL_ZSTD).compress(dados)
+
+
+def descomprimir(dados):
+    import zstandard
+
+    return zstandard.ZstdDecompressor().decompress(dados)
+
+
+class ArquivoSnapshots:
+    """Arquivo de HTML endereçado por conteúdo.
+
+    Cada HTML distinto é comprimido uma vez só e anexado ao fim de um pacote
+    (arquivo binário só de escrita no fim); o hash do conteúdo aponta para
+    (pacote, posição, tamanho) no índice SQLite. Capturar de novo uma página
+    que não mudou só registra a data. Cada instância escreve no seu próprio
+    pacote, então vários processos podem arquivar ao mesmo tempo; a leitura
+    usa mmap dos pacotes.
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.diretorio / "indice.sqlite"), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pacotes (id INTEGER PRIMARY KEY, arquivo TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS conteudos (
+                hash BLOB PRIMARY KEY,
+                pacote INTEGER NOT NULL,
+                posicao INTEGER NOT NULL,
+                tamanho INTEGER NOT NULL,
+                tamanho_original INTEGER NOT NULL,
+                codec TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                hash BLOB NOT NULL,
+                metodo TEXT,
+                status INTEGER,
+                cabecalhos TEXT,
+                capturado_em REAL NOT NULL,
+                visto_em REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_snapshots_url ON snapshots (url, id);
+            """
+        )
+        self._conn.commit()
+        self._escrita = None
+        self._leitura = {}
+
+    def _pacote_para_escrita(self, tamanho):
+        if self._escrita is not None and self._escrita[1].tell() + tamanho > TAMANHO_PACOTE:
+            self._escrita[1].close()
+            self._escrita = None
+        if self._escrita is None:
+            cursor = self._conn.execute("INSERT INTO pacotes (arquivo) VALUES ('')")
+            pacote = cursor.lastrowid
+            nome = f"pacote-{pacote:06d}.bin"
+            self._conn.execute("UPDATE pacotes SET arquivo = ? WHERE id = ?", (nome, pacote))
+            self._escrita = (pacote, open(self.diretorio / nome, "ab"))
+        return self._escrita
+
+    def guardar(self, url, html, metodo=None, status=None, cabecalhos=None, capturado_em=None):
+        """Arquiva o HTML de `url`. Retorna True se o conteúdo ainda não estava no arquivo."""
+        dados = html.encode("utf-8") if isinstance(html, str) else html
+        chave = hashlib.blake2b(dados, digest_size=16).digest()
+        agora = capturado_em or time.time()
+        cabecalhos = {k.lower(): v for k, v in (cabecalhos or {}).items() if k.lower() in CABECALHOS_GUARDADOS}
+
+        with self._lock:
+            novo = self._conn.execute("SELECT 1 FROM conteudos WHERE hash = ?", (chave,)).fetchone() is None
+            if novo:
+                codec, comprimido = comprimir(dados)
+                pacote, arquivo = self._pacote_para_escrita(len(comprimido))
+                posicao = arquivo.tell()
+                arquivo.write(comprimido)
+                arquivo.flush()
+                # O índice só pode apontar para bytes que já estão no disco
+                os.fsync(arquivo.fileno())
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO conteudos (hash, pacote, posicao, tamanho, tamanho_original, codec) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (chave, pacote, posicao, len(comprimido), len(dados), codec),
+                )
+            ultimo = self._conn.execute(
+                "SELECT id, hash FROM snapshots WHERE url = ? ORDER BY id DESC LIMIT 1", (url,)
+            ).fetchone()
+            if ultimo and ultimo[1] == chave:
+                self._conn.execute("UPDATE snapshots SET visto_em = ? WHERE id = ?", (agora, ultimo[0]))
+            else:
+                self._conn.execute(
+                    "INSERT INTO snapshots (url, hash, metodo, status, cabecalhos, capturado_em, visto_em) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (url, chave, metodo, status, json.dumps(cabecalhos) if cabecalhos else None, agora, agora),
+                )
+            self._conn.commit()
+        obter_metricas().incrementar("seo_snapshots_total", resultado="novo" if novo else "duplicado")
+        return novo
+
+    def _mapa(self, pacote):
+        mapa = self._leitura.get(pacote)
+        if mapa is None:
+            nome = self._conn.execute("SELECT arquivo FROM pacotes WHERE id = ?", (pacote,)).fetchone()[0]
+            with open(self.diretorio / nome, "rb") as arquivo:
+                mapa = self._leitura[pacote] = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapa
+
+    def ler_conteudo(self, chave):
+        with self._lock:
+            pacote, posicao, tamanho = self._conn.execute(
+                "SELECT pacote, posicao, tamanho FROM conteudos WHERE hash = ?", (chave,)
+            ).fetchone()
+            mapa = self._mapa(pacote)
+            if posicao + tamanho > len(mapa):
+                # O pacote ainda está sendo escrito e cresceu depois do mmap
+                mapa.close()
+                del self._leitura[pacote]
+                mapa = self._mapa(pacote)
+            comprimido = mapa[posicao:posicao + tamanho]
+        return descomprimir(comprimido).decode("utf-8")
+
+    def _snapshot(self, linha, com_html=True):
+        id_, url, chave, metodo, status, cabecalhos, capturado_em, visto_em = linha
+        snapshot = {
+            "id": id_,
+            "url": url,
+            "hash": chave.hex(),
+            "metodo": metodo,
+            "status": status,
+            "cabecalhos": json.loads(cabecalhos) if cabecalhos else {},
+            "capturado_em": capturado_em,
+            "visto_em": visto_em,
+        }
+        if com_html:
+            snapshot["html"] = self.ler_conteudo(chave)
+        return snapshot
+
+    def ultimo(self, url):
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT * FROM snapshots WHERE url = ? ORDER BY id DESC LIMIT 1", (url,)
+            ).fetchone()
+        return self._snapshot(linha) if linha else None
+
+    def historico(self, url):
+        with self._lock:
+            linhas = self._conn.execute("SELECT * FROM snapshots WHERE url = ? ORDER BY id", (url,)).fetchall()
+        return [self._snapshot(l, com_html=False) for l in linhas]
+
+    def ids_ultimos(self, urls=None):
+        # Id do snapshot mais recente de cada URL (ou só das URLs pedidas)
+        with self._lock:
+            if urls is None:
+                return [l[0] for l in self._conn.execute("SELECT MAX(id) FROM snapshots GROUP BY url ORDER BY 1")]
+            return [l[0] for url in urls for l in self._conn.execute(
+                "SELECT MAX(id) FROM snapshots WHERE url = ? HAVING COUNT(*) > 0", (url,)
+            )]
+
+    def por_ids(self, ids):
+        with self._lock:
+            linhas = self._conn.execute(
+                f"SELECT * FROM snapshots WHERE id IN ({','.join('?' * len(ids))}) ORDER BY id", list(ids)
+            ).fetchall()
+        return [self._snapshot(l) for l in linhas]
+
+    def estatisticas(self):
+        with self._lock:
+            snapshots, urls = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT url) FROM snapshots").fetchone()
+            conteudos, comprimido, original = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0), COALESCE(SUM(tamanho_original), 0) FROM conteudos"
+            ).fetchone()
+        return {
+            "snapshots": snapshots,
+            "urls": urls,
+            "conteudos_distintos": conteudos,
+            "bytes_originais": original,
+            "bytes_comprimidos": comprimido,
+            "taxa_compressao": round(original / comprimido, 2) if comprimido else None,
+        }
+
+    def fechar(self):
+        with self._lock:
+            if self._escrita is not None:
+                self._escrita[1].close()
+                self._escrita = None
+            for mapa in self._leitura.values():
+                mapa.close()
+            self._leitura.clear()
+            self._conn.close()
+
+
+_arquivo = None
+_arquivo_lock = threading.Lock()
+
+
+def obter_arquivo_snapshots(diretorio=None):
+    """Arquivo do processo; None quando SNAPSHOT_ARCHIVE_DIR não está definido."""
+    global _arquivo
+    diretorio = diretorio or DIRETORIO_SNAPSHOTS
+    if not diretorio:
+        return None
+    with _arquivo_lock:
+        if _arquivo is None or _arquivo.diretorio != Path(diretorio):
+            _arquivo = ArquivoSnapshots(diretorio)
+        return _arquivo
+
+
+def arquivamento_ativo():
+    return bool(DIRETORIO_SNAPSHOTS)
+
+
+def arquivar(url, html, metodo, status=None, cabecalhos=None):
+    # Falha ao arquivar não pode derrubar a análise da página
+    arquivo = obter_arquivo_snapshots()
+    if arquivo is None or not html:
+        return
+    try:
+        arquivo.guardar(url, html, metodo, status, cabecalhos)
+    except Exception as e:
+        log.warning(f"Não foi possível arquivar o HTML de {url}: {e}")
+
+
+def reextrair(snapshot, pontuar=True):
+    """Extrai de novo o conteúdo de um snapshot, sem rede nem navegador.
+
+    Snapshots do Playwright guardam o DOM já renderizado, então o parser
+    estático serve para os dois métodos. Com `pontuar`, aplica a nota local.
+    """
+    from local_scoring import avaliacao_local, pontuar_artigo
+    from static_extractor import ExtracaoEstatica
+
+    extracao = ExtracaoEstatica(snapshot["url"], {"max_bytes": float("inf")})
+    extracao.alimentar(snapshot["html"])
+    resultado = extracao.resultado()
+    resultado["metodo_extracao"] = snapshot["metodo"]
+    resultado["snapshot"] = {"hash": snapshot["hash"], "capturado_em": snapshot["capturado_em"]}
+    if pontuar:
+        resultado.update(avaliacao_local(pontuar_artigo(resultado)))
+    return resultado
+
+
+def _reextrair_bloco(diretorio, ids, pontuar):
+    arquivo = obter_arquivo_snapshots(diretorio)
+    resultados = []
+    for snapshot in arquivo.por_ids(ids):
+        try:
+            resultados.append(reextrair(snapshot, pontuar))
+        except Exception as e:
+            resultados.append({"link": snapshot["url"], "erro": f"reextração: {e}"})
+    return resultados
+
+
+def reextrair_arquivo(diretorio=None, urls=None, processos=None, pontuar=True, bloco=200):
+    """Gera os resultados da reextração do snapshot mais recente de cada URL.
+
+    Os blocos de snapshots são distribuídos entre `processos` processos
+    (padrão: um por CPU); a ordem de saída segue a ordem dos blocos.
+    """
+    diretorio = diretorio or DIRETORIO_SNAPSHOTS
+    ids = obter_arquivo_snapshots(diretorio).ids_ultimos(urls)
+    blocos = [ids[i:i + bloco] for i in range(0, len(ids), bloco)]
+    processos = processos or os.cpu_count() or 1
+    if processos == 1 or len(blocos) <= 1:
+        for ids_bloco in blocos:
+            yield from _reextrair_bloco(diretorio, ids_bloco, pontuar)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    # "spawn", como em workers.py: as conexões SQLite não sobrevivem a um fork
+    with ProcessPoolExecutor(processos, mp_context=get_context("spawn")) as executor:
+        yield from (r for lote in executor.map(_reextrair_bloco, [diretorio] * len(blocos), blocos,
+                                               [pontuar] * len(blocos)) for r in lote)
+
+
+if __name__ == "__main__":
+    from jsonl_output import EscritorJSONL
+
+    parser = argparse.ArgumentParser(description="Arquivo de HTML das páginas e reextração offline.")
+    parser.add_argument("--diretorio", help="pasta do arquivo (padrão: SNAPSHOT_ARCHIVE_DIR)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("estatisticas", help="snapshots, URLs e taxa de compressão")
+    p = sub.add_parser("mostrar", help="imprime o HTML mais recente de uma URL")
+    p.add_argument("url")
+    p = sub.add_parser("reextrair", help="reextrai (e pontua) o snapshot mais recente de cada URL")
+    p.add_argument("--saida", required=True, help="arquivo JSONL de saída")
+    p.add_argument("--url", action="append", help="só estas URLs (pode repetir)")
+    p.add_argument("--processos", type=int, help="processos em paralelo (padrão: um por CPU)")
+    p.add_argument("--sem-nota", action="store_true", help="só extrai, sem a nota local")
+    args = parser.parse_args()
+
+    diretorio = args.diretorio or DIRETORIO_SNAPSHOTS
+    if not diretorio:
+        parser.error("defina SNAPSHOT_ARCHIVE_DIR ou use --diretorio")
+    if args.comando == "estatisticas":
+        print(json.dumps(obter_arquivo_snapshots(diretorio).estatisticas(), indent=2))
+    elif args.comando == "mostrar":
+        snapshot = obter_arquivo_snapshots(diretorio).ultimo(args.url)
+        if snapshot is None:
+            raise SystemExit(f"Nenhum snapshot de {args.url}")
+        print(snapshot["html"])
+    else:
+        inicio = time.monotonic()
+        with EscritorJSONL(args.saida) as escritor:
+            for resultado in reextrair_arquivo(diretorio, args.url, args.processos, not args.sem_nota):
+                escritor.escrever(resultado)
+        duracao = time.monotonic() - inicio
+        print(f"{escritor.escritos} páginas reextraídas em {duracao:.1f}s "
+              f"({escritor.escritos / duracao if duracao else 0:.0f} páginas/s) -> {args.saida}")
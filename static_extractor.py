@@ -0,0 +1,273 @@
+import os
+import re
+import threading
+from html.parser import HTMLParser
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+from browser_pool import USER_AGENT_PADRAO
+from dom_extraction import dominio_da_url, montar_resultado
+from snapshot_archive import arquivamento_ativo, arquivar
+
+# Critérios para considerar o resultado estático insuficiente e recorrer ao Playwright
+HEURISTICAS_PADRAO = {
+    "min_caracteres": int(os.getenv("STATIC_MIN_CHARS", "600")),
+    "min_paragrafos": int(os.getenv("STATIC_MIN_PARAGRAPHS", "3")),
+    "exigir_titulo": True,
+    "max_bytes": 5 * 1024 * 1024,
+    # Textos típicos de páginas que só renderizam com JavaScript ou de desafios anti-bot
+    "marcadores_js": [
+        r"enable javascript",
+        r"habilite o javascript",
+        r"ative o javascript",
+        r"you need to enable javascript",
+        r"checking your browser",
+        r"cf-browser-verification",
+        r"<div id=\"(?:root|app|__next)\">\s*</div>",
+    ],
+}
+
+HEADERS_PADRAO = {
+    "User-Agent": USER_AGENT_PADRAO,
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8",
+}
+
+_TAGS_HEADING = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_TAGS_CAPTURADAS = _TAGS_HEADING | {"p"}
+_TAGS_IGNORADAS = {"script", "style", "noscript", "template", "svg"}
+
+
+class _ParserConteudo(HTMLParser):
+    # Parser incremental: recebe o HTML em pedaços via feed() e vai acumulando
+    # headings e parágrafos na ordem do documento, além dos mesmos sinais de
+    # SEO que o SCRIPT_EXTRACAO coleta no navegador
+
+    def __init__(self, url):
+        super().__init__(convert_charrefs=True)
+        self.url = url
+        self.dominio = dominio_da_url(url)
+        self.headings = []
+        self.paragrafos = []
+        self.meta_description = ""
+        self.canonical = ""
+        self.hreflang = []
+        self.imagens = {"total": 0, "com_alt": 0}
+        self.links = {"internos": 0, "externos": 0, "nofollow": 0}
+        self.urls_internas = {}
+        self._tag_atual = None
+        self._buffer = []
+        self._ignorando = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _TAGS_IGNORADAS:
+            self._ignorando += 1
+        elif tag in _TAGS_CAPTURADAS:
+            # <p> não precisa ser fechado explicitamente: um novo bloco o encerra
+            if self._tag_atual == "p":
+                self._fechar_tag()
+            if self._tag_atual is None:
+                self._tag_atual = tag
+                self._buffer = []
+        else:
+            self._atributos(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self._atributos(tag, dict(attrs))
+
+    def _atributos(self, tag, attrs):
+        if tag == "meta" and (attrs.get("name") or "").lower() == "description":
+            self.meta_description = (attrs.get("content") or "").strip()
+        elif tag == "link":
+            rel = (attrs.get("rel") or "").lower().split()
+            if "canonical" in rel and attrs.get("href"):
+                self.canonical = urljoin(self.url, attrs["href"].strip())
+            elif "alternate" in rel and attrs.get("hreflang"):
+                self.hreflang.append({
+                    "lang": attrs["hreflang"],
+                    "href": urljoin(self.url, (attrs.get("href") or "").strip()),
+                })
+        elif tag == "img":
+            self.imagens["total"] += 1
+            if (attrs.get("alt") or "").strip():
+                self.imagens["com_alt"] += 1
+        elif tag == "a" and attrs.get("href"):
+            self._link(attrs)
+
+    def _link(self, attrs):
+        url, _ = urldefrag(urljoin(self.url, attrs["href"].strip()))
+        partes = urlsplit(url)
+        if partes.scheme not in ("http", "https"):
+            return
+        host = (partes.hostname or "").lower()
+        if host == self.dominio or host.endswith("." + self.dominio):
+            self.links["internos"] += 1
+            self.urls_internas[url] = None
+        else:
+            self.links["externos"] += 1
+        if "nofollow" in (attrs.get("rel") or "").lower():
+            self.links["nofollow"] += 1
+
+    def handle_endtag(self, tag):
+        if tag in _TAGS_IGNORADAS:
+            self._ignorando = max(0, self._ignorando - 1)
+        elif tag == self._tag_atual:
+            self._fechar_tag()
+
+    def handle_data(self, data):
+        if self._tag_atual is not None and not self._ignorando:
+            self._buffer.append(data)
+
+    def close(self):
+        super().close()
+        if self._tag_atual is not None:
+            self._fechar_tag()
+
+    def _fechar_tag(self):
+        texto = "".join(self._buffer).strip()
+        if self._tag_atual == "p":
+            if texto:
+                self.paragrafos.append(texto)
+        elif texto:
+            self.headings.append({
+                "nivel": int(self._tag_atual[1]),
+                "texto": texto,
+                "paragrafo": len(self.paragrafos),
+            })
+        self._tag_atual = None
+        self._buffer = []
+
+    def dados(self):
+        # Mesmo formato devolvido pelo SCRIPT_EXTRACAO
+        titulos = [h["texto"] for h in self.headings if h["nivel"] == 1]
+        return {
+            "titulo": titulos[0] if titulos else "",
+            "headings": self.headings,
+            "paragrafos": self.paragrafos,
+            "meta_description": self.meta_description,
+            "canonical": self.canonical,
+            "hreflang": self.hreflang,
+            "imagens": self.imagens,
+            "links": self.links,
+            "urls_internas": list(self.urls_internas),
+        }
+
+
+class ExtracaoEstatica:
+    """Acumula pedaços de HTML e monta o mesmo dicionário de extrair_conteudo_site."""
+
+    def __init__(self, url, heuristicas=None, guardar_html=False):
+        self.url = url
+        self.heuristicas = dict(HEURISTICAS_PADRAO, **(heuristicas or {}))
+        self._parser = _ParserConteudo(url)
+        self._inicio = []
+        self._pedacos = [] if guardar_html else None
+        self.bytes_lidos = 0
+
+    def alimentar(self, pedaco):
+        # Guarda só o começo do documento para procurar marcadores de JS
+        if self.bytes_lidos < 64 * 1024:
+            self._inicio.append(pedaco)
+        if self._pedacos is not None:
+            self._pedacos.append(pedaco)
+        # Os pedaços chegam decodificados: conta os bytes em UTF-8, não os
+        # caracteres, que subestimam o tamanho de texto acentuado
+        self.bytes_lidos += len(pedaco.encode("utf-8"))
+        self._parser.feed(pedaco)
+        return self.bytes_lidos < self.heuristicas["max_bytes"]
+
+    def html(self):
+        # Documento inteiro lido até aqui (só com guardar_html)
+        return "".join(self._pedacos or ())
+
+    def resultado(self):
+        self._parser.close()
+        return montar_resultado(self.url, self._parser.dados())
+
+    def motivo_fallback(self, resultado):
+        # Devolve None quando o resultado estático é suficiente
+        h = self.heuristicas
+        inicio = "".join(self._inicio).lower()
+        for marcador in h["marcadores_js"]:
+            if re.search(marcador, inicio):
+                return f"marcador de JavaScript: {marcador}"
+        if h["exigir_titulo"] and not resultado["titulo"]:
+            return "sem h1"
+        paragrafos = [p for p in resultado["texto"].split("\n\n") if p.strip()]
+        if len(paragrafos) < h["min_paragrafos"]:
+            return f"{len(paragrafos)} parágrafos"
+        if len(resultado["texto"]) < h["min_caracteres"]:
+            return f"{len(resultado['texto'])} caracteres"
+        return None
+
+
+NAO_MODIFICADO = "HTTP 304"
+
+
+def motivo_resposta_invalida(status, content_type):
+    if status >= 400:
+        return f"HTTP {status}"
+    if content_type and "html" not in content_type.lower():
+        return f"content-type {content_type}"
+    return None
+
+
+def validadores_http(headers):
+    # Guardados para a próxima requisição condicional (modo incremental)
+    return {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+
+
+_sessao = None
+_sessao_lock = threading.Lock()
+
+
+def obter_sessao_http():
+    global _sessao
+    with _sessao_lock:
+        if _sessao is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _sessao = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+            _sessao.mount("https://", adapter)
+            _sessao.mount("http://", adapter)
+            _sessao.headers.update(HEADERS_PADRAO)
+        return _sessao
+
+
+def extrair_estatico(url, sessao=None, heuristicas=None, timeout=20):
+    """Baixa o HTML sem navegador e extrai o conteúdo.
+
+    Retorna (resultado, motivo): `motivo` vem preenchido quando o resultado
+    parece vazio ou dependente de JavaScript e deve ir para o Playwright.
+    """
+    resultado, motivo, _ = extrair_estatico_condicional(url, sessao=sessao, heuristicas=heuristicas, timeout=timeout)
+    return resultado, motivo
+
+
+def extrair_estatico_condicional(url, cabecalhos=None, sessao=None, heuristicas=None, timeout=20):
+    """Como extrair_estatico, enviando cabeçalhos condicionais (If-None-Match etc.).
+
+    Retorna (resultado, motivo, validadores). Se o servidor responder 304, o
+    resultado é None e o motivo é NAO_MODIFICADO.
+    """
+    sessao = sessao or obter_sessao_http()
+    extracao = ExtracaoEstatica(url, heuristicas, guardar_html=arquivamento_ativo())
+
+    with sessao.get(url, headers=cabecalhos, timeout=timeout, stream=True) as response:
+        validadores = validadores_http(response.headers)
+        if response.status_code == 304:
+            return None, NAO_MODIFICADO, validadores
+        motivo = motivo_resposta_invalida(response.status_code, response.headers.get("Content-Type"))
+        if motivo:
+            return None, motivo, validadores
+
+        if not response.encoding or "charset" not in response.headers.get("Content-Type", ""):
+            response.encoding = "utf-8"
+        for pedaco in response.iter_content(chunk_size=16384, decode_unicode=True):
+            if not extracao.alimentar(pedaco):
+                break
+        arquivar(url, extracao.html(), "estatico", response.status_code, response.headers)
+
+    resultado = extracao.resultado()
+    return resultado, extracao.motivo_fallback(resultado), validadores
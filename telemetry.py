@@ -0,0 +1,372 @@
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# texto: "[DEBUG] mensagem" como os antigos prints | json: um objeto por linha
+LOG_FORMAT = os.getenv("LOG_FORMAT", "texto")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Arquivo JSONL com todas as etapas (spans), independente do nível de log
+TRACE_FILE = os.getenv("TRACE_FILE")
+# Métricas no formato texto do Prometheus: arquivo (node_exporter textfile) e/ou porta HTTP.
+# "{pid}" no nome do arquivo separa os processos do workers.py
+METRICS_FILE = os.getenv("METRICS_FILE")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "15"))
+
+# Limites (em segundos) dos baldes dos histogramas de duração
+BALDES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+DESCRICOES = {
+    "seo_etapa_duracao_segundos": ("histogram", "Duração de cada etapa da análise"),
+    "seo_etapas_total": ("counter", "Etapas executadas, por status"),
+    "seo_url_duracao_segundos": ("histogram", "Duração da análise completa de uma URL"),
+    "seo_urls_total": ("counter", "URLs analisadas, por status"),
+    "seo_llm_tokens_total": ("counter", "Tokens consumidos nas chamadas ao LLM"),
+    "seo_cache_total": ("counter", "Consultas a cache, por resultado"),
+    "seo_api_chamadas_total": ("counter", "Tentativas de chamada às APIs externas, por provedor e resultado"),
+    "seo_snapshots_total": ("counter", "HTML arquivado, por resultado (novo ou duplicado)"),
+}
+
+_CAMPOS_LOG_RECORD = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def _env_bool(nome, padrao=False):
+    valor = os.getenv(nome)
+    if valor is None:
+        return padrao
+    return valor.strip().lower() not in ("0", "false", "no", "nao", "não", "")
+
+
+class _FormatoJSON(logging.Formatter):
+    def format(self, record):
+        dados = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        rastreio = _rastreio_atual.get()
+        if rastreio is not None:
+            dados["url"] = rastreio.url
+            dados["rastreio"] = rastreio.id
+        dados.update({k: v for k, v in vars(record).items() if k not in _CAMPOS_LOG_RECORD})
+        if record.exc_info:
+            dados["excecao"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+_logs_configurados = False
+_logs_lock = threading.Lock()
+
+
+def obter_logger(nome):
+    """Logger "seo.<nome>"; o formato e o nível vêm de LOG_FORMAT e LOG_LEVEL."""
+    global _logs_configurados
+    with _logs_lock:
+        if not _logs_configurados:
+            handler = logging.StreamHandler(sys.stderr)
+            if LOG_FORMAT == "json":
+                handler.setFormatter(_FormatoJSON())
+            else:
+                handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+            raiz = logging.getLogger("seo")
+            raiz.addHandler(handler)
+            raiz.setLevel(LOG_LEVEL)
+            raiz.propagate = False
+            _logs_configurados = True
+    return logging.getLogger(f"seo.{nome}")
+
+
+class Metricas:
+    """Contadores e histogramas em memória, exportados no formato texto do Prometheus."""
+
+    def __init__(self, baldes=BALDES):
+        self.baldes = baldes
+        self._contadores = {}
+        self._histogramas = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _chave(nome, rotulos):
+        return nome, tuple(sorted(rotulos.items()))
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        chave = self._chave(nome, rotulos)
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def observar(self, nome, valor, **rotulos):
+        chave = self._chave(nome, rotulos)
+        with self._lock:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = {"baldes": [0] * len(self.baldes), "soma": 0.0, "total": 0}
+            for i, limite in enumerate(self.baldes):
+                if valor <= limite:
+                    histograma["baldes"][i] += 1
+            histograma["soma"] += valor
+            histograma["total"] += 1
+
+    def texto_prometheus(self):
+        def rotulos(pares, extra=()):
+            pares = list(pares) + list(extra)
+            if not pares:
+                return ""
+            return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pares) + "}"
+
+        with self._lock:
+            contadores = sorted(self._contadores.items())
+            histogramas = sorted(self._histogramas.items(), key=lambda item: item[0])
+            histogramas = [(chave, dict(h, baldes=list(h["baldes"]))) for chave, h in histogramas]
+
+        linhas = []
+        cabecalhos = set()
+
+        def cabecalho(nome, tipo):
+            if nome not in cabecalhos:
+                cabecalhos.add(nome)
+                linhas.append(f"# HELP {nome} {DESCRICOES.get(nome, (tipo, nome))[1]}")
+                linhas.append(f"# TYPE {nome} {tipo}")
+
+        for (nome, pares), valor in contadores:
+            cabecalho(nome, "counter")
+            linhas.append(f"{nome}{rotulos(pares)} {valor}")
+        for (nome, pares), h in histogramas:
+            cabecalho(nome, "histogram")
+            for limite, acumulado in zip(self.baldes, h["baldes"]):
+                linhas.append(f"{nome}_bucket{rotulos(pares, [('le', limite)])} {acumulado}")
+            linhas.append(f"{nome}_bucket{rotulos(pares, [('le', '+Inf')])} {h['total']}")
+            linhas.append(f"{nome}_sum{rotulos(pares)} {h['soma']:.6f}")
+            linhas.append(f"{nome}_count{rotulos(pares)} {h['total']}")
+        return "\n".join(linhas) + "\n"
+
+    def salvar(self, caminho):
+        # Escrita atômica: quem lê o arquivo nunca vê um texto pela metade
+        caminho = Path(str(caminho).replace("{pid}", str(os.getpid())))
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_name(caminho.name + ".tmp")
+        temporario.write_text(self.texto_prometheus(), encoding="utf-8")
+        os.replace(temporario, caminho)
+        return caminho
+
+
+def _servir_metricas(metricas, porta):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            corpo = metricas.texto_prometheus().encode("utf-8")
+            self.send_response(200 if self.path.startswith("/metrics") else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+    servidor = ThreadingHTTPServer(("0.0.0.0", porta), Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="metricas-http", daemon=True).start()
+    obter_logger("telemetria").info(f"Métricas em http://0.0.0.0:{porta}/metrics")
+
+
+def _gravar_periodicamente(metricas, caminho, intervalo):
+    while True:
+        time.sleep(intervalo)
+        try:
+            metricas.salvar(caminho)
+        except OSError as e:
+            obter_logger("telemetria").warning(f"Falha ao gravar métricas em {caminho}: {e}")
+
+
+_metricas = None
+_metricas_lock = threading.Lock()
+
+
+def obter_metricas():
+    global _metricas
+    with _metricas_lock:
+        if _metricas is None:
+            _metricas = Metricas()
+            if METRICS_PORT:
+                _servir_metricas(_metricas, METRICS_PORT)
+            if METRICS_FILE:
+                threading.Thread(
+                    target=_gravar_periodicamente,
+                    args=(_metricas, METRICS_FILE, METRICS_INTERVAL),
+                    name="metricas-arquivo",
+                    daemon=True,
+                ).start()
+                atexit.register(_metricas.salvar, METRICS_FILE)
+        return _metricas
+
+
+_tracer = None
+
+
+def _tracer_otel():
+    # OpenTelemetry é opcional: com TRACING_OTEL=1 e o pacote instalado, cada etapa
+    # vira também um span OTel (exportado via OTLP se OTEL_EXPORTER_OTLP_ENDPOINT existir)
+    global _tracer
+    if _tracer is None:
+        _tracer = False
+        if _env_bool("TRACING_OTEL"):
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                obter_logger("telemetria").warning(
+                    "TRACING_OTEL=1, mas o pacote opentelemetry-api não está instalado."
+                )
+                return None
+            if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+                try:
+                    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+                    from opentelemetry.sdk.resources import Resource
+                    from opentelemetry.sdk.trace import TracerProvider
+                    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+                    provedor = TracerProvider(resource=Resource.create({"service.name": "seo-blog-analyzer"}))
+                    provedor.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+                    trace.set_tracer_provider(provedor)
+                except ImportError:
+                    obter_logger("telemetria").warning(
+                        "Instale opentelemetry-sdk e opentelemetry-exporter-otlp para exportar via OTLP."
+                    )
+            _tracer = trace.get_tracer("seo-blog-analyzer")
+    return _tracer or None
+
+
+class Rastreio:
+    """Etapas de uma URL: guarda a soma do tempo de cada etapa para o campo `tempos`."""
+
+    def __init__(self, url):
+        self.url = url
+        self.id = uuid.uuid4().hex[:16]
+        self.inicio = time.perf_counter()
+        self.etapas = {}
+        self.status = "ok"
+        self._lock = threading.Lock()
+
+    def registrar(self, nome, duracao):
+        with self._lock:
+            self.etapas[nome] = round(self.etapas.get(nome, 0.0) + duracao * 1000, 1)
+
+    def resumo(self):
+        """{"total_ms", "etapas": {nome: ms}}; etapas paralelas (desktop e mobile) somam mais que o total."""
+        with self._lock:
+            etapas = dict(self.etapas)
+        return {"total_ms": round((time.perf_counter() - self.inicio) * 1000, 1), "etapas": etapas}
+
+
+_rastreio_atual = contextvars.ContextVar("rastreio_atual", default=None)
+
+
+def rastreio_atual():
+    return _rastreio_atual.get()
+
+
+@contextlib.contextmanager
+def rastrear_url(url):
+    """Abre o rastreio de uma URL; as etapas executadas dentro dele (inclusive em
+    outras threads, via `contextvars.copy_context`) entram no seu resumo."""
+    rastreio = Rastreio(url)
+    token = _rastreio_atual.set(rastreio)
+    try:
+        yield rastreio
+    except BaseException:
+        rastreio.status = "erro"
+        raise
+    finally:
+        _rastreio_atual.reset(token)
+        metricas = obter_metricas()
+        metricas.observar("seo_url_duracao_segundos", time.perf_counter() - rastreio.inicio)
+        metricas.incrementar("seo_urls_total", status=rastreio.status)
+
+
+class Span:
+    def __init__(self, nome, atributos):
+        self.nome = nome
+        self.atributos = atributos
+        self._otel = None
+
+    def definir(self, **atributos):
+        self.atributos.update(atributos)
+        if self._otel is not None:
+            for chave, valor in atributos.items():
+                if valor is not None:
+                    self._otel.set_attribute(chave, valor)
+
+
+_arquivo_spans_lock = threading.Lock()
+
+
+def _exportar_span(span, status, inicio, duracao):
+    rastreio = _rastreio_atual.get()
+    if rastreio is not None:
+        rastreio.registrar(span.nome, duracao)
+
+    metricas = obter_metricas()
+    metricas.observar("seo_etapa_duracao_segundos", duracao, etapa=span.nome)
+    metricas.incrementar("seo_etapas_total", etapa=span.nome, status=status)
+
+    registro = {
+        "span": span.nome,
+        "status": status,
+        "duracao_ms": round(duracao * 1000, 1),
+        "atributos": span.atributos,
+    }
+    obter_logger("trace").debug(
+        f"{span.nome} {registro['duracao_ms']} ms ({status})", extra=registro
+    )
+    if TRACE_FILE:
+        registro = {
+            "ts": datetime.fromtimestamp(inicio, timezone.utc).isoformat(timespec="milliseconds"),
+            "url": rastreio.url if rastreio else None,
+            "rastreio": rastreio.id if rastreio else None,
+            **registro,
+        }
+        with _arquivo_spans_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+
+
+@contextlib.contextmanager
+def etapa(nome, **atributos):
+    """Mede uma etapa: duração, status e atributos (ex.: tokens) vão para o log,
+    as métricas e o resumo da URL em andamento. Use `span.definir(...)` dentro do bloco."""
+    span = Span(nome, atributos)
+    tracer = _tracer_otel()
+    contexto_otel = tracer.start_as_current_span(nome, attributes=atributos) if tracer else contextlib.nullcontext()
+    inicio_relogio = time.time()
+    inicio = time.perf_counter()
+    status = "ok"
+    try:
+        with contexto_otel as span_otel:
+            span._otel = span_otel
+            yield span
+    except BaseException as e:
+        status = "erro"
+        span.atributos["erro"] = str(e)[:500]
+        raise
+    finally:
+        _exportar_span(span, status, inicio_relogio, time.perf_counter() - inicio)
+
+
+def registrar_tokens(span, usage):
+    """Anota no span e nas métricas os tokens de uma resposta do LLM (`response.usage`)."""
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", None) or 0
+    resposta = getattr(usage, "completion_tokens", None) or 0
+    span.definir(tokens_prompt=prompt, tokens_resposta=resposta)
+    metricas = obter_metricas()
+    metricas.incrementar("seo_llm_tokens_total", prompt, tipo="prompt")
+    metricas.incrementar("seo_llm_tokens_total", resposta, tipo="resposta")
@@ -0,0 +1,353 @@
+"""Benchmark offline do pipeline, com servidores locais no lugar do blog e das APIs.
+
+Sobe, num processo separado, o site de páginas sintéticas (tamanhos e pesos de
+JavaScript diferentes) e os servidores falsos da OpenAI e do PageSpeed, com
+latência e taxa de erro configuráveis. Mede latência (p50/p90/p95/p99),
+throughput e memória de pico de cada etapa, URL a URL e em lote:
+
+    python test/benchmark.py                    # mede e compara com a linha de base
+    python test/benchmark.py --salvar-base      # grava a linha de base desta máquina
+    python test/benchmark.py --latencia-llm 0.8 --erro-llm 0.05 --lote 100
+
+O resultado vai para output_files/benchmark_<data>.json. O script sai com
+código 1 se alguma métrica piorar mais que --tolerancia em relação à base.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+BASE_PADRAO = RAIZ / "test" / "baselines" / "benchmark.json"
+
+# Métricas comparadas com a base: 1 = maior é pior, -1 = menor é pior.
+# A folga absoluta evita acusar regressão por ruído em etapas muito rápidas
+METRICAS_COMPARADAS = {
+    "p50_ms": (1, 5.0),
+    "p95_ms": (1, 10.0),
+    "throughput_por_s": (-1, 0.0),
+    "memoria_pico_mb": (1, 10.0),
+}
+
+
+def _servir(config, fila, parar):
+    # Roda no processo filho: os servidores não disputam o GIL com o que é medido
+    from local_servers import ServidorOpenAIFalso, ServidorPageSpeedFalso, ServidorPaginasFalso
+
+    servidores = {
+        "paginas": ServidorPaginasFalso(latencia=config["latencia_paginas"]),
+        "openai": ServidorOpenAIFalso(latencia=config["latencia_llm"], taxa_erro=config["erro_llm"], semente=1),
+        "pagespeed": ServidorPageSpeedFalso(
+            latencia=config["latencia_pagespeed"], taxa_erro=config["erro_pagespeed"], semente=2
+        ),
+    }
+    for servidor in servidores.values():
+        servidor.iniciar()
+    fila.put({nome: servidor.url for nome, servidor in servidores.items()})
+    parar.wait()
+    for servidor in servidores.values():
+        servidor.parar()
+
+
+@contextlib.contextmanager
+def servidores_locais(config):
+    contexto = multiprocessing.get_context("spawn")
+    fila, parar = contexto.Queue(), contexto.Event()
+    processo = contexto.Process(target=_servir, args=(config, fila, parar), daemon=True)
+    processo.start()
+    try:
+        yield fila.get(timeout=30)
+    finally:
+        parar.set()
+        processo.join(timeout=10)
+
+
+def _configurar_ambiente(urls, diretorio):
+    # Precisa acontecer antes de importar os módulos do projeto, que leem o ambiente no import
+    os.environ.update({
+        "OPENAI_BASE_URL": urls["openai"] + "/v1",
+        "OPENAI_API_KEY": "chave-local",
+        "PAGESPEED_API_URL": urls["pagespeed"] + "/pagespeedonline/v5/runPagespeed",
+        "GOOGLE_PAGESPEED_API_KEY": "chave-local",
+        "SEO_CACHE_PATH": str(diretorio / "seo.sqlite"),
+        "PAGESPEED_CACHE_PATH": str(diretorio / "pagespeed.sqlite"),
+        "RESULT_STORE_PATH": str(diretorio / "resultados.sqlite"),
+        "INCREMENTAL_STATE_PATH": str(diretorio / "incremental.sqlite"),
+        "SEO_LLM_MODE": "sempre",
+        "BROWSER_POOL_SIZE": "1",
+        # Os servidores locais não têm cota: o benchmark mede o pipeline, não o limitador
+        "OPENAI_RATE_LIMIT": "0",
+        "OPENAI_TOKEN_LIMIT": "0",
+        "PAGESPEED_RATE_LIMIT": "0",
+    })
+
+
+def _zerar_pico_memoria():
+    # No Linux, escrever 5 em clear_refs zera o VmHWM: o pico passa a ser só da etapa
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _pico_memoria_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmHWM:"):
+                    return round(int(linha.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentil(valores, p):
+    # Nearest-rank: sempre um valor observado
+    ordenados = sorted(valores)
+    if not ordenados:
+        return None
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def resumir(latencias, total, erros, modo):
+    ms = [l * 1000 for l in latencias]
+    resumo = {
+        "modo": modo,
+        "n": len(latencias),
+        "erros": erros,
+        "total_s": round(total, 3),
+        "throughput_por_s": round(len(latencias) / total, 2) if total else None,
+        "memoria_pico_mb": _pico_memoria_mb(),
+    }
+    if modo == "unitario":
+        for p in (50, 90, 95, 99):
+            resumo[f"p{p}_ms"] = round(percentil(ms, p), 1)
+        resumo["max_ms"] = round(max(ms), 1)
+    return resumo
+
+
+def medir(funcao, entradas, aquecimento=1):
+    """Chama `funcao` para cada entrada, em sequência; `funcao` devolve False para erro.
+
+    As primeiras `aquecimento` entradas não entram na medida (conexões, imports
+    tardios e caches de código acontecem uma vez só).
+    """
+    latencias, erros = [], 0
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        for entrada in entradas[:aquecimento]:
+            with contextlib.suppress(Exception):
+                funcao(entrada)
+        _zerar_pico_memoria()
+        inicio = time.perf_counter()
+        for entrada in entradas[aquecimento:]:
+            t = time.perf_counter()
+            try:
+                ok = funcao(entrada)
+            except Exception:
+                ok = False
+            latencias.append(time.perf_counter() - t)
+            erros += ok is False
+    return resumir(latencias, time.perf_counter() - inicio, erros, "unitario")
+
+
+def medir_lote(urls, **opcoes):
+    from async_pipeline import analisar_lote
+
+    async def consumir():
+        erros = 0
+        async for resultado in analisar_lote(urls, **opcoes):
+            erros += "erro" in resultado or resultado.get("nota_seo") is None
+        return erros
+
+    _zerar_pico_memoria()
+    inicio = time.perf_counter()
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        erros = asyncio.run(consumir())
+    resumo = resumir([0] * len(urls), time.perf_counter() - inicio, erros, "lote")
+    resumo["limites"] = {k: v for k, v in opcoes.items() if k.startswith("limite_")}
+    return resumo
+
+
+def playwright_disponivel():
+    try:
+        from playwright.sync_api import sync_playwright
+
+        with sync_playwright() as p:
+            p.chromium.launch().close()
+        return None
+    except Exception as e:
+        return str(e).strip().splitlines()[0]
+
+
+def executar_benchmark(config):
+    with tempfile.TemporaryDirectory() as diretorio, servidores_locais(config) as urls:
+        _configurar_ambiente(urls, Path(diretorio))
+        import main
+        from static_extractor import extrair_estatico
+
+        def paginas(perfis, inicio):
+            return [f"{urls['paginas']}/{perfil}/{n}"
+                    for n in range(inicio, inicio + config["urls"]) for perfil in perfis]
+
+        perfis = config["perfis"]
+        estaticos = [p for p in perfis if p != "spa"]
+        erro_playwright = playwright_disponivel()
+        etapas = {}
+        extraidos = []
+
+        def extracao_estatica(url):
+            resultado, motivo = extrair_estatico(url)
+            extraidos.append(resultado)
+            return motivo is None
+
+        etapas["extracao_estatica"] = medir(extracao_estatica, paginas(estaticos, 0))
+
+        if erro_playwright is None:
+            def extracao_playwright(url):
+                extraidos.append(main.extrair_conteudo_site(url))
+
+            etapas["extracao_playwright"] = medir(extracao_playwright, paginas(perfis, 1000))
+        else:
+            etapas["extracao_playwright"] = {"modo": "unitario", "indisponivel": erro_playwright}
+
+        etapas["avaliacao_seo"] = medir(
+            lambda resultado: main.avaliar_seo(resultado, modo_llm="sempre").get("nota_seo") is not None,
+            list(extraidos),
+        )
+        etapas["pagespeed"] = medir(lambda url: bool(main.consultar_pagespeed_api(url)), paginas(perfis, 2000))
+
+        # Pipeline completo (extração → avaliação → PageSpeed), uma URL por vez e em lote
+        modo = "auto" if erro_playwright is None else "estatico"
+        perfis_completos = perfis if erro_playwright is None else estaticos
+        etapas["url_completa"] = medir(
+            lambda url: main.analisar_url(url, modo=modo).get("nota_seo") is not None,
+            paginas(perfis_completos, 3000),
+        )
+        lote = [f"{urls['paginas']}/{perfis_completos[n % len(perfis_completos)]}/{4000 + n}"
+                for n in range(config["lote"])]
+        etapas["lote"] = medir_lote(lote, modo_extracao=modo, limite_extracao=config["extracao"],
+                                    limite_llm=config["llm"], limite_pagespeed=config["pagespeed"])
+        main.obter_pool().fechar()
+    return etapas
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def comparar(atual, base, tolerancia):
+    """Lista as regressões de `atual` em relação a `base` (mesmas etapas e métricas)."""
+    regressoes = []
+    for etapa, medidas in atual["etapas"].items():
+        anteriores = base["etapas"].get(etapa, {})
+        for metrica, (direcao, folga) in METRICAS_COMPARADAS.items():
+            novo, antigo = medidas.get(metrica), anteriores.get(metrica)
+            if novo is None or antigo is None:
+                continue
+            piora = (novo - antigo) * direcao
+            if piora > max(tolerancia * antigo, folga):
+                regressoes.append(f"{etapa}.{metrica}: {antigo} -> {novo}")
+    return regressoes
+
+
+def _imprimir(etapas):
+    print(f"{'etapa':<22}{'n':>5}{'erros':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'URLs/s':>9}{'pico MB':>9}")
+    for etapa, m in etapas.items():
+        if "indisponivel" in m:
+            print(f"{etapa:<22}  indisponível: {m['indisponivel']}")
+            continue
+        valores = [m.get(c) for c in ("p50_ms", "p95_ms", "p99_ms")]
+        colunas = "".join(f"{'-' if v is None else v:>10}" for v in valores)
+        print(f"{etapa:<22}{m['n']:>5}{m['erros']:>7}{colunas}{m['throughput_por_s']:>9}{m['memoria_pico_mb']:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline de análise SEO.")
+    parser.add_argument("--urls", type=int, default=10, help="URLs por perfil de página em cada etapa")
+    parser.add_argument("--perfis", default="pequena,media,grande,spa")
+    parser.add_argument("--lote", type=int, default=40, help="URLs no modo lote")
+    parser.add_argument("--extracao", type=int, default=4)
+    parser.add_argument("--llm", type=int, default=8)
+    parser.add_argument("--pagespeed", type=int, default=4)
+    parser.add_argument("--latencia-paginas", type=float, default=0.0)
+    parser.add_argument("--latencia-llm", type=float, default=0.05)
+    parser.add_argument("--erro-llm", type=float, default=0.0, help="fração de respostas 429 da OpenAI")
+    parser.add_argument("--latencia-pagespeed", type=float, default=0.1)
+    parser.add_argument("--erro-pagespeed", type=float, default=0.0)
+    parser.add_argument("--base", default=str(BASE_PADRAO), help="arquivo da linha de base")
+    parser.add_argument("--salvar-base", action="store_true", help="grava este resultado como linha de base")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="piora relativa aceita (0.25 = 25%%)")
+    parser.add_argument("--saida", help="arquivo JSON do resultado")
+    args = parser.parse_args()
+
+    config = {
+        "urls": args.urls,
+        "perfis": [p.strip() for p in args.perfis.split(",") if p.strip()],
+        "lote": args.lote,
+        "extracao": args.extracao,
+        "llm": args.llm,
+        "pagespeed": args.pagespeed,
+        "latencia_paginas": args.latencia_paginas,
+        "latencia_llm": args.latencia_llm,
+        "erro_llm": args.erro_llm,
+        "latencia_pagespeed": args.latencia_pagespeed,
+        "erro_pagespeed": args.erro_pagespeed,
+    }
+    resultado = {
+        "versao": 1,
+        "criado_em": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_atual(),
+        "maquina": {
+            "python": platform.python_version(),
+            "sistema": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": config,
+        "etapas": executar_benchmark(config),
+    }
+    _imprimir(resultado["etapas"])
+
+    saida = Path(args.saida or RAIZ / "output_files" / f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Resultado salvo em {saida}")
+
+    base = Path(args.base)
+    if args.salvar_base:
+        base.parent.mkdir(parents=True, exist_ok=True)
+        base.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Linha de base gravada em {base}")
+    elif base.exists():
+        anterior = json.loads(base.read_text(encoding="utf-8"))
+        if anterior.get("config") != config:
+            print("[AVISO] A linha de base foi medida com outra configuração; a comparação pode não valer.")
+        regressoes = comparar(resultado, anterior, args.tolerancia)
+        if regressoes:
+            print(f"Regressões em relação a {base} (commit {anterior.get('commit')}):")
+            for regressao in regressoes:
+                print(f"  {regressao}")
+            sys.exit(1)
+        print(f"Sem regressões em relação a {base} (tolerância {args.tolerancia:.0%}).")
+    else:
+        # Sem base não há comparação: sair com sucesso esconderia as regressões
+        print(f"Sem linha de base em {base}; use --salvar-base para criar uma.")
+        sys.exit(1)
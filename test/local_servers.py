@@ -0,0 +1,482 @@
+"""Servidores locais que imitam as APIs externas, para rodar o projeto offline.
+
+Uso como script:
+    python test/local_servers.py openai --porta 8100
+
+e depois aponte o cliente para ele com OPENAI_BASE_URL=http://127.0.0.1:8100/v1.
+O servidor "blog" serve um site de teste para o rastreador:
+    python test/local_servers.py blog --porta 8200
+    python crawler.py http://127.0.0.1:8200/ --nome teste
+
+"pagespeed" imita a API v5 (PAGESPEED_API_URL=http://127.0.0.1:8300/pagespeedonline/v5/runPagespeed)
+e "paginas" serve as páginas sintéticas usadas pelo test/benchmark.py.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class ServidorLocal:
+    """Sobe um ThreadingHTTPServer em segundo plano; use com `with`."""
+
+    def __init__(self, porta=0, latencia=0.0, taxa_erro=0.0, semente=None):
+        self.latencia = latencia
+        self.taxa_erro = taxa_erro
+        self.requisicoes = 0
+        self.ativas = 0
+        self.simultaneas_max = 0
+        self._aleatorio = random.Random(semente)
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", porta), self._criar_handler())
+        self._servidor.daemon_threads = True
+        self._thread = None
+
+    @property
+    def porta(self):
+        return self._servidor.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.porta}"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def entrar(self):
+        with self._lock:
+            self.ativas += 1
+            self.simultaneas_max = max(self.simultaneas_max, self.ativas)
+
+    def sair(self):
+        with self._lock:
+            self.ativas -= 1
+
+    def sortear_erro(self):
+        with self._lock:
+            self.requisicoes += 1
+            return self._aleatorio.random() < self.taxa_erro
+
+    def rotear(self, handler, metodo, caminho, corpo):
+        # Devolve (status, headers, corpo em bytes); implementado pelas subclasses
+        raise NotImplementedError
+
+    def _criar_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _atender(self, metodo):
+                servidor.entrar()
+                try:
+                    self._responder(metodo)
+                finally:
+                    servidor.sair()
+
+            def _responder(self, metodo):
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                corpo = self.rfile.read(tamanho) if tamanho else b""
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                if servidor.sortear_erro():
+                    status, headers, resposta = 429, {"Retry-After": "1"}, b'{"error": {"message": "rate limit"}}'
+                else:
+                    try:
+                        status, headers, resposta = servidor.rotear(self, metodo, self.path, corpo)
+                    except Exception as e:
+                        status, headers, resposta = _json(500, {"error": {"message": str(e)}})
+                self.send_response(status)
+                headers = {"Content-Type": "application/json", **headers}
+                for nome, valor in headers.items():
+                    self.send_header(nome, valor)
+                self.send_header("Content-Length", str(len(resposta)))
+                self.end_headers()
+                if metodo != "HEAD":
+                    self.wfile.write(resposta)
+
+            def do_GET(self):
+                self._atender("GET")
+
+            def do_HEAD(self):
+                self._atender("HEAD")
+
+            def do_POST(self):
+                self._atender("POST")
+
+        return Handler
+
+
+def _json(status, dados, headers=None):
+    return status, headers or {}, json.dumps(dados, ensure_ascii=False).encode("utf-8")
+
+
+def _html(status, corpo, tipo="text/html; charset=utf-8"):
+    return status, {"Content-Type": tipo}, corpo.encode("utf-8")
+
+
+def avaliacao_falsa(prompt):
+    # Resposta determinística: o mesmo prompt gera sempre a mesma nota
+    semente = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+    nota = round(3 + (semente % 70) / 10, 1)
+    return {
+        "nota_seo": nota,
+        "explicacao": "Avaliação gerada pelo servidor local de testes.",
+        "sugestoes": [
+            "Inclua a palavra-chave no título.",
+            "Adicione links internos para artigos relacionados.",
+            "Escreva uma meta description mais descritiva.",
+        ],
+    }
+
+
+class ServidorOpenAIFalso(ServidorLocal):
+    """Imita /v1/chat/completions, /v1/files e /v1/batches da OpenAI."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.arquivos = {}
+        self.lotes = {}
+        self._ids = itertools.count(1)
+
+    def _novo_id(self, prefixo):
+        return f"{prefixo}-local{next(self._ids)}"
+
+    def completar(self, body):
+        prompt = body["messages"][-1]["content"]
+        conteudo = "```json\n" + json.dumps(avaliacao_falsa(prompt), ensure_ascii=False) + "\n```"
+        tokens_prompt = max(1, len(prompt) // 4)
+        tokens_resposta = max(1, len(conteudo) // 4)
+        return {
+            "id": self._novo_id("chatcmpl"),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": conteudo},
+            }],
+            "usage": {
+                "prompt_tokens": tokens_prompt,
+                "completion_tokens": tokens_resposta,
+                "total_tokens": tokens_prompt + tokens_resposta,
+            },
+        }
+
+    def _salvar_arquivo(self, handler, corpo):
+        mensagem = BytesParser(policy=policy.default).parsebytes(
+            b"Content-Type: " + handler.headers["Content-Type"].encode() + b"\r\n\r\n" + corpo
+        )
+        conteudo, nome, proposito = b"", "arquivo.jsonl", "batch"
+        for parte in mensagem.iter_parts():
+            campo = parte.get_param("name", header="content-disposition")
+            if campo == "file":
+                conteudo = parte.get_payload(decode=True)
+                nome = parte.get_filename() or nome
+            elif campo == "purpose":
+                proposito = parte.get_payload(decode=True).decode()
+        return self._registrar_arquivo(conteudo, nome, proposito)
+
+    def _registrar_arquivo(self, conteudo, nome, proposito):
+        arquivo = {
+            "id": self._novo_id("file"),
+            "object": "file",
+            "bytes": len(conteudo),
+            "created_at": int(time.time()),
+            "filename": nome,
+            "purpose": proposito,
+            "status": "processed",
+        }
+        self.arquivos[arquivo["id"]] = (arquivo, conteudo)
+        return arquivo
+
+    def _processar_lote(self, lote):
+        lote["status"] = "in_progress"
+        _, entrada = self.arquivos[lote["input_file_id"]]
+        saida = []
+        for linha in entrada.decode("utf-8").splitlines():
+            if not linha.strip():
+                continue
+            requisicao = json.loads(linha)
+            saida.append(json.dumps({
+                "id": self._novo_id("batch_req"),
+                "custom_id": requisicao["custom_id"],
+                "response": {"status_code": 200, "body": self.completar(requisicao["body"])},
+                "error": None,
+            }, ensure_ascii=False))
+        arquivo = self._registrar_arquivo(("\n".join(saida) + "\n").encode("utf-8"), "saida.jsonl", "batch_output")
+        lote.update(
+            status="completed",
+            output_file_id=arquivo["id"],
+            completed_at=int(time.time()),
+            request_counts={"total": len(saida), "completed": len(saida), "failed": 0},
+        )
+
+    def rotear(self, handler, metodo, caminho, corpo):
+        caminho = caminho.split("?")[0]
+        if metodo == "POST" and caminho.endswith("/chat/completions"):
+            return _json(200, self.completar(json.loads(corpo)))
+
+        if metodo == "POST" and caminho.endswith("/files"):
+            return _json(200, self._salvar_arquivo(handler, corpo))
+
+        m = re.search(r"/files/([^/]+)/content$", caminho)
+        if metodo == "GET" and m and m.group(1) in self.arquivos:
+            return 200, {"Content-Type": "application/octet-stream"}, self.arquivos[m.group(1)][1]
+
+        if metodo == "POST" and caminho.endswith("/batches"):
+            dados = json.loads(corpo)
+            lote = {
+                "id": self._novo_id("batch"),
+                "object": "batch",
+                "endpoint": dados["endpoint"],
+                "completion_window": dados["completion_window"],
+                "input_file_id": dados["input_file_id"],
+                "metadata": dados.get("metadata"),
+                "created_at": int(time.time()),
+                "status": "validating",
+            }
+            self.lotes[lote["id"]] = lote
+            threading.Thread(target=self._processar_lote, args=(lote,), daemon=True).start()
+            return _json(200, lote)
+
+        m = re.search(r"/batches/([^/]+)$", caminho)
+        if metodo == "GET" and m and m.group(1) in self.lotes:
+            return _json(200, self.lotes[m.group(1)])
+
+        return _json(404, {"error": {"message": f"rota desconhecida: {metodo} {caminho}"}})
+
+
+class ServidorBlogFalso(ServidorLocal):
+    """Blog de teste para o rastreador: listagens paginadas, artigos interligados,
+    tags, uma área bloqueada no robots.txt e sitemap.
+
+    `acessos` guarda (caminho, instante) de cada requisição, para conferir a
+    taxa por host; `simultaneas_max` mostra a concorrência que o site recebeu.
+    """
+
+    PARAGRAFO = (
+        "Investir com disciplina exige entender prazos, riscos e custos antes de escolher "
+        "qualquer produto, e este parágrafo existe para o artigo ter texto suficiente."
+    )
+
+    def __init__(self, *args, artigos=50, por_pagina=10, crawl_delay=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.artigos = artigos
+        self.por_pagina = por_pagina
+        self.crawl_delay = crawl_delay
+        self.acessos = []
+
+    def _listagem(self, titulo, numeros, proxima=None):
+        itens = "".join(f'<li><a href="/artigo-{n}">Artigo {n}</a></li>' for n in numeros)
+        paginacao = f'<a href="{proxima}">Próxima página</a>' if proxima else ""
+        return (
+            f"<html><head><title>{titulo}</title></head><body><h1>{titulo}</h1>"
+            f'<nav><a href="/">Início</a> <a href="/privado/admin">Admin</a></nav>'
+            f"<ul>{itens}</ul>{paginacao}</body></html>"
+        )
+
+    def _artigo(self, n):
+        vizinhos = [(n + d) % self.artigos for d in (1, 7, 13)]
+        links = "".join(f'<a href="/artigo-{v}?utm_source=blog#topo">Leia também {v}</a> ' for v in vizinhos)
+        paragrafos = "".join(f"<p>{self.PARAGRAFO} Parte {i} do artigo {n}.</p>" for i in range(6))
+        return (
+            f"<html><head><title>Artigo {n}</title>"
+            f'<meta name="description" content="Resumo do artigo de teste número {n}.">'
+            f'<link rel="canonical" href="{self.url}/artigo-{n}"></head><body>'
+            f"<article><h1>Como investir melhor: artigo {n}</h1><h2>Introdução</h2>{paragrafos}"
+            f'<p>{links}<a href="/tag/tema-{n % 5}">Tema {n % 5}</a> '
+            f'<a href="https://externo.example/fonte">Fonte</a> <a href="/arquivo-{n}.pdf">PDF</a></p>'
+            f"</article></body></html>"
+        )
+
+    def rotear(self, handler, metodo, caminho, corpo):
+        with self._lock:
+            self.acessos.append((caminho, time.monotonic()))
+        caminho = caminho.split("?")[0]
+
+        if caminho == "/robots.txt":
+            linhas = ["User-agent: *", "Disallow: /privado/"]
+            if self.crawl_delay:
+                linhas.append(f"Crawl-delay: {self.crawl_delay}")
+            linhas.append(f"Sitemap: {self.url}/sitemap.xml")
+            return _html(200, "\n".join(linhas) + "\n", "text/plain")
+
+        if caminho == "/sitemap.xml":
+            urls = "".join(
+                f"<url><loc>{self.url}/artigo-{n}</loc><lastmod>2024-{1 + n % 12:02d}-01</lastmod></url>"
+                for n in range(self.artigos)
+            )
+            return _html(200, f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>',
+                         "application/xml")
+
+        m = re.fullmatch(r"/(?:pagina/(\d+))?", caminho)
+        if m:
+            pagina = int(m.group(1) or 1)
+            inicio = (pagina - 1) * self.por_pagina
+            numeros = range(inicio, min(inicio + self.por_pagina, self.artigos))
+            proxima = f"/pagina/{pagina + 1}" if inicio + self.por_pagina < self.artigos else None
+            return _html(200, self._listagem(f"Blog de teste - página {pagina}", numeros, proxima))
+
+        m = re.fullmatch(r"/tag/tema-(\d+)", caminho)
+        if m:
+            tema = int(m.group(1))
+            return _html(200, self._listagem(f"Tema {tema}", [n for n in range(self.artigos) if n % 5 == tema]))
+
+        m = re.fullmatch(r"/artigo-(\d+)", caminho)
+        if m and int(m.group(1)) < self.artigos:
+            return _html(200, self._artigo(int(m.group(1))))
+
+        if caminho.startswith("/privado/"):
+            return _html(200, "<html><body><h1>Área restrita</h1></body></html>")
+
+        return _html(404, "<html><body><h1>Não encontrado</h1></body></html>")
+
+
+def lighthouse_falso(url, strategy):
+    # Métricas determinísticas por URL e estratégia, no formato da API v5
+    semente = int(hashlib.sha256(f"{url}|{strategy}".encode("utf-8")).hexdigest()[:8], 16)
+    lcp = 1.2 + (semente % 40) / 10
+    cls = (semente % 25) / 100
+    tbt = 50 + semente % 600
+
+    def auditoria(valor, texto):
+        return {"numericValue": valor, "displayValue": texto}
+
+    return {
+        "id": url,
+        "lighthouseResult": {
+            "requestedUrl": url,
+            "finalUrl": url,
+            "configSettings": {"formFactor": strategy},
+            "audits": {
+                "largest-contentful-paint": auditoria(lcp * 1000, f"{lcp:.1f} s"),
+                "interaction-to-next-paint": auditoria(80 + semente % 300, f"{80 + semente % 300} ms"),
+                "cumulative-layout-shift": auditoria(cls, f"{cls:.2f}"),
+                "first-contentful-paint": auditoria(lcp * 600, f"{lcp * 0.6:.1f} s"),
+                "server-response-time": auditoria(40 + semente % 400, f"{40 + semente % 400} ms"),
+                "total-blocking-time": auditoria(tbt, f"{tbt} ms"),
+                "speed-index": auditoria(lcp * 900, f"{lcp * 0.9:.1f} s"),
+            },
+            "categories": {
+                "performance": {"score": round(0.35 + (semente % 65) / 100, 2)},
+                "accessibility": {"score": round(0.7 + (semente % 30) / 100, 2)},
+                "best-practices": {"score": round(0.75 + (semente % 25) / 100, 2)},
+                "seo": {"score": round(0.8 + (semente % 20) / 100, 2)},
+            },
+        },
+    }
+
+
+class ServidorPageSpeedFalso(ServidorLocal):
+    """Imita GET /pagespeedonline/v5/runPagespeed; use com PAGESPEED_API_URL."""
+
+    def rotear(self, handler, metodo, caminho, corpo):
+        caminho, _, consulta = caminho.partition("?")
+        if not caminho.endswith("/runPagespeed"):
+            return _json(404, {"error": {"message": f"rota desconhecida: {metodo} {caminho}"}})
+        parametros = parse_qs(consulta)
+        if "url" not in parametros:
+            return _json(400, {"error": {"code": 400, "message": "Invalid value at 'url'"}})
+        strategy = parametros.get("strategy", ["desktop"])[0]
+        return _json(200, lighthouse_falso(parametros["url"][0], strategy))
+
+
+class ServidorPaginasFalso(ServidorLocal):
+    """Páginas sintéticas de tamanhos e pesos de JavaScript diferentes, em /<perfil>/<n>.
+
+    O texto muda com `n`, então cada URL gera uma chave de cache nova. No
+    perfil "spa" o artigo só existe depois que o JavaScript roda.
+    """
+
+    # paragrafos: tamanho do texto; script_kb: bytes de JS inline; js_ms: CPU gasto pelo script
+    PERFIS = {
+        "pequena": {"paragrafos": 6, "script_kb": 0, "js_ms": 0, "spa": False},
+        "media": {"paragrafos": 40, "script_kb": 64, "js_ms": 20, "spa": False},
+        "grande": {"paragrafos": 250, "script_kb": 512, "js_ms": 80, "spa": False},
+        "spa": {"paragrafos": 20, "script_kb": 256, "js_ms": 50, "spa": True},
+    }
+
+    def pagina(self, perfil, n):
+        config = self.PERFIS[perfil]
+        paragrafos = "".join(
+            f"<p>{ServidorBlogFalso.PARAGRAFO} Trecho {i} da página {perfil} {n}.</p>"
+            for i in range(config["paragrafos"])
+        )
+        artigo = (
+            f"<h1>Guia de investimentos {n} ({perfil})</h1><h2>Primeiros passos</h2>{paragrafos}"
+            f'<p><a href="/{perfil}/{n + 1}">Próximo</a> <a href="https://externo.example/">Fonte</a></p>'
+        )
+        scripts = ""
+        if config["script_kb"]:
+            scripts += f'<script>var carga = "{"x" * (config["script_kb"] * 1024)}";</script>'
+        if config["js_ms"]:
+            scripts += f"<script>var t0 = Date.now(); while (Date.now() - t0 < {config['js_ms']}) {{}}</script>"
+        if config["spa"]:
+            corpo = (
+                f'<div id="app"></div>{scripts}'
+                f"<script>document.getElementById('app').innerHTML = {json.dumps('<article>' + artigo + '</article>')};</script>"
+            )
+        else:
+            corpo = f"<article>{artigo}</article>{scripts}"
+        return (
+            f"<html><head><title>Página {perfil} {n}</title>"
+            f'<meta name="description" content="Página sintética {perfil} número {n}."></head>'
+            f"<body>{corpo}</body></html>"
+        )
+
+    def rotear(self, handler, metodo, caminho, corpo):
+        m = re.fullmatch(r"/(\w+)/(\d+)", caminho.split("?")[0])
+        if m and m.group(1) in self.PERFIS:
+            return _html(200, self.pagina(m.group(1), int(m.group(2))))
+        return _html(404, "<html><body><h1>Não encontrado</h1></body></html>")
+
+
+SERVIDORES = {
+    "openai": ServidorOpenAIFalso,
+    "blog": ServidorBlogFalso,
+    "pagespeed": ServidorPageSpeedFalso,
+    "paginas": ServidorPaginasFalso,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sobe um servidor local que imita uma API externa.")
+    parser.add_argument("servidor", choices=sorted(SERVIDORES))
+    parser.add_argument("--porta", type=int, default=8100)
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos por requisição")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração de respostas 429")
+    args = parser.parse_args()
+
+    servidor = SERVIDORES[args.servidor](args.porta, latencia=args.latencia, taxa_erro=args.taxa_erro)
+    print(f"Servidor '{args.servidor}' ouvindo em {servidor.url}")
+    servidor.iniciar()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.parar()
@@ -0,0 +1,94 @@
+"""Confere o índice de links internos num blog sintético, sem rede:
+
+    python test/teste_links_internos.py
+
+Cada artigo precisa terminar com min(TOP_K, candidatos) relacionados, em que
+candidatos são os outros artigos com similaridade mínima; e um blog pequeno
+não pode perder todos os termos no corte de frequência.
+"""
+import os
+import random
+import sys
+from pathlib import Path
+
+os.environ["INTERNAL_LINKS_TOP_K"] = "2"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import internal_links  # noqa: E402
+from internal_links import IndiceLinksInternos, SIMILARIDADE_MINIMA, TOP_K  # noqa: E402
+
+ASSUNTOS = [
+    ["tesouro", "selic", "renda", "fixa", "prefixado", "cupom", "vencimento", "liquidez"],
+    ["ações", "dividendos", "bolsa", "balanço", "lucro", "setor", "empresa", "valuation"],
+    ["fundos", "imobiliários", "aluguel", "galpões", "shoppings", "cotas", "vacância", "gestora"],
+    ["câmbio", "dólar", "euro", "exportação", "moeda", "inflação", "juros", "banco"],
+    ["previdência", "aposentadoria", "imposto", "tabela", "regressiva", "benefício", "contribuição", "plano"],
+]
+
+
+def _artigo(gerador, n):
+    # Cada artigo mistura um assunto principal com dois outros sorteados: os
+    # vizinhos se sobrepõem sem que todos pareçam com todos
+    principal = ASSUNTOS[n % len(ASSUNTOS)]
+    outros = gerador.sample(ASSUNTOS, 2)
+    palavras = [gerador.choice(principal) for _ in range(100)]
+    palavras += [gerador.choice(assunto) for assunto in outros for _ in range(25)]
+    palavras += [f"termo{gerador.randrange(400)}" for _ in range(40)]
+    gerador.shuffle(palavras)
+    return {
+        "link": f"https://blog.exemplo.com/artigo-{n}",
+        "titulo": f"Guia de {principal[0]} e {gerador.choice(principal)} {n}",
+        "subtitulos": [gerador.choice(principal), gerador.choice(outros[0])],
+        "texto": ". ".join(" ".join(palavras[i:i + 12]) for i in range(0, len(palavras), 12)),
+    }
+
+
+def _candidatos(indice):
+    # Força bruta: todos os pares com similaridade mínima
+    total, idf = indice._idf()
+    linhas = indice._conn.execute("SELECT id, termos FROM artigos").fetchall()
+    vetores = {i: dict(indice._vetor(internal_links._descomprimir(t), idf)) for i, t in linhas}
+    candidatos = {}
+    for a, va in vetores.items():
+        candidatos[a] = sum(
+            1 for b, vb in vetores.items()
+            if a != b and sum(p * vb.get(t, 0.0) for t, p in va.items()) >= SIMILARIDADE_MINIMA - 1e-6
+        )
+    return candidatos
+
+
+def conferir_top_k(quantidade=60):
+    gerador = random.Random(7)
+    indice = IndiceLinksInternos(":memory:")
+    indice.adicionar_varios(_artigo(gerador, n) for n in range(quantidade))
+    indice.recalcular(completo=True)
+    # Um artigo alterado e recalculado sozinho também mexe na lista dos vizinhos
+    indice.adicionar(_artigo(gerador, 3))
+    indice.recalcular()
+    contagem = dict(indice._conn.execute("SELECT origem, COUNT(*) FROM relacionados GROUP BY origem").fetchall())
+    erros = [
+        (artigo, contagem.get(artigo, 0), candidatos)
+        for artigo, candidatos in _candidatos(indice).items()
+        if contagem.get(artigo, 0) != min(TOP_K, candidatos)
+    ]
+    indice.fechar()
+    assert not erros, f"artigos com relacionados a menos ou a mais (id, tem, candidatos): {erros}"
+    print(f"✅ {quantidade} artigos com min({TOP_K}, candidatos) relacionados cada")
+
+
+def conferir_blog_pequeno(quantidade=12):
+    gerador = random.Random(11)
+    indice = IndiceLinksInternos(":memory:")
+    indice.adicionar_varios(_artigo(gerador, n) for n in range(quantidade))
+    _, idf = indice._idf()
+    indice.recalcular(completo=True)
+    sugestoes = list(indice.sugestoes())
+    indice.fechar()
+    assert idf, "nenhum termo sobrou no corte de frequência"
+    assert sugestoes, "nenhuma sugestão num blog pequeno"
+    print(f"✅ {quantidade} artigos: {len(idf)} termos, {len(sugestoes)} sugestões")
+
+
+if __name__ == "__main__":
+    conferir_top_k()
+    conferir_blog_pequeno()
@@ -2,10 +2,13 @@ from crewai import Agent, Task, Crew, Process
 from crewai_tools import SerperDevTool
 import os
 import json
-import pandas as pd
 from playwright.sync_api import sync_playwright
 from dotenv import load_dotenv
 from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from jsonl_output import EscritorJSONL
 
 load_dotenv()
 
@@ -185,17 +188,15 @@ for artigo in artigos:
         "sugestoes": sugestoes_texto
     })
 
-# Garante que a pasta 'output_files' exista
-os.makedirs("output_files", exist_ok=True)
-
 # Gera timestamp no formato YYYYMMDD_HHMMSS
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-# Define o nome do arquivo com timestamp
-file_name = f"avaliacoes_seo_completas_{timestamp}.json"
+# Um resultado por linha, no mesmo formato do xp_blog_scraper_pagespeed.py
+file_name = f"avaliacoes_seo_completas_{timestamp}.jsonl"
 file_path = os.path.join("output_files", file_name)
 
-df = pd.DataFrame(resultados)
-df.to_json(file_path, orient="records", indent=2, force_ascii=False)
+with EscritorJSONL(file_path) as escritor:
+    for resultado in resultados:
+        escritor.escrever(resultado)
 
 print(f"Processo finalizado. Resultados salvos em {file_path}")
@@ -1,163 +1,66 @@
 from crewai import Agent, Task, Crew, Process
-from crewai_tools import SerperDevTool
 import os
 import json
-import pandas as pd
-from playwright.sync_api import sync_playwright
 from dotenv import load_dotenv
 from datetime import datetime
-import requests
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from browser_pool import obter_pool
+from jsonl_output import EscritorJSONL, urls_concluidas
+from pagespeed import obter_cliente_pagespeed
+from result_store import obter_armazem
+from url_discovery import descobrir_urls, interpretar_data
 
 load_dotenv()
 
 # === CONFIG ===
 os.environ['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY')
-os.environ['SERPER_API_KEY'] = os.getenv('SERPER_API_KEY')
-
-# === AGENTES ===
-search_tool = SerperDevTool()
-
-google_agent = Agent(
-    role="Pesquisador de Artigos XP",
-    goal="Buscar no Google os links dos artigos recentes do blog da XP investimentos",
-    backstory="Você é um especialista em encontrar conteúdos de blog usando comandos de busca avançada no Google.",
-    tools=[search_tool],
-    verbose=True
-)
-
-# === TASK DE BUSCA NO GOOGLE ===
-search_task = Task(
-    description="Use uma busca no Google para encontrar os 10 links mais recentes de artigos do blog da XP Investimentos (https://conteudos.xpi.com.br)",
-    expected_output="Uma lista com pelo menos 10 links válidos de artigos.",
-    agent=google_agent
-)
-
-crew_busca = Crew(
-    agents=[google_agent],
-    tasks=[search_task],
-    process=Process.sequential
-)
 
+# === DESCOBERTA DOS ARTIGOS (robots.txt, sitemaps e feeds) ===
 print("Buscando links...")
-resultado_busca = crew_busca.kickoff()  # CrewOutput object
-resultado_busca_str = str(resultado_busca)
-
-# === TRANSFORMAR O TEXTO DE LINKS EM LISTA ===
-import re
-lista_links = re.findall(r"https://conteudos\.xpi\.com\.br[\w\-/]+", resultado_busca_str)
+lista_links = list(descobrir_urls(
+    os.getenv("BLOG_URL", "https://conteudos.xpi.com.br/"),
+    limite=int(os.getenv("BLOG_MAX_ARTICLES", "10")),
+    desde=interpretar_data(os.getenv("BLOG_SINCE")) if os.getenv("BLOG_SINCE") else None,
+))
 
 print("Links encontrados:")
 print(lista_links)
 
 # === SCRAPER COM PLAYWRIGHT ===
-def extrair_conteudo_xp_blog(url): 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False, args=["--start-maximized"])
-        context = browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            ),
-            viewport={"width": 1280, "height": 800},
-            timezone_id="America/Sao_Paulo",
-            locale="pt-BR",
-        )
-
-        page = context.new_page()
-        page.goto(url, timeout=60000)
-
-        # Screenshot para debug
-        page.screenshot(path="pagina_xp_stealth.png", full_page=True)
-
-        try:
-            page.wait_for_selector('article', timeout=15000)
-        except:
-            print(f"'article' ainda não encontrado em {url}")
+def _extrair_pagina_xp_blog(page, url):
+    page.goto(url, timeout=60000)
 
-        titulo = page.locator('h1').first.text_content() or ""
-        subtitulos = page.locator('h2, h3').all_text_contents()
-        paragrafos = page.locator('p').all_text_contents()
-        texto = "\n\n".join(paragrafos)
+    # Screenshot para debug
+    page.screenshot(path="pagina_xp_stealth.png", full_page=True)
 
-        browser.close()
+    try:
+        page.wait_for_selector('article', timeout=15000)
+    except:
+        print(f"'article' ainda não encontrado em {url}")
+
+    titulo = page.locator('h1').first.text_content() or ""
+    subtitulos = page.locator('h2, h3').all_text_contents()
+    paragrafos = page.locator('p').all_text_contents()
+    texto = "\n\n".join(paragrafos)
+
+    return {
+        'link': url,
+        'titulo': titulo.strip(),
+        'subtitulos': [s.strip() for s in subtitulos],
+        'texto': texto.strip()
+    }
 
-        return {
-            'link': url,
-            'titulo': titulo.strip(),
-            'subtitulos': [s.strip() for s in subtitulos],
-            'texto': texto.strip()
-        }
+def extrair_conteudo_xp_blog(url):
+    # Reaproveita os navegadores já abertos do pool entre os links
+    return obter_pool().executar(lambda page: _extrair_pagina_xp_blog(page, url))
     
 def consultar_pagespeed_api(url):
-    api_key = os.getenv("GOOGLE_PAGESPEED_API_KEY")
-    api_url = "https://www.googleapis.com/pagespeedonline/v5/runPagespeed"
-
-    params = {
-        "url": url,
-        "key": api_key,
-        "strategy": "desktop",
-        "category": ["performance", "accessibility", "best-practices", "seo"]
-    }
-
-    try:
-        response = requests.get(api_url, params=params, timeout=60)
-        data = response.json()
-
-        if "lighthouseResult" not in data:
-            print(f"[AVISO] Nenhum dado encontrado para {url}")
-            return {}
-
-        lighthouse = data["lighthouseResult"]
-        audits = lighthouse.get("audits", {})
-        categories = lighthouse.get("categories", {})
-
-        # Fallback de valor
-        def safe_get(d, key):
-            return d.get(key, {}).get("displayValue", "N/A")
-
-        def safe_score(cat):
-            score = categories.get(cat, {}).get("score")
-            return round(score * 100) if score is not None else "N/A"
-
-        resultado = {
-            "core_web_vitals": {
-                "LCP": safe_get(audits, "largest-contentful-paint"),
-                "INP": safe_get(audits, "interaction-to-next-paint"),
-                "CLS": safe_get(audits, "cumulative-layout-shift"),
-                "FCP": safe_get(audits, "first-contentful-paint"),
-                "TTFB": safe_get(audits, "server-response-time"),
-            },
-            "performance": {
-                "FCP": safe_get(audits, "first-contentful-paint"),
-                "TotalBlockingTime": safe_get(audits, "total-blocking-time"),
-                "SpeedIndex": safe_get(audits, "speed-index"),
-                "LCP": safe_get(audits, "largest-contentful-paint"),
-                "CLS": safe_get(audits, "cumulative-layout-shift"),
-            },
-            "accessibility": safe_score("accessibility"),
-            "best_practices": safe_score("best-practices"),
-            "seo": safe_score("seo")
-        }
-
-        return resultado
-
-    except Exception as e:
-        print(f"[ERRO] Falha ao consultar PageSpeed para {url}: {e}")
-        return {}
-
-# === EXTRAIR CONTEÚDOS ===
-print("Extraindo conteúdos com Playwright...")
-artigos = []
-for link in lista_links:
-    try:
-        artigo = extrair_conteudo_xp_blog(link)
-        artigos.append(artigo)
-    except Exception as e:
-        print(f"Erro ao processar {link}: {e}")
-
-# === RODAR AVALIAÇÃO SEO E MELHORIAS ===
-print("Avaliando SEO e gerando melhorias...")
+    # Cliente compartilhado: sessão HTTP reaproveitada e cache das consultas repetidas
+    return obter_cliente_pagespeed().consultar_estrategias(url)
 
+# === AGENTES DE AVALIAÇÃO SEO E MELHORIAS ===
 seo_agent = Agent(
     role="Analista de SEO",
     goal="Avaliar o conteúdo de artigos do blog com base em critérios de SEO e atribuir uma nota",
@@ -172,9 +75,7 @@ improvement_agent = Agent(
     verbose=True
 )
 
-resultados = []
-
-for artigo in artigos:
+def avaliar_artigo(artigo):
     conteudo_str = {
         "titulo": artigo["titulo"],
         "subtitulos": artigo["subtitulos"],
@@ -239,26 +140,38 @@ for artigo in artigos:
     # Extrair sugestões
     sugestoes_texto = sugestoes.raw if hasattr(sugestoes, "raw") else str(sugestoes)
 
-    resultados.append({
+    return {
         "titulo_blog": artigo["titulo"],
         "link": artigo["link"],
         "nota_seo": seo_dict.get("nota_seo"),
         "explicacao": seo_dict.get("explicacao"),
         "sugestoes": sugestoes_texto,
         "page_speed": metricas_pagespeed
-    })
-
-# Garante que a pasta 'output_files' exista
-os.makedirs("output_files", exist_ok=True)
+    }
 
-# Gera timestamp no formato YYYYMMDD_HHMMSS
+# === EXTRAIR, AVALIAR E GRAVAR UM ARTIGO POR VEZ ===
+# Cada resultado vai para o JSONL assim que fica pronto; rodar de novo com o
+# mesmo BLOG_OUTPUT pula os links que já têm resultado
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-# Define o nome do arquivo com timestamp
-file_name = f"avaliacoes_seo_completas_{timestamp}.json"
-file_path = os.path.join("output_files", file_name)
-
-df = pd.DataFrame(resultados)
-df.to_json(file_path, orient="records", indent=2, force_ascii=False)
+file_path = os.getenv("BLOG_OUTPUT") or os.path.join("output_files", f"avaliacoes_seo_completas_{timestamp}.jsonl")
+concluidos = urls_concluidas(file_path)
+armazem = obter_armazem()
+
+print("Extraindo e avaliando artigos...")
+with EscritorJSONL(file_path) as escritor:
+    for link in lista_links:
+        if link in concluidos:
+            print(f"Já avaliado, pulando: {link}")
+            continue
+        try:
+            artigo = extrair_conteudo_xp_blog(link)
+        except Exception as e:
+            print(f"Erro ao processar {link}: {e}")
+            continue
+
+        resultado = avaliar_artigo(artigo)
+        escritor.escrever(resultado)
+        # Registra também no armazém SQLite, consultável por URL, data e nota
+        armazem.salvar(resultado)
 
 print(f"Processo finalizado. Resultados salvos em {file_path}")
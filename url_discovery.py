@@ -0,0 +1,324 @@
+import argparse
+import hashlib
+import re
+import sys
+import zlib
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from xml.etree.ElementTree import XMLParser
+
+from static_extractor import obter_sessao_http
+from telemetry import obter_logger
+
+# Caminhos tentados quando o robots.txt não declara nenhum sitemap
+CAMINHOS_PADRAO = ["/sitemap.xml", "/sitemap_index.xml", "/feed", "/rss.xml", "/atom.xml"]
+
+# Parâmetros de rastreamento removidos na normalização
+PARAMETROS_IGNORADOS = re.compile(r"^(utm_\w+|gclid|fbclid|mc_cid|mc_eid|_ga)$", re.IGNORECASE)
+
+PROFUNDIDADE_MAXIMA = 5
+
+log = obter_logger("url_discovery")
+
+_PORTAS_PADRAO = {"http": 80, "https": 443}
+
+
+def normalizar_url(url, base=None):
+    """Forma canônica usada na deduplicação: esquema e host em minúsculas, sem
+    porta padrão, sem fragmento e sem parâmetros de rastreamento."""
+    url = url.strip()
+    if base and not url.startswith(("http://", "https://")):
+        url = urljoin(base, url)
+    partes = urlsplit(url)
+    esquema = partes.scheme.lower()
+    host = (partes.hostname or "").lower()
+    if partes.port and partes.port != _PORTAS_PADRAO.get(esquema):
+        host = f"{host}:{partes.port}"
+    query = partes.query
+    if query:
+        query = urlencode(sorted(
+            (k, v) for k, v in parse_qsl(query, keep_blank_values=True)
+            if not PARAMETROS_IGNORADOS.match(k)
+        ))
+    return urlunsplit((esquema, host, partes.path or "/", query, ""))
+
+
+def interpretar_data(texto):
+    # lastmod (W3C), pubDate (RFC 822) e updated/published (RFC 3339), sempre em UTC
+    texto = (texto or "").strip()
+    if not texto:
+        return None
+    try:
+        data = datetime.fromisoformat(texto.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            data = parsedate_to_datetime(texto)
+        except (TypeError, ValueError):
+            return None
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return data.astimezone(timezone.utc)
+
+
+_REGISTROS = {"url", "sitemap", "item", "entry"}
+# Em ordem de preferência; publication_date vem dos sitemaps de notícias
+_CAMPOS_DATA = ("lastmod", "publication_date", "pubdate", "updated", "published")
+_CAMPOS_TEXTO = {"loc", "link", "guid", *_CAMPOS_DATA}
+
+
+@lru_cache(maxsize=256)
+def _nome_local(tag):
+    return tag.rsplit("}", 1)[-1].lower()
+
+
+def _descomprimir(pedacos, tamanho=65536):
+    # Descomprime .gz em pedaços limitados quando o servidor não usa Content-Encoding;
+    # XML repetitivo chega a expandir 50x, então a saída também é fatiada
+    descompressor = None
+    for pedaco in pedacos:
+        if descompressor is None:
+            if pedaco[:2] != b"\x1f\x8b":
+                yield pedaco
+                yield from pedacos
+                return
+            descompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        dados = pedaco
+        while dados:
+            yield descompressor.decompress(dados, tamanho)
+            dados = descompressor.unconsumed_tail
+    if descompressor is not None:
+        # O que ainda ficou no buffer do descompressor no fim do fluxo
+        yield descompressor.flush()
+
+
+class _LeitorRegistros:
+    """Alvo do XMLParser que não monta árvore: guarda só os campos do registro atual.
+
+    Considera apenas os filhos diretos de cada <url>, <sitemap>, <item> ou
+    <entry>, para que <image:loc> e afins não se confundam com o <loc> da página.
+    """
+
+    def __init__(self):
+        self.saida = []
+        self._profundidade = 0
+        self._registro = None
+        self._nivel_registro = 0
+        self._campo = None
+        self._texto = []
+        self._campos = {}
+
+    def start(self, tag, atributos):
+        self._profundidade += 1
+        nome = _nome_local(tag)
+        if self._registro is None:
+            if nome in _REGISTROS:
+                self._registro, self._nivel_registro, self._campos = nome, self._profundidade, {}
+        elif self._profundidade == self._nivel_registro + 1:
+            if nome == "link" and "href" in atributos:
+                # Atom: vale o <link> rel="alternate" (ou sem rel)
+                if atributos.get("rel", "alternate") == "alternate":
+                    self._campos.setdefault("link", atributos["href"].strip())
+            elif nome in _CAMPOS_TEXTO:
+                self._campo, self._texto = nome, []
+
+    def data(self, texto):
+        if self._campo is not None:
+            self._texto.append(texto)
+
+    def end(self, tag):
+        if self._campo is not None:
+            valor = "".join(self._texto).strip()
+            if valor:
+                self._campos.setdefault(self._campo, valor)
+            self._campo = None
+        elif self._registro is not None and self._profundidade == self._nivel_registro:
+            campos = self._campos
+            guid = campos.get("guid", "")
+            url = campos.get("loc") or campos.get("link") or (guid if guid.startswith("http") else None)
+            data = next((campos[c] for c in _CAMPOS_DATA if c in campos), None)
+            if url:
+                tipo = "sitemap" if self._registro == "sitemap" else "pagina"
+                self.saida.append((tipo, url, interpretar_data(data)))
+            self._registro = None
+        self._profundidade -= 1
+
+    def close(self):
+        return None
+
+
+def ler_entradas_xml(pedacos):
+    """Lê sitemap, índice de sitemaps, RSS ou Atom de forma incremental.
+
+    Recebe os bytes em pedaços e devolve tuplas (tipo, url, data), onde tipo é
+    "sitemap" (filho de um índice) ou "pagina". Nenhuma árvore é montada, então
+    a memória não cresce com o tamanho do arquivo.
+    """
+    leitor = _LeitorRegistros()
+    parser = XMLParser(target=leitor)
+    for pedaco in _descomprimir(iter(pedacos)):
+        parser.feed(pedaco)
+        yield from leitor.saida
+        leitor.saida.clear()
+    parser.close()
+    yield from leitor.saida
+
+
+def sitemaps_do_robots(linhas):
+    for linha in linhas:
+        chave, _, valor = linha.partition(":")
+        if chave.strip().lower() == "sitemap" and valor.strip():
+            yield valor.strip()
+
+
+class DescobertaURLs:
+    """Descobre URLs de artigos a partir de robots.txt, sitemaps e feeds RSS/Atom.
+
+    Tudo é lido em fluxo: sitemaps com centenas de milhares de entradas não são
+    carregados inteiros. Só a deduplicação guarda um hash de 8 bytes por URL.
+    """
+
+    def __init__(self, sessao=None, desde=None, ate=None, incluir=None, excluir=None,
+                 mesmo_dominio=True, timeout=30):
+        self.sessao = sessao or obter_sessao_http()
+        self.desde = desde
+        self.ate = ate
+        self.incluir = [re.compile(p) for p in (incluir or [])]
+        self.excluir = [re.compile(p) for p in (excluir or [])]
+        self.mesmo_dominio = mesmo_dominio
+        self.timeout = timeout
+        self.estatisticas = {"fontes": 0, "lidas": 0, "filtradas": 0, "duplicadas": 0, "aceitas": 0}
+        self._vistas = set()
+
+    def _baixar(self, url):
+        response = self.sessao.get(url, timeout=self.timeout, stream=True)
+        if response.status_code >= 400:
+            response.close()
+            return None
+        return response
+
+    def _fontes_do_site(self, site):
+        base = normalizar_url(site)
+        response = self._baixar(urljoin(base, "/robots.txt"))
+        fontes = []
+        if response is not None:
+            with response:
+                fontes = list(sitemaps_do_robots(response.iter_lines(decode_unicode=True)))
+        return fontes or [urljoin(base, caminho) for caminho in CAMINHOS_PADRAO]
+
+    def _dentro_da_janela(self, data):
+        if data is None:
+            return True
+        if self.desde and data < self.desde:
+            return False
+        if self.ate and data > self.ate:
+            return False
+        return True
+
+    def _aceitar(self, url, dominio):
+        host = urlsplit(url).hostname or ""
+        if self.mesmo_dominio and dominio and host != dominio and not host.endswith("." + dominio):
+            return False
+        caminho = urlsplit(url).path
+        if self.incluir and not any(p.search(caminho) for p in self.incluir):
+            return False
+        return not any(p.search(caminho) for p in self.excluir)
+
+    def _nova(self, url):
+        chave = hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+        if chave in self._vistas:
+            return False
+        self._vistas.add(chave)
+        return True
+
+    def _ler_fonte(self, url, dominio, profundidade, visitadas):
+        if url in visitadas or profundidade > PROFUNDIDADE_MAXIMA:
+            return
+        visitadas.add(url)
+        try:
+            response = self._baixar(url)
+        except Exception as e:
+            log.warning(f"Falha ao baixar {url}: {e}")
+            return
+        if response is None:
+            return
+
+        self.estatisticas["fontes"] += 1
+        filhos = []
+        with response:
+            try:
+                for tipo, link, data in ler_entradas_xml(response.iter_content(chunk_size=65536)):
+                    link = normalizar_url(link, base=url)
+                    if tipo == "sitemap":
+                        # lastmod do sitemap filho é a última alteração de qualquer entrada dele
+                        if self.desde is None or data is None or data >= self.desde:
+                            filhos.append(link)
+                        continue
+                    self.estatisticas["lidas"] += 1
+                    if not self._dentro_da_janela(data) or not self._aceitar(link, dominio):
+                        self.estatisticas["filtradas"] += 1
+                    elif not self._nova(link):
+                        self.estatisticas["duplicadas"] += 1
+                    else:
+                        self.estatisticas["aceitas"] += 1
+                        yield {"url": link, "data": data, "fonte": url}
+            except Exception as e:
+                log.warning(f"Fonte ignorada ({url}): {e}")
+
+        for filho in filhos:
+            yield from self._ler_fonte(filho, dominio, profundidade + 1, visitadas)
+
+    def descobrir(self, origem, limite=None):
+        """Gera dicts {url, data, fonte} a partir de um site, sitemap ou feed.
+
+        Se `origem` é a raiz de um site, os sitemaps vêm do robots.txt (ou dos
+        caminhos padrão); caso contrário, é lida diretamente como sitemap/feed.
+        """
+        partes = urlsplit(origem)
+        dominio = (partes.hostname or "").lower().removeprefix("www.")
+        fontes = self._fontes_do_site(origem) if partes.path in ("", "/") else [origem]
+
+        visitadas = set()
+        total = 0
+        for fonte in fontes:
+            for entrada in self._ler_fonte(fonte, dominio, 0, visitadas):
+                yield entrada
+                total += 1
+                if limite is not None and total >= limite:
+                    return
+
+
+def descobrir_urls(origem, limite=None, **filtros):
+    for entrada in DescobertaURLs(**filtros).descobrir(origem, limite):
+        yield entrada["url"]
+
+
+def _data_argumento(texto):
+    data = interpretar_data(texto)
+    if data is None:
+        raise argparse.ArgumentTypeError(f"data inválida: {texto}")
+    return data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lista URLs de artigos a partir de sitemaps e feeds RSS/Atom.")
+    parser.add_argument("origem", help="raiz do site, sitemap (.xml ou .xml.gz) ou feed")
+    parser.add_argument("--desde", type=_data_argumento, help="só entradas alteradas a partir dessa data (AAAA-MM-DD)")
+    parser.add_argument("--ate", type=_data_argumento, help="só entradas alteradas até essa data")
+    parser.add_argument("--incluir", action="append", help="regex que o caminho deve conter (pode repetir)")
+    parser.add_argument("--excluir", action="append", help="regex de caminhos descartados (pode repetir)")
+    parser.add_argument("--limite", type=int)
+    parser.add_argument("--outros-dominios", action="store_true", help="aceita URLs de outros domínios")
+    args = parser.parse_args()
+
+    descoberta = DescobertaURLs(
+        desde=args.desde,
+        ate=args.ate,
+        incluir=args.incluir,
+        excluir=args.excluir,
+        mesmo_dominio=not args.outros_dominios,
+    )
+    for entrada in descoberta.descobrir(args.origem, args.limite):
+        print(entrada["url"])
+    print(f"Descoberta: {descoberta.estatisticas}", file=sys.stderr)
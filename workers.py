@@ -0,0 +1,200 @@
+import argparse
+import multiprocessing
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+from incremental import ResumoIncremental
+from job_queue import LEASE_PADRAO, criar_fila
+from telemetry import etapa
+
+# Intervalo entre consultas à fila quando não há trabalho disponível
+ESPERA_OCIOSA = float(os.getenv("JOB_POLL_SECONDS", "2"))
+# Navegadores por processo: o paralelismo vem do número de processos
+NAVEGADORES_POR_PROCESSO = int(os.getenv("WORKER_BROWSERS", "1"))
+
+
+def analisar_padrao(url, pool, modo=None, incremental=False):
+    # Importado só no processo filho: cada um tem seu cliente OpenAI, sessões e caches
+    import main
+
+    if incremental:
+        return main.analisar_url_incremental(url, pool=pool, modo=modo)
+    return main.analisar_url(url, pool=pool, modo=modo)
+
+
+def _manter_lease(fila, trabalho, nome, lease, parar):
+    # Renova o lease enquanto a análise roda; uma análise lenta não é tomada por outro
+    while not parar.wait(lease / 3):
+        if not fila.renovar(trabalho["id"], nome, lease):
+            return
+
+
+def trabalhar(indice=0, caminho_fila=None, backend=None, modo=None, incremental=False,
+              lease=None, ate_esvaziar=True, analisar=None, navegadores=None, relatorio=None):
+    """Laço de um processo trabalhador: reserva, extrai → avalia → PageSpeed, grava.
+
+    Os resultados vão para o armazém central (result_store) e o trabalho é
+    marcado como concluído; exceções devolvem o trabalho à fila para nova tentativa.
+    A contagem final (com o resumo incremental) também vai para a fila `relatorio`,
+    se houver, para o processo pai juntar a de todos.
+    """
+    from browser_pool import PoolNavegadores
+    from result_store import obter_armazem
+
+    nome = f"{socket.gethostname()}-{os.getpid()}-{indice}"
+    lease = lease or LEASE_PADRAO
+    analisar = analisar or analisar_padrao
+    fila = criar_fila(caminho_fila, backend)
+    armazem = obter_armazem()
+    pool = PoolNavegadores(tamanho=navegadores or NAVEGADORES_POR_PROCESSO)
+    contagem = {"concluidos": 0, "falhas": 0}
+    resumo = ResumoIncremental() if incremental else None
+
+    try:
+        while True:
+            trabalho = fila.reservar(nome, lease)
+            if trabalho is None:
+                if ate_esvaziar and fila.ativos() == 0:
+                    break
+                time.sleep(ESPERA_OCIOSA)
+                continue
+
+            url = trabalho["url"]
+            parar = threading.Event()
+            renovador = threading.Thread(target=_manter_lease, args=(fila, trabalho, nome, lease, parar), daemon=True)
+            renovador.start()
+            try:
+                resultado = analisar(url, pool, modo=modo, incremental=incremental)
+            except KeyboardInterrupt:
+                fila.liberar(trabalho["id"], nome)
+                raise
+            except Exception as e:
+                estado = fila.falhar(trabalho["id"], nome, e)
+                contagem["falhas"] += 1
+                print(f"[{nome}] Erro em {url} (tentativa {trabalho['tentativas']}, {estado}): {e}")
+                continue
+            finally:
+                parar.set()
+                renovador.join()
+
+            etapas = resultado.get("incremental")
+            if resumo is not None and etapas is not None:
+                resumo.registrar(etapas)
+            # No modo incremental, URL sem nenhuma etapa refeita não gera novo registro
+            if etapas is None or etapas["avaliacao"] or etapas["pagespeed"]:
+                with etapa("gravacao"):
+                    armazem.salvar(resultado)
+            fila.concluir(trabalho["id"], nome)
+            contagem["concluidos"] += 1
+            print(f"[{nome}] {url} -> nota {resultado.get('nota_seo')}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.fechar()
+        fila.fechar()
+        print(f"[{nome}] Encerrado: {contagem}")
+        if resumo is not None:
+            contagem["incremental"] = resumo.contagem
+            print(f"[{nome}] Resumo incremental: {resumo}")
+        if relatorio is not None:
+            relatorio.put(contagem)
+    return contagem
+
+
+def executar_trabalhadores(quantidade, resumo=None, **opcoes):
+    """Inicia `quantidade` processos trabalhadores e espera todos terminarem.
+
+    Usa "spawn": o Playwright e as conexões SQLite não sobrevivem a um fork.
+    Em outras máquinas, basta rodar o mesmo comando apontando para a mesma fila.
+    `resumo` (ResumoIncremental) acumula as etapas puladas de todos os processos.
+    """
+    # Os filhos dividem as cotas das APIs (rate_limit) entre si; com outras
+    # máquinas usando a mesma chave, defina RATE_LIMIT_PROCESSES com o total
+    os.environ.setdefault("RATE_LIMIT_PROCESSES", str(quantidade))
+    contexto = multiprocessing.get_context("spawn")
+    relatorio = contexto.Queue()
+    processos = [
+        contexto.Process(target=trabalhar, args=(i,), kwargs=dict(opcoes, relatorio=relatorio),
+                         name=f"trabalhador-{i}")
+        for i in range(quantidade)
+    ]
+    for processo in processos:
+        processo.start()
+    try:
+        for processo in processos:
+            processo.join()
+    except KeyboardInterrupt:
+        # O Ctrl+C também chega aos filhos, que devolvem o trabalho atual à fila
+        for processo in processos:
+            processo.join(timeout=30)
+    # Um relatório por processo que terminou normalmente
+    for _ in processos if resumo is not None else ():
+        try:
+            contagem = relatorio.get(timeout=1)
+        except queue.Empty:
+            break
+        resumo.somar(contagem.get("incremental", {}))
+    return [processo.exitcode for processo in processos]
+
+
+def _ler_linhas(caminho):
+    arquivo = sys.stdin if caminho == "-" else open(caminho, "r", encoding="utf-8")
+    with arquivo:
+        for linha in arquivo:
+            if linha.strip() and not linha.lstrip().startswith("#"):
+                yield linha.strip()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fila de URLs compartilhada e processos trabalhadores.")
+    parser.add_argument("--fila", help="caminho da fila (padrão: JOB_QUEUE_PATH)")
+    parser.add_argument("--backend", help="sqlite ou modulo:Classe (padrão: JOB_QUEUE_BACKEND)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("enfileirar", help="adiciona URLs de um arquivo (ou - para stdin)")
+    p.add_argument("arquivo")
+    p.add_argument("--reabrir", action="store_true", help="volta a enfileirar URLs já concluídas")
+
+    p = sub.add_parser("executar", help="inicia os processos trabalhadores")
+    p.add_argument("-n", "--processos", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--modo-extracao", choices=["auto", "estatico", "playwright"])
+    p.add_argument("--incremental", action="store_true")
+    p.add_argument("--navegadores", type=int, help="navegadores por processo")
+    p.add_argument("--continuo", action="store_true", help="não encerra quando a fila esvazia")
+
+    sub.add_parser("status", help="contagem de trabalhos por estado")
+    p = sub.add_parser("mortos", help="lista os trabalhos que esgotaram as tentativas")
+    p.add_argument("--reenfileirar", action="store_true")
+    args = parser.parse_args()
+
+    if args.comando == "executar":
+        inicio = time.time()
+        resumo = ResumoIncremental() if args.incremental else None
+        executar_trabalhadores(
+            args.processos,
+            resumo=resumo,
+            caminho_fila=args.fila,
+            backend=args.backend,
+            modo=args.modo_extracao,
+            incremental=args.incremental,
+            navegadores=args.navegadores,
+            ate_esvaziar=not args.continuo,
+        )
+        print(f"Trabalhadores encerrados em {time.time() - inicio:.1f}s")
+        if resumo is not None:
+            print(f"Resumo incremental: {resumo}")
+
+    fila = criar_fila(args.fila, args.backend)
+    if args.comando == "enfileirar":
+        print(f"{fila.enfileirar(_ler_linhas(args.arquivo), reabrir=args.reabrir)} URLs enfileiradas")
+    elif args.comando == "mortos":
+        if args.reenfileirar:
+            print(f"{fila.reenfileirar_mortos()} trabalhos reenfileirados")
+        else:
+            for trabalho in fila.mortos():
+                print(f"{trabalho['tentativas']}x  {trabalho['url']}  {trabalho['erro']}")
+    print(f"Fila: {fila.contadores()}")